@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of read_all_changed() / read_active_changed().
+
+Compares the dirty-bitmask implementation against the previous per-object
+scan that called Encoder.has_changed() on all 64 encoders. The previous
+implementation is copied verbatim below, with the plain attribute Encoder
+it ran on, so the comparison is not skewed by the state-backed properties
+of the current Encoder.
+
+Run with:
+    python benchmarks/bench_read_changed.py
+"""
+import timeit
+from types import SimpleNamespace
+
+from pymft import KnobSettings, MidiFighterTwister, TwisterSimulator, constants
+
+ITERATIONS = 100_000
+SUBSCRIBED = range(0, constants.Encoders.DEVICE_KNOB_NUM, 4)
+
+
+class LegacyEncoder:
+    """
+    Value tracking of the previous Encoder.
+    """
+
+    def __init__(self):
+        self.value = 0  # Store the current encoder value
+        self.mapped_value = 0  # Store the mapped value
+        self._last_value = 0
+
+    def has_changed(self) -> bool:
+        """
+        Returns True if the encoder value has changed since the last check.
+        """
+        changed = self.value != self._last_value
+        self._last_value = self.value
+        return changed
+
+
+class LegacyTwister:
+    """
+    read_all_changed() and read_active_changed() of the previous
+    MidiFighterTwister.
+    """
+
+    def __init__(self):
+        self._config = SimpleNamespace(
+            _encoders=[
+                LegacyEncoder()
+                for _ in range(constants.Encoders.DEVICE_KNOB_NUM)
+            ]
+        )
+        self._knob_subscriptions = {
+            encoder: KnobSettings() for encoder in SUBSCRIBED
+        }
+
+    def read_all_changed(self) -> dict:
+        """
+        Returns the values of all knobs that have changed since the last read.
+        """
+        changed_values = {}
+        for encoder_index, encoder in enumerate(self._config._encoders):
+            if encoder.has_changed():
+                changed_values[encoder_index] = encoder.mapped_value
+        return changed_values
+
+    def read_active_changed(self) -> dict:
+        """
+        Returns the values of active knobs that have changed since the last read.
+        """
+        changed_values = {}
+        for encoder_index, encoder in enumerate(self._config._encoders):
+            if (
+                encoder_index in self._knob_subscriptions
+                and encoder.has_changed()
+            ):
+                changed_values[encoder_index] = encoder.mapped_value
+        return changed_values
+
+
+def make_device():
+    mft = MidiFighterTwister(transport=TwisterSimulator().transport())
+    for encoder in SUBSCRIBED:
+        mft.subscribe(encoder, KnobSettings())
+    return mft
+
+
+def report(name, seconds):
+    print(f"{name:<42} {seconds / ITERATIONS * 1e6:8.3f} us/call")
+
+
+def run():
+    mft = make_device()
+    legacy = LegacyTwister()
+    state = mft._config._state
+    legacy_encoders = legacy._config._encoders
+    value = [0]
+
+    def touch_two():
+        # Two knobs move between polls, the typical 1 kHz polling case
+        value[0] = (value[0] + 1) % 128
+        state.write_many([(4, value[0], 0.0), (5, value[0], 0.0)])
+
+    def legacy_touch_two():
+        value[0] = (value[0] + 1) % 128
+        for encoder in legacy_encoders[4:6]:
+            encoder.value = value[0]
+            encoder.mapped_value = 0.0
+
+    # (name, read, function moving two knobs before each read or None). The
+    # time the knobs take to move is measured alone and subtracted.
+    cases = [
+        ("legacy read_all_changed (idle)", legacy.read_all_changed, None),
+        ("read_all_changed (idle)", mft.read_all_changed, None),
+        (
+            "legacy read_active_changed (idle)",
+            legacy.read_active_changed,
+            None,
+        ),
+        ("read_active_changed (idle)", mft.read_active_changed, None),
+        (
+            "legacy read_all_changed (2 changed)",
+            legacy.read_all_changed,
+            legacy_touch_two,
+        ),
+        ("read_all_changed (2 changed)", mft.read_all_changed, touch_two),
+        (
+            "legacy read_active_changed (2 changed)",
+            legacy.read_active_changed,
+            legacy_touch_two,
+        ),
+        (
+            "read_active_changed (2 changed)",
+            mft.read_active_changed,
+            touch_two,
+        ),
+    ]
+    for name, read, touch in cases:
+        if touch is None:
+            seconds = timeit.timeit(read, number=ITERATIONS)
+        else:
+            seconds = timeit.timeit(
+                lambda: (touch(), read()), number=ITERATIONS
+            ) - timeit.timeit(touch, number=ITERATIONS)
+        report(name, seconds)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,103 @@
+"""
+Benchmark of a full 64-encoder Config.send_all() SysEx construction.
+
+Compares the cached bytes payloads against the previous implementation,
+which rebuilt every message as a list on each push. Messages are sent
+directly instead of through the paced transfer engine, so only the Python
+side is measured.
+
+Run with:
+    python benchmarks/bench_send_all.py
+"""
+import timeit
+
+from pymft import Config, constants
+
+ITERATIONS = 2_000
+
+
+class NullMidiOut:
+    """
+    Stands in for rtmidi.MidiOut and drops every message.
+    """
+
+    def send_message(self, message):
+        pass
+
+
+def legacy_send_encoder(encoder, midi_out):
+    config_data = []
+    for setting_name, address in encoder._SETTING_ADDRESSES.items():
+        setting_value = getattr(encoder.knob_settings, setting_name)
+        if setting_value is not None:
+            config_data.extend([address, setting_value])
+
+    bytes_remaining = len(config_data)
+    total_parts = (
+        bytes_remaining + constants.PART_SIZE_BYTES - 1
+    ) // constants.PART_SIZE_BYTES
+    for part in range(1, total_parts + 1):
+        size = min(bytes_remaining, constants.PART_SIZE_BYTES)
+        bytes_remaining -= constants.PART_SIZE_BYTES
+        payload = (
+            [0xF0]
+            + [
+                constants.MIDI_MFR_ID_0,
+                constants.MIDI_MFR_ID_1,
+                constants.MIDI_MFR_ID_2,
+            ]
+            + [
+                constants.SysExCommands.BULK_XFER,
+                0x00,
+                encoder._sysex_tag,
+                part,
+                total_parts,
+                size,
+            ]
+            + config_data[:size]
+            + [0xF7]
+        )
+        config_data = config_data[size:]
+        midi_out.send_message(payload)
+
+
+def legacy_send_all(config, midi_out):
+    for encoder in config._encoders:
+        legacy_send_encoder(encoder, midi_out)
+
+    sysex = [
+        0xF0,
+        constants.MIDI_MFR_ID_0,
+        constants.MIDI_MFR_ID_1,
+        constants.MIDI_MFR_ID_2,
+        constants.SysExCommands.PUSH_CONF,
+    ]
+    for key, value in config._device_settings._settings.items():
+        sysex.extend([key, value])
+    sysex.append(0xF7)
+    midi_out.send_message(sysex)
+
+
+def cached_send_all(config, midi_out):
+    for message in config._collect(force_all=True)[0]:
+        midi_out.send_message(message)
+
+
+def run():
+    midi_out = NullMidiOut()
+    config = Config(midi_out)
+    config.initialize_defaults()
+
+    legacy = timeit.timeit(
+        lambda: legacy_send_all(config, midi_out), number=ITERATIONS
+    )
+    cached = timeit.timeit(
+        lambda: cached_send_all(config, midi_out), number=ITERATIONS
+    )
+    print(f"{'legacy send_all':<24} {legacy / ITERATIONS * 1e6:9.1f} us/call")
+    print(f"{'cached send_all':<24} {cached / ITERATIONS * 1e6:9.1f} us/call")
+    print(f"speed-up: {legacy / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,459 @@
+"""
+Benchmark suite of the library's hot paths, run against the in-process
+simulator so no hardware is needed.
+
+Every case reports the best time per operation over several repeats. Results
+can be saved as a JSON baseline and later runs compared against it; cases
+slower than the baseline by more than the threshold are flagged and the run
+exits with status 1.
+
+Run with:
+    python benchmarks/suite.py                       # Print results
+    python benchmarks/suite.py --save benchmarks/baselines/local.json
+    python benchmarks/suite.py --compare benchmarks/baselines/local.json
+    python benchmarks/suite.py --filter read_ --repeat 7
+
+Baselines are only comparable on the host, platform and Python version that
+recorded them, so none are committed: record one before changing the code,
+and compare after. Comparing against a baseline recorded elsewhere fails.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+import pymft
+from pymft import (
+    Config,
+    KnobSettings,
+    MidiFighterTwister,
+    TwisterSimulator,
+    constants,
+)
+
+BASELINE_FORMAT_VERSION = 2
+DEFAULT_THRESHOLD = 0.25  # Flag cases more than 25% slower than baseline
+SUBSCRIBED = range(0, constants.Encoders.DEVICE_KNOB_NUM, 4)
+
+CASES = {}  # name -> (setup, operations per call)
+
+
+def case(name: str, operations: int = 1):
+    """
+    Registers a benchmark. The decorated setup function returns the callable
+    to time, which performs `operations` operations per call.
+    """
+
+    def register(setup):
+        CASES[name] = (setup, operations)
+        return setup
+
+    return register
+
+
+class NullTransport:
+    """
+    Stands in for a device and drops every message, so only the Python side
+    of sending is measured.
+    """
+
+    identity = "null"
+    is_open = True
+
+    def send_message(self, message):
+        pass
+
+
+def make_device(**kwargs) -> MidiFighterTwister:
+    mft = MidiFighterTwister(transport=TwisterSimulator().transport(), **kwargs)
+    mft.discover()
+    for encoder in SUBSCRIBED:
+        mft.subscribe(encoder, KnobSettings(curve=pymft.MappingCurve.LOG))
+    return mft
+
+
+def encoder_messages(count: int) -> list:
+    """
+    Returns count rtmidi-style encoder messages spread over all knobs.
+    """
+    channel = 0xB0 + constants.MidiChannels.ROTARY_ENCODER
+    return [
+        ([channel, i % constants.Encoders.DEVICE_KNOB_NUM, (i * 7) % 128], 0.0)
+        for i in range(count)
+    ]
+
+
+@case("ingress_handle_midi_message", operations=1024)
+def ingress_single():
+    mft = make_device()
+    messages = encoder_messages(1024)
+    handle = mft._handle_midi_message
+
+    def run():
+        for message in messages:
+            handle(message)
+
+    return run
+
+
+@case("ingress_handle_midi_messages_batch64", operations=1024)
+def ingress_batch():
+    mft = make_device()
+    messages = encoder_messages(1024)
+    batches = [messages[i : i + 64] for i in range(0, len(messages), 64)]
+    handle = mft._handle_midi_messages
+
+    def run():
+        for batch in batches:
+            handle(batch)
+
+    return run
+
+
+@case("ingress_batch64_with_stats", operations=1024)
+def ingress_batch_stats():
+    mft = make_device(collect_stats=True)
+    messages = encoder_messages(1024)
+    batches = [messages[i : i + 64] for i in range(0, len(messages), 64)]
+
+    def run():
+        for batch in batches:
+            mft._handle_midi_messages(batch)
+            mft._record_batch(batch)
+
+    return run
+
+
+@case("update_mapped_value", operations=64)
+def update_mapped_value():
+    encoders = make_device()._config._encoders
+
+    def run():
+        for encoder in encoders:
+            encoder.update_mapped_value()
+
+    return run
+
+
+@case("read_all")
+def read_all():
+    return make_device().read_all
+
+
+@case("read_all_changed_idle")
+def read_all_changed_idle():
+    return make_device().read_all_changed
+
+
+@case("read_all_changed_2_changed")
+def read_all_changed_busy():
+    mft = make_device()
+    state = mft._config._state
+    value = [0]
+
+    def run():
+        value[0] = (value[0] + 1) % 128
+        state.write_many([(4, value[0], 0.0), (5, value[0], 0.0)])
+        mft.read_all_changed()
+
+    return run
+
+
+@case("read_active_changed_2_changed")
+def read_active_changed_busy():
+    mft = make_device()
+    state = mft._config._state
+    value = [0]
+
+    def run():
+        value[0] = (value[0] + 1) % 128
+        state.write_many([(4, value[0], 0.0), (5, value[0], 0.0)])
+        mft.read_active_changed()
+
+    return run
+
+
+@case("set_encoder_value", operations=64)
+def set_encoder_value():
+    mft = make_device(max_output_rate=None)
+    set_value = mft.set_encoder_value
+    value = [0.0]
+
+    def run():
+        value[0] = 0.25 if value[0] != 0.25 else 0.75
+        for encoder in range(constants.Encoders.DEVICE_KNOB_NUM):
+            set_value(encoder, value[0])
+
+    return run
+
+
+@case("encoder_send_all_settings")
+def encoder_send():
+    config = Config(NullTransport())
+    config.initialize_defaults()
+    encoder = config._encoders[0]
+    return lambda: encoder.send(force_all=True)
+
+
+@case("encoder_send_after_change")
+def encoder_send_after_change():
+    config = Config(NullTransport())
+    config.initialize_defaults()
+    encoder = config._encoders[0]
+    colors = [constants.ColorValues.RED, constants.ColorValues.BLUE]
+    turn = [0]
+
+    def run():
+        turn[0] ^= 1
+        encoder.knob_settings.active_color = colors[turn[0]]
+        encoder.send(force_all=False)
+
+    return run
+
+
+@case("config_send_all_messages")
+def config_send_all_messages():
+    midi_out = NullTransport()
+    config = Config(midi_out)
+    config.initialize_defaults()
+
+    def run():
+        for message in config._collect(force_all=True)[0]:
+            midi_out.send_message(message)
+
+    return run
+
+
+@case("config_send_all_unpaced")
+def config_send_all():
+    config = Config(NullTransport(), byte_rate=None)
+    config.initialize_defaults()
+    return lambda: config.send_all().result()
+
+
+def write_config_file(directory: str, repeats: int) -> str:
+    """
+    Writes a JSON config subscribing every encoder, repeats times over.
+    """
+    entries = []
+    for _ in range(repeats):
+        for bank in range(constants.Encoders.DEVICE_BANK_NUM):
+            for knob in range(constants.Encoders.DEVICE_KNOB_PER_BANK):
+                entries.append(
+                    {
+                        "bank": f"Bank{bank + 1}",
+                        "encoder": f"ENCODER_{knob + 1}",
+                        "knob_type": "UNIPOLAR",
+                        "led_color": "GREEN",
+                        "min_threshold": 0,
+                        "max_threshold": knob + 1,
+                        "curve": "S_CURVE",
+                    }
+                )
+    path = os.path.join(directory, f"config_{repeats}.json")
+    with open(path, "w") as f:
+        json.dump(entries, f)
+    return path
+
+
+def load_config_case(repeats: int, use_cache: bool):
+    directory = tempfile.TemporaryDirectory(prefix="pymft-bench-")
+    path = write_config_file(directory.name, repeats)
+    mft = make_device()
+    if use_cache:
+        mft.load_config(path)  # Write the cache once
+
+    def run(directory=directory):  # Keeps the directory until the case ends
+        mft.load_config(path, use_cache=use_cache)
+
+    return run
+
+
+@case("load_config_64_entries")
+def load_config_small():
+    return load_config_case(1, use_cache=False)
+
+
+@case("load_config_1024_entries")
+def load_config_large():
+    return load_config_case(16, use_cache=False)
+
+
+@case("load_config_1024_entries_cached")
+def load_config_large_cached():
+    return load_config_case(16, use_cache=True)
+
+
+def measure(setup, operations: int, repeat: int, min_time: float) -> dict:
+    """
+    Times one case and returns its result entry.
+    """
+    func = setup()
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # Scale up so that each repeat runs for at least min_time seconds
+    elapsed = timer.timeit(number)
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    seconds_per_op = best / (number * operations)
+    return {
+        "seconds_per_op": seconds_per_op,
+        "ops_per_second": 1.0 / seconds_per_op,
+        "number": number,
+        "operations": operations,
+        "repeat": repeat,
+    }
+
+
+def run_cases(names: list, repeat: int, min_time: float) -> dict:
+    results = {}
+    for name in names:
+        setup, operations = CASES[name]
+        results[name] = measure(setup, operations, repeat, min_time)
+        print(
+            f"{name:<40} {results[name]['seconds_per_op'] * 1e6:10.3f} us/op"
+            f" {results[name]['ops_per_second']:14,.0f} ops/s"
+        )
+    return results
+
+
+def environment() -> dict:
+    """
+    Returns the host and platform details a baseline is only valid on.
+    """
+    return {
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "processor": platform.processor(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "release": platform.release(),
+        "implementation": platform.python_implementation(),
+        "python": platform.python_version(),
+    }
+
+
+def save_baseline(path: str, results: dict):
+    baseline = {
+        "format_version": BASELINE_FORMAT_VERSION,
+        "pymft_version": pymft.__version__,
+        "environment": environment(),
+        "results": results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved baseline: {path}")
+
+
+def load_baseline(path: str) -> dict:
+    """
+    Reads a baseline, checking that it was recorded in this environment.
+
+    Raises:
+        ValueError: The baseline has another format or was recorded on
+            another host or platform.
+    """
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("format_version") != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported baseline format: {path}")
+    recorded = baseline.get("environment", {})
+    differences = [
+        f"{key}: {recorded.get(key)!r} here {value!r}"
+        for key, value in environment().items()
+        if recorded.get(key) != value
+    ]
+    if differences:
+        raise ValueError(
+            f"Baseline {path} was recorded in another environment "
+            f"({'; '.join(differences)}). Record one here with --save."
+        )
+    return baseline
+
+
+def compare_baseline(
+    path: str, baseline: dict, results: dict, threshold: float
+) -> list:
+    """
+    Prints each case's change against a baseline from load_baseline().
+
+    Returns:
+        The names of the cases slower than the baseline by more than
+        threshold.
+    """
+    regressions = []
+    print(f"\nCompared with {path} (threshold {threshold:.0%}):")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<40} {'new':>10}")
+            continue
+        change = result["seconds_per_op"] / previous["seconds_per_op"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {change:+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save", help="Write the results to a baseline")
+    parser.add_argument("--compare", help="Compare against a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown flagged as a regression (default: 0.25)",
+    )
+    parser.add_argument("--filter", help="Only run cases containing this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.1,
+        help="Minimum seconds per repeat (default: 0.1)",
+    )
+    parser.add_argument("--list", action="store_true", help="List the cases")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    baseline = None
+    if args.compare:
+        # Checked before running, as the cases take a while
+        try:
+            baseline = load_baseline(args.compare)
+        except (OSError, ValueError) as e:
+            print(f"Cannot compare: {e}")
+            return 2
+
+    results = run_cases(names, args.repeat, args.min_time)
+    if args.save:
+        save_baseline(args.save, results)
+    if baseline is not None:
+        regressions = compare_baseline(
+            args.compare, baseline, results, args.threshold
+        )
+        if regressions:
+            print(
+                f"\n{len(regressions)} regression(s): {', '.join(regressions)}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,31 @@
+from .src.async_pymft import AsyncMidiFighterTwister
 from .src.config import Config
 from .src.constants import constants
 from .src.device_settings import DeviceSettings
+from .src.encoder_state import EncoderSnapshot
+from .src.event_queue import EventQueue, OverflowPolicy
+from .src.events import (
+    BankChangeEvent,
+    EncoderEvent,
+    ShiftEncoderEvent,
+    SideButtonEvent,
+    SwitchEvent,
+)
+from .src.filters import FilterBank, FilterType
 from .src.knob_settings import KnobSettings
+from .src.led_frame import LedEngine, LedFrame
+from .src.manager import EncoderAddress, TwisterManager
+from .src.mapping import MappingCurve
 from .src.pymft import MidiFighterTwister
+from .src.recorder import (
+    Recording,
+    RecordingTransport,
+    ReplayTransport,
+    SessionRecorder,
+)
+from .src.simulator import SimulatorTransport, TwisterSimulator
+from .src.stats import Stats
+from .src.transfer import TransferResult
+from .src.transport import RtMidiTransport, Transport
 
 __version__ = "0.1.7"
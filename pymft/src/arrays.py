@@ -0,0 +1,66 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional extra
+    np = None
+
+from pymft.src.encoder_state import EncoderState
+
+
+def require_numpy():
+    """
+    Raises an ImportError explaining how to install the optional NumPy extra.
+    """
+    if np is None:
+        raise ImportError(
+            "NumPy is required for array reads. "
+            "Install it with: pip install pymft[numpy]"
+        )
+
+
+def read_state_array(
+    state: EncoderState,
+    raw: bool = False,
+    indices=None,
+    out=None,
+    dtype=None,
+):
+    """
+    Copies encoder values from the state into a contiguous NumPy array.
+
+    Args:
+        state: The encoder state to read from.
+        raw: Read the raw 0-127 values instead of the mapped values.
+        indices: Encoder indices to read, in order. Reads all encoders if None.
+        out: Preallocated array to fill. A new array is allocated if None.
+        dtype: Type of the allocated array. Defaults to uint8 for raw values
+            and float64 for mapped values. Ignored when out is given.
+
+    Returns:
+        The filled array.
+    """
+    require_numpy()
+
+    if indices is not None:
+        indices = np.asarray(indices, dtype=np.intp)
+    size = len(state) if indices is None else len(indices)
+    if out is None:
+        if dtype is None:
+            dtype = np.uint8 if raw else np.float64
+        out = np.empty(size, dtype=dtype)
+    elif out.shape != (size,):
+        raise ValueError(f"out must have shape ({size},), got {out.shape}")
+
+    def copy(raw_values, mapped_values):
+        values = np.frombuffer(
+            raw_values if raw else mapped_values,
+            dtype=np.uint8 if raw else np.float64,
+        )
+        if indices is None:
+            np.copyto(out, values, casting="unsafe")
+        elif out.dtype == values.dtype:
+            np.take(values, indices, out=out)
+        else:
+            out[:] = values[indices]
+
+    state.read(copy)
+    return out
@@ -0,0 +1,236 @@
+import asyncio
+import collections
+
+from pymft.src.pymft import MidiFighterTwister
+from pymft.src.transfer import TransferResult
+from pymft.src.transport import Transport
+
+DEFAULT_MAXSIZE: int = 1024  # Events buffered per events() iterator
+
+
+class _EventStream:
+    """
+    Events buffered for one events() iterator, the oldest dropped once
+    maxsize are waiting.
+    """
+
+    def __init__(self, maxsize: int):
+        self.events = collections.deque(maxlen=maxsize)
+        self.available = asyncio.Event()
+        self.closed = False
+
+
+class AsyncMidiFighterTwister:
+    """
+    asyncio front end of a Midi Fighter Twister device.
+
+    Input is read by the MidiFighterTwister reading thread. Every batch of
+    changes is handed to the event loop with a single
+    call_soon_threadsafe() wakeup, and consumers read it with
+    `async for event in mft.events()`. This works with every event loop,
+    including the ProactorEventLoop on Windows.
+
+    Use it as an async context manager from inside a running event loop:
+
+        async with AsyncMidiFighterTwister() as mft:
+            mft.discover()
+            mft.subscribe(...)
+            await mft.configure()
+            mft.start()
+            async for event in mft.events():
+                ...
+    """
+
+    def __init__(
+        self,
+        device_id: int | str = None,
+        max_output_rate: float | None = 1000.0,
+        callback_workers: int | None = None,
+        transport: Transport = None,
+        collect_stats: bool = False,
+        max_led_rate: float | None = 500.0,
+    ):
+        """
+        Args:
+            See MidiFighterTwister. Pass a TwisterSimulator's transport to
+            run without hardware.
+        """
+        self._mft = MidiFighterTwister(
+            device_id,
+            max_output_rate,
+            callback_workers=callback_workers,
+            transport=transport,
+            collect_stats=collect_stats,
+            max_led_rate=max_led_rate,
+        )
+        self._loop = None
+        # Events handed over by the reading thread, bounded in case the loop
+        # stalls
+        self._pending_events = collections.deque(maxlen=DEFAULT_MAXSIZE)
+        self._wakeup_scheduled = False
+        self._streams = set()
+        self.dropped = 0  # Events discarded because the loop fell behind
+
+    @property
+    def mft(self) -> MidiFighterTwister:
+        """
+        The underlying MidiFighterTwister, for the synchronous API.
+        """
+        return self._mft
+
+    @property
+    def config(self):
+        return self._mft.config
+
+    def discover(self) -> bool:
+        return self._mft.discover()
+
+    def subscribe(self, encoder: int, knob_settings):
+        self._mft.subscribe(encoder, knob_settings)
+
+    def load_config(self, config_path: str, use_cache: bool = True):
+        self._mft.load_config(config_path, use_cache)
+
+    def set_bank(self, bank: int):
+        self._mft.set_bank(bank)
+
+    def read_all(self) -> dict:
+        return self._mft.read_all()
+
+    def read_active(self) -> dict:
+        return self._mft.read_active()
+
+    def start(self, coalesce: bool = True):
+        """
+        Attaches to the running event loop and starts reading input.
+        """
+        self._attach()
+        self._mft.start(MidiFighterTwister.InputMode.CALLBACK, coalesce)
+
+    async def configure(
+        self, force_all: bool = False, pull: bool = False
+    ) -> TransferResult:
+        """
+        Sends the configuration to the device without blocking the loop.
+
+        See MidiFighterTwister.configure().
+        """
+        if pull and not force_all:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._mft.pull_config
+            )
+        return await asyncio.wrap_future(
+            self._mft.configure(force_all=force_all, wait=False)
+        )
+
+    async def set_encoder_value(
+        self, encoder: int, value: float, flush: bool = False
+    ):
+        """
+        Sets the value of an encoder.
+
+        The value is queued on the background writer. With flush, this waits
+        until every queued value has been sent to the device.
+        """
+        self._mft.set_encoder_value(encoder, value)
+        if flush:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._mft.flush_output
+            )
+
+    async def events(self, batch: bool = False, maxsize: int = DEFAULT_MAXSIZE):
+        """
+        Iterates over the EncoderEvents of subscribed encoders.
+
+        Args:
+            batch: Yield the list of events of each wakeup instead of single
+                events.
+            maxsize: Maximum number of events waiting for this iterator.
+                When a slow consumer falls further behind, the oldest are
+                dropped and counted in dropped (as OverflowPolicy.DROP_OLDEST
+                does for events()).
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self._attach()
+        stream = _EventStream(maxsize)
+        self._streams.add(stream)
+        try:
+            while not stream.closed:
+                await stream.available.wait()
+                stream.available.clear()
+                if batch:
+                    if stream.events:
+                        events = list(stream.events)
+                        stream.events.clear()
+                        yield events
+                else:
+                    while stream.events:
+                        yield stream.events.popleft()
+        finally:
+            self._streams.discard(stream)
+
+    async def close(self):
+        """
+        Stops the event iterators and closes the device.
+        """
+        for stream in self._streams:
+            stream.closed = True
+            stream.available.set()
+        if self._loop is not None:
+            self._mft.remove_event_listener(self._on_events)
+            self._loop = None
+        await asyncio.get_running_loop().run_in_executor(None, self._mft.close)
+
+    async def __aenter__(self):
+        self._attach()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _attach(self):
+        """
+        Attaches to the running loop and starts listening for events, once.
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._mft.add_event_listener(self._on_events)
+
+    def _on_events(self, events: list):
+        """
+        Event listener running on the reading thread. Queues the batch and
+        wakes the loop unless a wakeup is already pending.
+        """
+        pending = self._pending_events
+        overflow = len(pending) + len(events) - pending.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        pending.extend(events)
+        if not self._wakeup_scheduled:
+            self._wakeup_scheduled = True
+            loop = self._loop
+            try:
+                loop.call_soon_threadsafe(self._on_wakeup)
+            except (AttributeError, RuntimeError):
+                pass  # Detached, or the loop is closed
+
+    def _on_wakeup(self):
+        """
+        Runs on the event loop. Hands every queued event to the iterators.
+        """
+        # Clear the flag before draining, so later events wake the loop again
+        self._wakeup_scheduled = False
+
+        events = []
+        while self._pending_events:
+            events.append(self._pending_events.popleft())
+        if not events:
+            return
+        for stream in self._streams:
+            queued = stream.events
+            overflow = len(queued) + len(events) - queued.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            queued.extend(events)
+            stream.available.set()
@@ -1,8 +1,19 @@
-import rtmidi
+import threading
+from concurrent.futures import Future
 
 from pymft.src.constants import constants
 from pymft.src.device_settings import DeviceSettings
 from pymft.src.encoder import Encoder
+from pymft.src.encoder_state import EncoderState
+from pymft.src.sysex import (
+    build_bulk_request,
+    build_pull_conf,
+    build_push_conf,
+    parse_pairs,
+    parse_sysex,
+)
+from pymft.src.transfer import DEFAULT_BYTE_RATE, DEFAULT_WINDOW, TransferEngine
+from pymft.src.transport import Transport
 
 
 class Config:
@@ -12,13 +23,40 @@ class Config:
 
     def __init__(
         self,
-        midi_out: rtmidi.MidiOut,
-        device_settings: DeviceSettings = DeviceSettings(),
+        midi_out: Transport,
+        device_settings: DeviceSettings = None,
+        byte_rate: float | None = DEFAULT_BYTE_RATE,
+        window: int = DEFAULT_WINDOW,
     ):
+        """
+        Args:
+            midi_out: Transport the configuration is sent through.
+            device_settings: Global settings of the device. Defaults to a new
+                DeviceSettings, so each device has its own.
+            byte_rate: SysEx bytes per second sent during a configuration
+                push, or None to send unpaced.
+            window: Maximum number of SysEx messages in flight at once.
+        """
         self._midi_out = midi_out
-        self._device_settings = device_settings
+        self._transfer_engine = TransferEngine(
+            self._send_sysex, byte_rate, window
+        )
+        self._device_settings = (
+            device_settings if device_settings is not None else DeviceSettings()
+        )
+        self._global_shadow = {}  # address -> value last sent to the device
+        self._stats = None  # Stats of the owning device, if it collects them
+        # Configuration pulled from the device, filled by handle_sysex()
+        self._pulled_encoders = {}  # encoder index -> (address, value) pairs
+        self._pulled_global = None  # (address, value) pairs
+        self._pull_parts = {}  # encoder index -> payload bytes received
+        self._pull_complete = threading.Event()
+        # Guards the pull state, which the reading thread fills in
+        self._pull_lock = threading.Lock()
+        self._pulling = False  # Replies are only recorded during a pull
+        self._state = EncoderState(constants.Encoders.DEVICE_KNOB_NUM)
         self._encoders = [
-            Encoder(i, self._midi_out)
+            Encoder(i, self._midi_out, self._state)
             for i in range(constants.Encoders.DEVICE_KNOB_NUM)
         ]
 
@@ -76,52 +114,221 @@ class Config:
                 )
                 self._encoders[i].set("encoder_shift_midi_channel", 0)
 
-    def send_all(self):
+    def send_all(self) -> Future:
         """
         Sends the entire configuration to the device.
+
+        Returns:
+            A Future resolving to a TransferResult once the paced transfer
+            has completed.
         """
-        self._send_encoders(force_all=True)
-        self._send_global()
+        return self._push(force_all=True)
 
-    def send_modified(self):
+    def send_modified(self) -> Future:
         """
-        Sends only the modified configuration values to the device.
+        Sends only the configuration values that differ from what the device
+        was last sent. Everything is sent the first time.
+
+        Returns:
+            A Future resolving to a TransferResult once the paced transfer
+            has completed.
         """
-        if self._send_encoders(force_all=False):
-            self._send_global()
+        return self._push(force_all=False)
 
-    def _send_encoders(self, force_all: bool):
+    def _push(self, force_all: bool) -> Future:
         """
-        Sends the encoder configurations to the device.
+        Submits the messages that bring the device up to date. They are only
+        recorded as what the device holds once the transfer has completed, so
+        a failed or cancelled push is sent again by the next send_modified().
         """
-        modified = False
-        for encoder in self._encoders:
-            if encoder.is_modified or force_all:
-                encoder.send(force_all)
-                modified = True
-        return modified
-
-    def _send_global(self):
-        """
-        Sends the global configuration values to the device.
-        """
-        sysex = (
-            [0xF0]
-            + [
-                constants.MIDI_MFR_ID_0,
-                constants.MIDI_MFR_ID_1,
-                constants.MIDI_MFR_ID_2,
-            ]
-            + [constants.SysExCommands.PUSH_CONF]
+        messages, encoder_updates, global_update = self._collect(force_all)
+        future = self._transfer_engine.submit(messages)
+        future.add_done_callback(
+            lambda done: self._commit_push(
+                done, encoder_updates, global_update
+            )
         )
+        return future
+
+    def _commit_push(
+        self, future: Future, encoder_updates: list, global_update: tuple
+    ):
+        """
+        Records a completed push as what the device holds.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        for encoder, update in encoder_updates:
+            encoder.commit_sysex(update)
+        pairs, version = global_update
+        self._global_shadow.update(pairs)
+        if pairs and version == self._device_settings._version:
+            self._device_settings._is_modified = False
+
+    def set_transfer_limits(self, byte_rate: float | None, window: int):
+        """
+        Changes the byte budget and in-flight window of configuration pushes.
+        """
+        self._transfer_engine.set_limits(byte_rate, window)
+
+    def pull(self, timeout: float = 2.0, apply: bool = False) -> bool:
+        """
+        Requests the device's current encoder and global configuration.
+
+        The replies are recorded as what the device holds, so the next
+        send_modified() only pushes the settings that differ (or nothing).
+        Replies are delivered by handle_sysex(), so the input must be read
+        while this waits.
+
+        Args:
+            timeout: Seconds to wait for all replies.
+            apply: Also copy the pulled values into the knob and device
+                settings, replacing the local configuration.
+
+        Returns:
+            True if the whole configuration was received before the timeout.
+            Settings that did not arrive are pushed in full next time.
+        """
+        with self._pull_lock:
+            self._pulled_encoders = {}
+            self._pulled_global = None
+            self._pull_parts = {}
+            self._pull_complete.clear()
+            self._pulling = True
+        self.forget_device_state()
+
+        requests = [build_pull_conf()] + [
+            build_bulk_request(encoder._sysex_tag) for encoder in self._encoders
+        ]
+        try:
+            self._transfer_engine.submit(requests).result()
+            complete = self._pull_complete.wait(timeout)
+        finally:
+            # Stop recording replies, so late ones cannot change what is
+            # being applied
+            with self._pull_lock:
+                self._pulling = False
+                pulled_encoders = self._pulled_encoders
+                pulled_global = self._pulled_global
+                self._pulled_encoders = {}
+                self._pulled_global = None
+                self._pull_parts = {}
+
+        for index, pairs in pulled_encoders.items():
+            self._encoders[index].load_device_config(pairs, apply)
+        if pulled_global is not None:
+            self._global_shadow = dict(pulled_global)
+            if apply:
+                for key, value in pulled_global:
+                    if key in self._device_settings._settings:
+                        self._device_settings[key] = value
+        return complete
+
+    def handle_sysex(self, message) -> bool:
+        """
+        Handles a SysEx message received from the device.
+
+        Returns:
+            True if the message was a configuration reply.
+        """
+        parsed = parse_sysex(message)
+        if parsed is None:
+            return False
+        command, payload = parsed
+
+        if command == constants.SysExCommands.BULK_XFER:
+            # 0x00, tag, part, total parts, size, address/value bytes...
+            if len(payload) < 5 or payload[0] != 0x00:
+                return False
+            tag, part, total_parts, size = payload[1:5]
+            index = tag - 1
+            if index not in range(len(self._encoders)):
+                return False
+            data = payload[5 : 5 + size]
+            with self._pull_lock:
+                if not self._pulling:
+                    return True
+                if part == 1:
+                    self._pull_parts[index] = data
+                else:
+                    self._pull_parts[index] = (
+                        self._pull_parts.get(index, b"") + data
+                    )
+                if part == total_parts:
+                    self._pulled_encoders[index] = parse_pairs(
+                        self._pull_parts.pop(index)
+                    )
+                self._check_pull_complete()
+        elif command in (
+            constants.SysExCommands.PULL_CONF,
+            constants.SysExCommands.PUSH_CONF,
+        ):
+            with self._pull_lock:
+                if not self._pulling:
+                    return True
+                self._pulled_global = parse_pairs(payload)
+                self._check_pull_complete()
+        else:
+            return False
+        return True
+
+    def _check_pull_complete(self):
+        """
+        Signals pull() once every reply has arrived. Called under the pull
+        lock.
+        """
+        if self._pulled_global is not None and len(
+            self._pulled_encoders
+        ) == len(self._encoders):
+            self._pull_complete.set()
+
+    def close(self, timeout: float | None = 5.0):
+        """
+        Waits for pending configuration pushes and stops the transfer thread.
+        Pushes not finished within timeout are cancelled.
+        """
+        self._transfer_engine.close(timeout)
 
-        for key, value in self._device_settings._settings.items():
-            sysex.extend([key, value])
+    def forget_device_state(self):
+        """
+        Forgets what the device was last sent (e.g. after reconnecting), so
+        the next send_modified() pushes the whole configuration.
+        """
+        self._global_shadow.clear()
+        for encoder in self._encoders:
+            encoder.forget_device_state()
 
-        sysex.append(0xF7)
-        self._send_sysex(sysex)
+    def _collect(self, force_all: bool) -> tuple:
+        """
+        Returns the SysEx messages carrying the encoder and global
+        configuration, the (encoder, SysexUpdate) pairs and the global
+        (pairs, settings version) to commit once they have been sent.
+
+        Unless force_all is set, only the values that differ from what the
+        device was last sent are included.
+        """
+        messages = []
+        encoder_updates = []
+        for encoder in self._encoders:
+            update = encoder.collect_sysex(force_all)
+            if update is not None:
+                messages.extend(update.messages)
+                encoder_updates.append((encoder, update))
+
+        settings = self._device_settings
+        shadow = self._global_shadow
+        pairs = [
+            (key, value)
+            for key, value in settings._settings.items()
+            if force_all or key not in shadow or shadow[key] != value
+        ]
+        if len(pairs) == len(settings._settings):
+            messages.append(settings.compiled_sysex())
+        elif pairs:
+            messages.append(build_push_conf(pairs))
+        return messages, encoder_updates, (pairs, settings._version)
 
-    def _send_sysex(self, sysex: list):
+    def _send_sysex(self, sysex: bytes):
         """
         Sends a SysEx message to the device.
         """
@@ -129,3 +336,6 @@ class Config:
             self._midi_out.send_message(sysex)
         except Exception as e:
             print(f"Error sending SysEx message: {e}")
+            raise  # Fails the transfer, so it is not recorded as sent
+        if self._stats is not None:
+            self._stats.record_sysex_sent(len(sysex))
@@ -0,0 +1,309 @@
+import hashlib
+import os
+import struct
+from typing import NamedTuple
+
+from pymft.src.knob_settings import KnobSettings
+from pymft.src.mapping import MIDI_VALUE_COUNT, MappingCurve
+
+CACHE_SUFFIX: str = ".pymftc"  # Appended to the JSON path to name the cache
+CACHE_MAGIC: bytes = b"PMFC"
+CACHE_FORMAT_VERSION: int = 3
+
+# How each KnobSettings attribute is packed, in file order. The
+# curve_function cannot come from JSON and is not stored.
+_FIELD_FORMATS = {
+    "_knob_type": "B",
+    "_detent": "i",
+    "_min": "d",
+    "_max": "d",
+    "_curve": "B",
+    "_curve_amount": "d",
+    "_steps": "i",
+    "_resolution": "i",
+    "_acceleration": "d",
+    "_wrap": "?",
+    "_movement_type": "i",
+    "_switch_action_type": "i",
+    "_switch_midi_channel": "i",
+    "_switch_midi_number": "i",
+    "_switch_midi_type": "i",
+    "_encoder_midi_channel": "i",
+    "_encoder_midi_number": "i",
+    "_encoder_midi_type": "i",
+    "_active_color": "i",
+    "_inactive_color": "i",
+    "_detent_color": "i",
+    "_indicator_display_type": "i",
+    "_is_super_knob": "?",
+    "_encoder_shift_midi_channel": "i",
+    "_is_modified": "?",
+    "_version": "i",
+}
+# Fails on import when KnobSettings gains an attribute missing above
+_FIELDS = tuple(
+    name for name in vars(KnobSettings()) if name != "_curve_function"
+)
+_FORMATS = "".join(_FIELD_FORMATS[name] for name in _FIELDS)
+_LAYOUT_DIGEST = hashlib.sha256(
+    ",".join(_FIELDS).encode("ascii") + _FORMATS.encode("ascii")
+).digest()[:8]
+
+# magic, format version, pymft version, layout, source, count. A cache written
+# by another pymft version is not read, as its compiled values may differ.
+_HEADER = struct.Struct("<4sH16s8s32sH")
+# Encoder record: index, flags, mask of the attributes the config sets, the
+# encoder's settings and None mask, the last subscribed settings and None
+# mask, the mapping table values
+_ENCODER = struct.Struct(f"<BBI I{_FORMATS} I{_FORMATS} {MIDI_VALUE_COUNT}d")
+_LENGTH = struct.Struct("<H")
+
+_INACTIVE_FOLLOWS_ACTIVE = 0x01  # Flag: the inactive color copies the active
+_ENUMS = {
+    "_knob_type": list(KnobSettings.KnobType),
+    "_curve": list(MappingCurve),
+}
+
+
+class CachedEncoder(NamedTuple):
+    """
+    The state a config leaves one encoder in.
+    """
+
+    index: int
+    subscription: KnobSettings  # Last settings subscribed to the encoder
+    settings: KnobSettings  # The encoder's settings after loading
+    changed: tuple  # Names of the settings attributes the config sets
+    inactive_follows_active: bool  # The inactive color copies the active one
+    mapping_values: tuple  # MappingTable.values for settings
+    pairs: list  # Encoder.compiled_config() for settings
+    messages: list
+
+
+def cache_path(config_path: str) -> str:
+    """
+    Returns the path of the compiled cache stored next to a JSON config.
+    """
+    return config_path + CACHE_SUFFIX
+
+
+def _library_version() -> bytes:
+    from pymft import __version__  # Not at import time: pymft imports us
+
+    return __version__.encode("ascii")
+
+
+def source_digest(source: bytes) -> bytes:
+    """
+    Returns the content hash keying the cache of a JSON config.
+    """
+    return hashlib.sha256(source).digest()
+
+
+def compile_entries(subscriptions: list, encoders: list) -> list:
+    """
+    Reduces the subscriptions made by a config to the final state of each
+    encoder, as MidiFighterTwister.subscribe() left it.
+
+    Args:
+        subscriptions: (encoder index, KnobSettings) pairs in load order.
+        encoders: The device's Encoder objects.
+
+    Returns:
+        A CachedEncoder per subscribed encoder, in first subscription order.
+    """
+    last = {}
+    changed = {}
+    follows = {}
+    for encoder_index, knob_settings in subscriptions:
+        names = changed.setdefault(encoder_index, {"_detent"})
+        has_setting = encoders[encoder_index].has_setting
+        for name, value in vars(knob_settings).items():
+            if value is not None and has_setting(name[1:]):
+                names.add(name)
+        # See the LED color fallback in subscribe()
+        if (
+            knob_settings.active_color is None
+            and knob_settings.inactive_color is None
+        ):
+            names.add("_inactive_color")
+            follows[encoder_index] = True
+        else:
+            follows[encoder_index] = False
+        last[encoder_index] = knob_settings
+
+    entries = []
+    for encoder_index, knob_settings in last.items():
+        encoder = encoders[encoder_index]
+        pairs, messages = encoder.compiled_config()
+        entries.append(
+            CachedEncoder(
+                encoder_index,
+                knob_settings,
+                encoder.knob_settings,
+                tuple(
+                    name for name in _FIELDS if name in changed[encoder_index]
+                ),
+                follows[encoder_index],
+                encoder.mapping.values,
+                pairs,
+                messages,
+            )
+        )
+    return entries
+
+
+def _pack_fields(knob_settings: KnobSettings) -> list:
+    fields = vars(knob_settings)
+    if fields["_curve_function"] is not None:
+        raise ValueError("Cannot cache a custom curve_function")
+    none_mask = 0
+    values = [0]
+    for bit, name in enumerate(_FIELDS):
+        value = fields[name]
+        if value is None:
+            none_mask |= 1 << bit
+            value = 0
+        elif name in _ENUMS:
+            value = _ENUMS[name].index(value)
+        values.append(value)
+    values[0] = none_mask
+    return values
+
+
+def _unpack_fields(values: tuple) -> KnobSettings:
+    none_mask = values[0]
+    fields = {"_curve_function": None}
+    for bit, name in enumerate(_FIELDS):
+        value = values[bit + 1]
+        if none_mask >> bit & 1:
+            value = None
+        elif name in _ENUMS:
+            value = _ENUMS[name][value]
+        fields[name] = value
+    return KnobSettings.from_fields(fields)
+
+
+def write_cache(path: str, digest: bytes, entries: list):
+    """
+    Writes a compiled config cache.
+
+    Args:
+        path: Path of the cache file.
+        digest: source_digest() of the JSON config.
+        entries: CachedEncoders from compile_entries().
+    """
+    chunks = [
+        _HEADER.pack(
+            CACHE_MAGIC,
+            CACHE_FORMAT_VERSION,
+            _library_version(),
+            _LAYOUT_DIGEST,
+            digest,
+            len(entries),
+        )
+    ]
+    for entry in entries:
+        changed_mask = 0
+        for bit, name in enumerate(_FIELDS):
+            if name in entry.changed:
+                changed_mask |= 1 << bit
+        chunks.append(
+            _ENCODER.pack(
+                entry.index,
+                _INACTIVE_FOLLOWS_ACTIVE
+                if entry.inactive_follows_active
+                else 0,
+                changed_mask,
+                *_pack_fields(entry.settings),
+                *_pack_fields(entry.subscription),
+                *entry.mapping_values,
+            )
+        )
+        chunks.append(bytes([len(entry.pairs)]))
+        chunks.append(bytes(byte for pair in entry.pairs for byte in pair))
+        chunks.append(bytes([len(entry.messages)]))
+        for message in entry.messages:
+            chunks.append(_LENGTH.pack(len(message)) + message)
+
+    # Write to a temporary file first so readers never see a partial cache
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(b"".join(chunks))
+    os.replace(temporary_path, path)
+
+
+def read_cache(path: str, digest: bytes) -> list | None:
+    """
+    Reads a compiled config cache.
+
+    Returns:
+        The CachedEncoders passed to write_cache(), with freshly built
+        KnobSettings objects, or None if the cache is missing, stale or
+        unreadable.
+    """
+    field_count = len(_FIELDS) + 1
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        (
+            magic,
+            version,
+            library_version,
+            layout,
+            cached_digest,
+            count,
+        ) = _HEADER.unpack_from(data, 0)
+        if (
+            magic != CACHE_MAGIC
+            or version != CACHE_FORMAT_VERSION
+            or library_version.rstrip(b"\0") != _library_version()
+            or layout != _LAYOUT_DIGEST
+            or cached_digest != digest
+        ):
+            return None
+
+        offset = _HEADER.size
+        entries = []
+        for _ in range(count):
+            record = _ENCODER.unpack_from(data, offset)
+            offset += _ENCODER.size
+            encoder_index, flags, changed_mask = record[:3]
+            settings_end = 3 + field_count
+            subscription_end = settings_end + field_count
+
+            pair_count = data[offset]
+            offset += 1
+            pairs = [
+                (data[offset + 2 * i], data[offset + 2 * i + 1])
+                for i in range(pair_count)
+            ]
+            offset += 2 * pair_count
+            message_count = data[offset]
+            offset += 1
+            messages = []
+            for _ in range(message_count):
+                (length,) = _LENGTH.unpack_from(data, offset)
+                offset += _LENGTH.size
+                messages.append(data[offset : offset + length])
+                offset += length
+
+            entries.append(
+                CachedEncoder(
+                    encoder_index,
+                    _unpack_fields(record[settings_end:subscription_end]),
+                    _unpack_fields(record[3:settings_end]),
+                    tuple(
+                        name
+                        for bit, name in enumerate(_FIELDS)
+                        if changed_mask >> bit & 1
+                    ),
+                    bool(flags & _INACTIVE_FOLLOWS_ACTIVE),
+                    record[subscription_end:],
+                    pairs,
+                    messages,
+                )
+            )
+        return entries
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
@@ -68,6 +68,8 @@ class SystemMessages:
     BANK3: int = 2  # CC value for Bank 3
     BANK4: int = 3  # CC value for Bank 4
 
+    SIDE_BUTTONS_PER_BANK: int = 6  # Number of side buttons in each bank
+
     # CC values for side buttons in each bank
     BANK1_LEFT1: int = 8
     BANK1_LEFT2: int = 9
@@ -1,4 +1,5 @@
 from pymft.src.constants import constants
+from pymft.src.sysex import build_push_conf
 
 
 class DeviceSettings:
@@ -38,6 +39,9 @@ class DeviceSettings:
             32: 127,  # Indicator Global Brightness (default: 127)
         }
         self._is_modified = False
+        self._version = 0  # Incremented on every change
+        self._sysex_cache = None
+        self._sysex_cache_version = None
 
     def __getitem__(self, key):
         return self._settings[key]
@@ -46,6 +50,17 @@ class DeviceSettings:
         if self._settings[key] != value:
             self._settings[key] = value
             self._is_modified = True
+            self._version += 1
+
+    def compiled_sysex(self) -> bytes:
+        """
+        Returns the PUSH_CONF message carrying every global setting. The
+        message is rebuilt only after a setting changed.
+        """
+        if self._sysex_cache_version != self._version:
+            self._sysex_cache = build_push_conf(list(self._settings.items()))
+            self._sysex_cache_version = self._version
+        return self._sysex_cache
 
     def is_modified(self) -> bool:
         """
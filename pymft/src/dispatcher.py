@@ -0,0 +1,102 @@
+import collections
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+DRAIN_BATCH: int = 32  # Calls run per turn before yielding the worker
+
+
+class CallbackDispatcher:
+    """
+    Runs callbacks on a thread pool, in order per key and in parallel across
+    keys.
+
+    Every key (an encoder index) has a mailbox. Submitting appends to it and
+    schedules a drain task only if none is scheduled yet, so at most one
+    worker runs the calls of a key at a time and they run in submission
+    order. Submitting never waits for the callbacks, however slow they are.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int | None = None):
+        """
+        Args:
+            max_workers: Number of threads running callbacks.
+            max_pending: Maximum number of calls waiting per key. When a
+                mailbox is full the oldest call is dropped. None keeps all.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pymft-callback"
+        )
+        self._max_pending = max_pending
+        self._mailboxes = {}  # key -> deque of (callback, args)
+        self._scheduled = set()  # Keys with a drain task queued or running
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self.dropped = 0  # Calls discarded because a mailbox was full
+
+    def submit(self, key, callback: Callable, *args):
+        """
+        Queues callback(*args) behind the earlier calls of the same key.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            mailbox = self._mailboxes.get(key)
+            if mailbox is None:
+                mailbox = collections.deque(maxlen=self._max_pending)
+                self._mailboxes[key] = mailbox
+            if len(mailbox) == mailbox.maxlen:
+                self.dropped += 1
+            mailbox.append((callback, args))
+            if key in self._scheduled:
+                return
+            self._scheduled.add(key)
+        self._executor.submit(self._drain, key)
+
+    def _drain(self, key):
+        """
+        Runs the queued calls of one key, then reschedules itself if more
+        arrived so that busy keys do not starve the others.
+        """
+        mailbox = self._mailboxes[key]
+        for _ in range(DRAIN_BATCH):
+            with self._lock:
+                if not mailbox:
+                    self._scheduled.discard(key)
+                    if not self._scheduled:
+                        self._idle.notify_all()
+                    return
+                callback, args = mailbox.popleft()
+            try:
+                callback(*args)
+            except Exception as e:
+                print(traceback.format_exc())
+
+        try:
+            self._executor.submit(self._drain, key)
+        except RuntimeError:
+            # The executor is shutting down, finish the mailbox here
+            self._drain(key)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every queued call has run.
+
+        Returns:
+            True if all calls ran before the timeout.
+        """
+        with self._lock:
+            return self._idle.wait_for(
+                lambda: not self._scheduled, timeout=timeout
+            )
+
+    def close(self, timeout: float | None = 1.0):
+        """
+        Runs the queued calls and stops the worker threads.
+        """
+        self.flush(timeout)
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,33 @@
-import rtmidi
+from typing import NamedTuple
 
 from pymft.src.constants import constants
+from pymft.src.encoder_state import EncoderState
 from pymft.src.knob_settings import KnobSettings
+from pymft.src.mapping import (
+    MIDI_VALUE_MAX,
+    MappingTable,
+    compile_mapping,
+    mapping_inputs,
+)
+from pymft.src.relative import (
+    DEFAULT_ACCELERATION,
+    DEFAULT_RESOLUTION,
+    advance,
+    relative_steps,
+)
+from pymft.src.sysex import build_bulk_xfer
+from pymft.src.transport import Transport
+
+
+class SysexUpdate(NamedTuple):
+    """
+    SysEx messages bringing the device's copy of an encoder configuration up
+    to date, from Encoder.collect_sysex().
+    """
+
+    messages: list
+    pairs: list  # (address, value) pairs the messages carry
+    key: tuple  # Settings object and version the messages were built from
 
 
 class Encoder:
@@ -27,14 +53,89 @@ class Encoder:
         "encoder_shift_midi_channel": 24,
     }
 
-    def __init__(self, encoder_index: int, midi_out: rtmidi.MidiOut = None):
+    _SETTING_NAMES = {
+        address: name for name, address in _SETTING_ADDRESSES.items()
+    }
+
+    # Settings that only affect how values are interpreted on the host
+    _MAPPING_SETTINGS = {
+        "min",
+        "max",
+        "curve",
+        "curve_amount",
+        "steps",
+        "curve_function",
+        "resolution",
+        "acceleration",
+        "wrap",
+    }
+
+    # KnobSettings attribute names of the settings set() accepts
+    _SETTING_FIELDS = frozenset(
+        "_" + name for name in (*_SETTING_ADDRESSES, *_MAPPING_SETTINGS)
+    )
+
+    def __init__(
+        self,
+        encoder_index: int,
+        midi_out: Transport = None,
+        state: EncoderState = None,
+    ):
         self._encoder_index = encoder_index
         self._midi_out = midi_out
         self._sysex_tag = encoder_index + 1
         self.knob_settings = KnobSettings()
-        self.value = 0  # Store the current encoder value
-        self.mapped_value = 0  # Store the mapped value
+        # Current raw and mapped values live in the (shared) state arrays
+        self._state = (
+            state
+            if state is not None
+            else EncoderState(constants.Encoders.DEVICE_KNOB_NUM)
+        )
         self._last_value = 0
+        self._position = 0.0  # Normalized 0-1 position in relative mode
+        self._device_shadow = {}  # address -> value last sent to the device
+        # Full configuration pairs and SysEx messages, rebuilt only when the
+        # knob settings object or its version changes
+        self._sysex_cache = ([], [])
+        self._sysex_cache_key = None
+        self._synced_key = None  # Cache key the device shadow is in sync with
+        self._mapping_key = None  # mapping_inputs() of the compiled table
+        self.compile_mapping()
+
+    @property
+    def mapping(self) -> MappingTable:
+        return self._mapping
+
+    def compile_mapping(self, values: tuple = None):
+        """
+        Compiles the mapping settings into the lookup table used by
+        map_value(). Call again after changing mapping settings directly.
+
+        Args:
+            values: The table values already compiled for these settings,
+                e.g. by a config cache.
+        """
+        key = mapping_inputs(self.knob_settings)
+        if key == self._mapping_key:
+            return  # The table is already compiled for these settings
+        self._mapping = compile_mapping(self.knob_settings, values)
+        self._mapping_key = key
+
+    @property
+    def value(self) -> int:
+        return self._state.get_raw(self._encoder_index)
+
+    @value.setter
+    def value(self, value: int):
+        self._state.set_raw(self._encoder_index, value)
+
+    @property
+    def mapped_value(self) -> float:
+        return self._state.get_mapped(self._encoder_index)
+
+    @mapped_value.setter
+    def mapped_value(self, value: float):
+        self._state.set_mapped(self._encoder_index, value)
 
     def set_detent(self, value: bool):
         """
@@ -42,96 +143,255 @@ class Encoder:
         """
         self.knob_settings.detent = value
 
+    @classmethod
+    def has_setting(cls, setting_name: str) -> bool:
+        """
+        True if set() accepts the setting.
+        """
+        return (
+            setting_name in cls._SETTING_ADDRESSES
+            or setting_name in cls._MAPPING_SETTINGS
+        )
+
+    @classmethod
+    def setting_fields(cls) -> frozenset:
+        """
+        Returns the KnobSettings attribute names (vars() keys) of the settings
+        set() accepts.
+        """
+        return cls._SETTING_FIELDS
+
     def set(self, setting_name: str, value: int):
         """
         Sets the value of a specific setting.
         """
-        if setting_name in self._SETTING_ADDRESSES or setting_name in {
-            "max",
-            "min",
-        }:
+        if self.has_setting(setting_name):
             setattr(self.knob_settings, setting_name, value)
 
-    def update_mapped_value(self):
+    def map_value(self, value: int) -> float:
         """
-        Updates the mapped value based on the current value and the min/max range.
+        Maps a raw 0-127 value to the min/max range without storing it.
         """
-        # Calculate the normalized value from 0 to 1
-        normalized_value = self.value / 127
+        return self._mapping.values[value]
 
-        # Map the normalized value to the min/max range
-        self.mapped_value = (
-            normalized_value * (self.knob_settings.max - self.knob_settings.min)
-            + self.knob_settings.min
+    @property
+    def is_relative(self) -> bool:
+        """
+        True when the encoder sends relative increments (MIDITYPE_SENDRELENC)
+        instead of absolute values.
+        """
+        return (
+            self.knob_settings.encoder_midi_type
+            == constants.EncoderSettings.MIDITYPE_SENDRELENC
         )
 
+    def relative_steps(self, value: int) -> float:
+        """
+        Returns the signed number of steps a relative CC value moves the
+        encoder, with the knob's acceleration applied to fast turns.
+        """
+        acceleration = self.knob_settings.acceleration
+        return relative_steps(
+            value,
+            acceleration if acceleration is not None else DEFAULT_ACCELERATION,
+        )
+
+    def move(self, steps: float) -> tuple:
+        """
+        Moves the accumulated position of a relative encoder without storing
+        the value.
+
+        Returns:
+            (raw, mapped): the 0-127 value shown on the LED ring and the
+            full-resolution mapped value.
+        """
+        settings = self.knob_settings
+        self._position = position = advance(
+            self._position,
+            steps,
+            settings.resolution or DEFAULT_RESOLUTION,
+            bool(settings.wrap),
+        )
+        return (
+            round(position * MIDI_VALUE_MAX),
+            self._mapping.map_normalized(position),
+        )
+
+    def set_position(self, value: float) -> int:
+        """
+        Moves the accumulated position of a relative encoder to the mapped
+        value, e.g. when the host sets it.
+
+        Returns:
+            The 0-127 value to show on the LED ring.
+        """
+        self._position = self._mapping.to_normalized(value)
+        return round(self._position * MIDI_VALUE_MAX)
+
+    def update_mapped_value(self):
+        """
+        Updates the mapped value based on the current value and the min/max range.
+        """
+        self.mapped_value = self.map_value(self.value)
+
     def has_changed(self) -> bool:
         """
         Returns True if the encoder value has changed since the last check.
         """
-        changed = self.value != self._last_value
-        self._last_value = self.value
+        value = self.value  # Read once so a concurrent update is not lost
+        changed = value != self._last_value
+        self._last_value = value
         return changed
 
-    def send(self, force_all: bool):
+    def config_pairs(self) -> list:
         """
-        Sends the encoder configuration to the device.
+        Returns the (address, value) pairs of all settings that are set.
         """
-        if not self.knob_settings.is_modified() and not force_all:
-            return
-
-        config_data = []
+        pairs = []
         for setting_name, address in self._SETTING_ADDRESSES.items():
             setting_value = getattr(self.knob_settings, setting_name)
             if setting_value is not None:
-                config_data.extend([address, setting_value])
-
-        if config_data:
-            bytes_remaining = len(config_data)
-            total_parts = (
-                bytes_remaining + constants.PART_SIZE_BYTES - 1
-            ) // constants.PART_SIZE_BYTES
-            for part in range(1, total_parts + 1):
-                size = (
-                    bytes_remaining
-                    if bytes_remaining <= constants.PART_SIZE_BYTES
-                    else constants.PART_SIZE_BYTES
-                )
-                bytes_remaining -= constants.PART_SIZE_BYTES
-
-                payload = (
-                    [0xF0]
-                    + [
-                        constants.MIDI_MFR_ID_0,
-                        constants.MIDI_MFR_ID_1,
-                        constants.MIDI_MFR_ID_2,
-                    ]
-                    + [
-                        constants.SysExCommands.BULK_XFER,
-                        0x00,
-                        self._sysex_tag,
-                        part,
-                        total_parts,
-                        size,
-                    ]
-                    + config_data[:size]
-                    + [0xF7]
-                )
-                config_data = config_data[size:]
-
-                self._send_sysex(payload)
-
-        # Reset the modified flag after sending
-        self.knob_settings._is_modified = False
-
-    def _send_sysex(self, sysex: list):
+                pairs.append((address, setting_value))
+        return pairs
+
+    def compiled_config(self) -> tuple:
+        """
+        Returns the (address, value) pairs and the BULK_XFER messages of the
+        full configuration. Both are rebuilt only after a setting changed.
+        """
+        key = (self.knob_settings, self.knob_settings._version)
+        cache_key = self._sysex_cache_key
+        if (
+            cache_key is None
+            or cache_key[0] is not key[0]
+            or cache_key[1] != key[1]
+        ):
+            pairs = self.config_pairs()
+            self._sysex_cache = (pairs, build_bulk_xfer(self._sysex_tag, pairs))
+            self._sysex_cache_key = key
+        return self._sysex_cache
+
+    def seed_compiled_config(self, pairs: list, messages: list) -> bool:
+        """
+        Installs previously compiled configuration pairs and SysEx messages
+        (e.g. from a config cache) if they match the current settings.
+
+        Returns:
+            True if the compiled configuration was installed.
+        """
+        if self.config_pairs() != pairs:
+            return False
+        self._sysex_cache = (pairs, messages)
+        self._sysex_cache_key = (
+            self.knob_settings,
+            self.knob_settings._version,
+        )
+        return True
+
+    def changed_config_pairs(self) -> list:
+        """
+        Returns the (address, value) pairs that differ from what the device
+        was last sent.
+        """
+        shadow = self._device_shadow
+        return [
+            (address, value)
+            for address, value in self.compiled_config()[0]
+            if address not in shadow or shadow[address] != value
+        ]
+
+    def load_device_config(self, pairs: list, apply: bool = False):
+        """
+        Records (address, value) pairs pulled from the device as what the
+        device currently holds.
+
+        Args:
+            pairs: The pairs reported by the device.
+            apply: Also copy the values into this encoder's knob settings.
+        """
+        self._device_shadow = dict(pairs)
+        self._synced_key = None
+        if apply:
+            for address, value in pairs:
+                setting_name = self._SETTING_NAMES.get(address)
+                if setting_name is not None:
+                    setattr(self.knob_settings, setting_name, value)
+
+    def forget_device_state(self):
+        """
+        Forgets what the device was last sent, so the next send pushes every
+        setting again.
+        """
+        self._device_shadow.clear()
+        self._synced_key = None
+
+    def collect_sysex(self, force_all: bool) -> SysexUpdate | None:
+        """
+        Returns the SysEx messages that bring the device up to date, for
+        callers that transfer them separately. Pass the update to
+        commit_sysex() once the messages have been sent.
+
+        Unless force_all is set, only the settings that differ from what the
+        device was last sent are included, and None is returned when nothing
+        changed since the last committed update.
+        """
+        pairs, messages = self.compiled_config()
+        if not force_all:
+            if self._synced_key is self._sysex_cache_key:
+                return None  # Nothing changed since the last push
+            changed_pairs = self.changed_config_pairs()
+            if len(changed_pairs) != len(pairs):
+                pairs = changed_pairs
+                messages = build_bulk_xfer(self._sysex_tag, pairs)
+        return SysexUpdate(messages, pairs, self._sysex_cache_key)
+
+    def commit_sysex(self, update: SysexUpdate):
+        """
+        Records the settings of a collect_sysex() update as what the device
+        holds. Only call this once its messages have been sent, so that a
+        failed or cancelled transfer is pushed again.
+        """
+        self._device_shadow.update(update.pairs)
+        self._synced_key = update.key
+        knob_settings, version = update.key
+        if knob_settings is self.knob_settings and (
+            version == knob_settings._version
+        ):
+            # Reset the modified flag, unless it changed since collecting
+            knob_settings._is_modified = False
+
+    def send(self, force_all: bool) -> bool:
+        """
+        Sends the encoder configuration to the device.
+
+        Unless force_all is set, only the settings that differ from what the
+        device was last sent are pushed.
+
+        Returns:
+            True if anything was sent.
+        """
+        update = self.collect_sysex(force_all)
+        if update is None:
+            return False
+        for message in update.messages:
+            if not self._send_sysex(message):
+                return False  # Pushed again next time
+        self.commit_sysex(update)
+        return bool(update.messages)
+
+    def _send_sysex(self, sysex: bytes) -> bool:
         """
         Sends a SysEx message to the device.
+
+        Returns:
+            True if the message was sent.
         """
         try:
             self._midi_out.send_message(sysex)
         except Exception as e:
             print(f"Error sending SysEx message: {e}")
+            return False
+        return True
 
     def is_modified(self):
         """
@@ -0,0 +1,119 @@
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+from pymft.src.constants import constants
+
+
+class EncoderSnapshot(NamedTuple):
+    """
+    A consistent copy of every encoder's raw and mapped value.
+    """
+
+    raw: array  # array("B") of 0-127 MIDI values
+    mapped: array  # array("d") of values mapped to each knob's min/max range
+    sequence: int  # Write sequence number the copy was taken at
+
+
+class EncoderState:
+    """
+    Compact storage for the raw and mapped values of all encoders.
+
+    Writes are serialized by a lock and wrapped in a sequence counter that is
+    odd while a write is in progress (a seqlock). Readers never take the lock:
+    they copy both arrays and retry if the counter moved while copying, so the
+    MIDI reading thread is never blocked by consumers taking snapshots.
+
+    Every write that changes a raw value also sets the encoder's bit in a
+    64-bit dirty mask, which consumers claim with take_dirty().
+    """
+
+    def __init__(self, size: int = constants.Encoders.DEVICE_KNOB_NUM):
+        self._raw = array("B", bytes(size))
+        self._mapped = array("d", bytes(8 * size))
+        self._sequence = 0
+        self._dirty = 0  # Bit i is set when encoder i changed since last taken
+        self._write_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._raw)
+
+    def get_raw(self, index: int) -> int:
+        return self._raw[index]
+
+    def get_mapped(self, index: int) -> float:
+        return self._mapped[index]
+
+    def write(self, index: int, raw: int, mapped: float):
+        """
+        Stores the raw and mapped value of a single encoder.
+        """
+        with self._write_lock:
+            self._sequence += 1
+            if self._raw[index] != raw or self._mapped[index] != mapped:
+                self._dirty |= 1 << index
+            self._raw[index] = raw
+            self._mapped[index] = mapped
+            self._sequence += 1
+
+    def write_many(self, updates):
+        """
+        Stores several (index, raw, mapped) updates as one atomic write.
+        """
+        with self._write_lock:
+            self._sequence += 1
+            dirty = self._dirty
+            for index, raw, mapped in updates:
+                if self._raw[index] != raw or self._mapped[index] != mapped:
+                    dirty |= 1 << index
+                self._raw[index] = raw
+                self._mapped[index] = mapped
+            self._dirty = dirty
+            self._sequence += 1
+
+    def take_dirty(self, mask: int = -1) -> int:
+        """
+        Returns the dirty bits selected by mask and clears them in one swap.
+        """
+        with self._write_lock:
+            dirty = self._dirty & mask
+            self._dirty ^= dirty
+        return dirty
+
+    def set_raw(self, index: int, raw: int):
+        """
+        Stores only the raw value of an encoder.
+        """
+        self.write(index, raw, self._mapped[index])
+
+    def set_mapped(self, index: int, mapped: float):
+        """
+        Stores only the mapped value of an encoder.
+        """
+        self.write(index, self._raw[index], mapped)
+
+    def read(self, reader):
+        """
+        Calls reader(raw, mapped) with the live arrays until it runs without
+        an overlapping write, and returns its result. The reader must only
+        copy data out of the arrays.
+        """
+        while True:
+            sequence = self._sequence
+            if not sequence & 1:
+                result = reader(self._raw, self._mapped)
+                if self._sequence == sequence:
+                    return result
+            time.sleep(0)  # Yield so the writer can finish
+
+    def snapshot(self) -> EncoderSnapshot:
+        """
+        Returns a consistent copy of all raw and mapped values without
+        blocking writers.
+        """
+        return self.read(
+            lambda raw, mapped: EncoderSnapshot(
+                raw[:], mapped[:], self._sequence
+            )
+        )
@@ -0,0 +1,220 @@
+import collections
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+
+class OverflowPolicy(Enum):
+    """
+    What an EventQueue does with a new event when it is full.
+    """
+
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued event
+    DROP_NEWEST = "drop_newest"  # Discard the new event
+    COALESCE = "coalesce"  # Keep one queued event per encoder, the latest
+    BLOCK = "block"  # Make the reading thread wait for space
+
+
+class EventQueue:
+    """
+    Bounded queue of EncoderEvents between the reading thread and a consumer.
+
+    A slow consumer never makes the queue grow past maxsize. What happens to
+    events that do not fit is decided by the overflow policy, and every
+    discarded event is counted.
+
+    With COALESCE, a new event for an encoder that is already queued replaces
+    the queued one in place, so the queue holds at most one event per encoder
+    (and drops the oldest if it is still full).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        block_timeout: float | None = None,
+        on_close: Callable[[], None] | None = None,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of queued events.
+            policy: Overflow policy.
+            block_timeout: With BLOCK, the longest the reading thread waits
+                for space before dropping the new event. None waits forever.
+            on_close: Called once when the queue is closed.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self._maxsize = maxsize
+        self._policy = policy
+        self._block_timeout = block_timeout
+        self._on_close = on_close
+        # COALESCE keeps encoder -> event in arrival order, others a deque
+        self._events = (
+            {} if policy == OverflowPolicy.COALESCE else collections.deque()
+        )
+        self._condition = threading.Condition()
+        self._closed = False
+        self.dropped = 0  # Events discarded because the queue was full
+        self.coalesced = 0  # Events replaced by a newer one (COALESCE)
+        self.high_water = 0  # Largest number of events queued at once
+
+    def __len__(self):
+        return len(self._events)
+
+    @property
+    def policy(self) -> OverflowPolicy:
+        return self._policy
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put_many(self, events: list):
+        """
+        Queues events according to the overflow policy. Called on the reading
+        thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            if self._policy == OverflowPolicy.COALESCE:
+                self._put_coalesced(events)
+            elif self._policy == OverflowPolicy.BLOCK:
+                self._put_blocking(events)
+            else:
+                self._put_dropping(events)
+            if len(self._events) > self.high_water:
+                self.high_water = len(self._events)
+            self._condition.notify_all()
+
+    def _put_dropping(self, events: list):
+        queued = self._events
+        for event in events:
+            if len(queued) >= self._maxsize:
+                self.dropped += 1
+                if self._policy == OverflowPolicy.DROP_NEWEST:
+                    continue
+                queued.popleft()
+            queued.append(event)
+
+    def _put_coalesced(self, events: list):
+        queued = self._events
+        for event in events:
+            if event.encoder in queued:
+                self.coalesced += 1
+            elif len(queued) >= self._maxsize:
+                self.dropped += 1
+                del queued[next(iter(queued))]
+            queued[event.encoder] = event
+
+    def _put_blocking(self, events: list):
+        queued = self._events
+        deadline = (
+            time.monotonic() + self._block_timeout
+            if self._block_timeout is not None
+            else None
+        )
+        for event in events:
+            while len(queued) >= self._maxsize and not self._closed:
+                timeout = (
+                    deadline - time.monotonic()
+                    if deadline is not None
+                    else None
+                )
+                if timeout is not None and timeout <= 0:
+                    break
+                # Consumers may be waiting for the events queued so far
+                self._condition.notify_all()
+                self._condition.wait(timeout)
+            if self._closed:
+                return
+            if len(queued) >= self._maxsize:
+                self.dropped += 1
+                continue
+            queued.append(event)
+            self._condition.notify_all()
+
+    def _pop(self):
+        if self._policy == OverflowPolicy.COALESCE:
+            return self._events.pop(next(iter(self._events)))
+        return self._events.popleft()
+
+    def get(self, timeout: float | None = None):
+        """
+        Removes and returns the oldest event, waiting up to timeout seconds.
+
+        Returns:
+            The event, or None on timeout or once the queue is closed.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._events or self._closed, timeout
+            ):
+                return None
+            if not self._events:
+                return None
+            event = self._pop()
+            self._condition.notify_all()
+            return event
+
+    def get_batch(
+        self, max_events: int | None = None, timeout: float | None = None
+    ) -> list:
+        """
+        Removes and returns up to max_events queued events at once, waiting
+        up to timeout seconds for the first one.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._events or self._closed, timeout
+            )
+            count = len(self._events)
+            if max_events is not None:
+                count = min(count, max_events)
+            events = [self._pop() for _ in range(count)]
+            if events:
+                self._condition.notify_all()
+            return events
+
+    def __iter__(self):
+        """
+        Yields events until the queue is closed.
+        """
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def stats(self) -> dict:
+        """
+        Returns the queue's counters.
+        """
+        with self._condition:
+            return {
+                "size": len(self._events),
+                "maxsize": self._maxsize,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "high_water": self.high_water,
+            }
+
+    def close(self):
+        """
+        Stops accepting events and wakes every waiting consumer.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._on_close is not None:
+            self._on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, fields
+
+from pymft.src.constants import constants
+
+# Preformatted encoder names, indexed by encoder index
+ENCODER_NAMES: tuple = tuple(
+    f"ENCODER_{index + 1}"
+    for index in range(constants.Encoders.DEVICE_KNOB_NUM)
+)
+
+# Side button names such as "BANK1_LEFT1", indexed by CC number (None for
+# CCs that are not side buttons)
+SIDE_BUTTON_NAMES: tuple = tuple(
+    next(
+        (
+            field.name
+            for field in fields(constants.SystemMessages)
+            if field.default == cc
+            and ("_LEFT" in field.name or "_RIGHT" in field.name)
+        ),
+        None,
+    )
+    for cc in range(128)
+)
+
+
+@dataclass(frozen=True, slots=True)
+class EncoderEvent:
+    """
+    A change of an encoder's value.
+    """
+
+    encoder: int  # Encoder index (0-63)
+    name: str  # Encoder name as used by the value changed callback
+    value: float  # Value mapped to the knob's min/max range
+    raw: int  # Raw 0-127 MIDI value
+
+
+@dataclass(frozen=True, slots=True)
+class SwitchEvent:
+    """
+    A press or release of an encoder's push switch.
+    """
+
+    encoder: int  # Encoder index (0-63)
+    name: str  # Encoder name
+    pressed: bool
+    value: int  # Raw 0-127 MIDI value
+
+
+@dataclass(frozen=True, slots=True)
+class SideButtonEvent:
+    """
+    A press or release of one of the side buttons.
+    """
+
+    button: int  # CC number of the button (see constants.SystemMessages)
+    name: str  # Button name, e.g. "BANK1_LEFT1"
+    bank: int  # Bank the button belongs to (0-3)
+    pressed: bool
+
+
+@dataclass(frozen=True, slots=True)
+class BankChangeEvent:
+    """
+    The device switched to another bank.
+    """
+
+    bank: int  # New bank (0-3, see constants.SystemMessages.BANK1...)
+    previous_bank: int
+
+
+@dataclass(frozen=True, slots=True)
+class ShiftEncoderEvent:
+    """
+    A turn of an encoder while the shift layer is held.
+    """
+
+    encoder: int  # Encoder index (0-63)
+    name: str  # Encoder name
+    raw: int  # Raw 0-127 MIDI value
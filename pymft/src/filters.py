@@ -0,0 +1,293 @@
+import math
+import threading
+from enum import Enum
+
+from pymft.src import arrays
+from pymft.src.constants import constants
+
+
+class FilterType(Enum):
+    NONE = "none"  # Values are passed through
+    EMA = "ema"  # Exponential moving average
+    ONE_EURO = "one_euro"  # Smooths slow moves, follows fast ones closely
+    SLEW = "slew"  # Limits how fast the value can change
+
+
+# Filter type codes in the state arrays
+_NONE, _EMA, _ONE_EURO, _SLEW = range(4)
+# Number of filtered encoders from which a NumPy tick beats the Python loop
+NUMPY_MIN_ACTIVE: int = 32
+
+_CODES = {
+    FilterType.NONE: _NONE,
+    FilterType.EMA: _EMA,
+    FilterType.ONE_EURO: _ONE_EURO,
+    FilterType.SLEW: _SLEW,
+}
+
+
+def _alpha(cutoff: float, dt: float) -> float:
+    """
+    Smoothing factor of a first order low-pass filter at cutoff Hz.
+    """
+    return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+
+class FilterBank:
+    """
+    Per-encoder smoothing of values, advanced for all encoders at once.
+
+    Each encoder has its own filter (see FilterType). tick() moves every
+    filtered value towards its encoder's current value by the time elapsed
+    since the previous tick, so calling it at frame rate gives smooth
+    values even between MIDI messages. With NumPy installed and at least
+    NUMPY_MIN_ACTIVE encoders filtered, the tick is vectorized over all
+    encoders; below that a Python loop visiting the filtered ones is faster.
+
+    Rates and speeds are in spans per second, a span being the encoder's
+    min/max range (see set_span()), so one setting fits every encoder.
+    """
+
+    def __init__(
+        self,
+        size: int = constants.Encoders.DEVICE_KNOB_NUM,
+        use_numpy: bool | None = None,
+    ):
+        """
+        Args:
+            size: Number of encoders.
+            use_numpy: Vectorize ticks of many filters with NumPy. Defaults
+                to using NumPy when it is installed.
+        """
+        if use_numpy is None:
+            use_numpy = arrays.np is not None
+        elif use_numpy:
+            arrays.require_numpy()
+        self._use_numpy = use_numpy
+        self._lock = threading.Lock()
+        self._size = size
+        self._codes = [_NONE] * size
+        self._active = ()  # Indices of the filtered encoders
+        # Parameters, see set_filter()
+        self._time_constant = [1.0] * size
+        self._min_cutoff = [1.0] * size
+        self._beta = [0.0] * size
+        self._d_cutoff = [1.0] * size
+        self._rate = [1.0] * size
+        self._span = [1.0] * size
+        # Filter state: output, previous input, smoothed speed
+        self._output = [0.0] * size
+        self._previous = [0.0] * size
+        self._speed = [0.0] * size
+        self._initialized = [False] * size
+        self._last_tick = None
+        self._arrays = None  # NumPy copies of the above, built on demand
+
+    @property
+    def active(self) -> tuple:
+        """
+        The sorted indices of the encoders with a filter.
+        """
+        return self._active
+
+    def set_filter(
+        self,
+        index: int,
+        filter_type: FilterType,
+        time_constant: float = 0.05,
+        min_cutoff: float = 1.0,
+        beta: float = 0.0,
+        d_cutoff: float = 1.0,
+        rate: float = 1.0,
+    ):
+        """
+        Sets the filter of an encoder and restarts it from the next value.
+
+        Args:
+            index: The encoder index.
+            filter_type: The filter, or FilterType.NONE to remove it.
+            time_constant: EMA: seconds to cover 63% of a step.
+            min_cutoff: One-euro: cutoff frequency in Hz at rest. Lower
+                values smooth more.
+            beta: One-euro: how much the cutoff rises with speed, per span
+                per second. Higher values lag less on fast moves.
+            d_cutoff: One-euro: cutoff frequency in Hz of the speed estimate.
+            rate: Slew: largest change in spans per second.
+        """
+        if index not in range(self._size):
+            raise ValueError(f"Invalid encoder index: {index}")
+        if (
+            time_constant <= 0
+            or min_cutoff <= 0
+            or d_cutoff <= 0
+            or rate <= 0
+            or beta < 0
+        ):
+            raise ValueError("Filter parameters must be positive")
+        with self._lock:
+            self._drop_arrays()
+            self._codes[index] = _CODES[filter_type]
+            self._time_constant[index] = time_constant
+            self._min_cutoff[index] = min_cutoff
+            self._beta[index] = beta
+            self._d_cutoff[index] = d_cutoff
+            self._rate[index] = rate
+            self._initialized[index] = False
+            self._active = tuple(
+                i for i, code in enumerate(self._codes) if code != _NONE
+            )
+
+    def set_span(self, index: int, span: float):
+        """
+        Sets the size of an encoder's min/max range, the unit of the slew
+        rate and one-euro speed.
+        """
+        with self._lock:
+            self._drop_arrays()
+            self._span[index] = abs(span) or 1.0
+
+    def reset(self):
+        """
+        Restarts every filter from the next value.
+        """
+        with self._lock:
+            self._drop_arrays()
+            self._initialized = [False] * self._size
+            self._last_tick = None
+
+    def _drop_arrays(self):
+        """
+        Copies the filter state back from the NumPy arrays before a change,
+        so that they are rebuilt with it on the next tick.
+        """
+        v = self._arrays
+        if v is not None:
+            self._output = v.output.tolist()
+            self._previous = v.previous.tolist()
+            self._speed = v.speed.tolist()
+            self._initialized = v.initialized.tolist()
+            self._arrays = None
+
+    def tick(self, values, now: float) -> list:
+        """
+        Advances every filter to time now towards values.
+
+        Args:
+            values: The current value of every encoder, indexable by encoder
+                index (a sequence, array or NumPy array).
+            now: Time in seconds, e.g. time.monotonic().
+
+        Returns:
+            The filtered value of every encoder. Encoders without a filter
+            get their current value.
+        """
+        with self._lock:
+            dt = now - self._last_tick if self._last_tick is not None else 0.0
+            self._last_tick = now
+            if self._use_numpy and len(self._active) >= NUMPY_MIN_ACTIVE:
+                return self._tick_numpy(values, dt).tolist()
+            return self._tick_python(values, dt)
+
+    def _tick_python(self, values, dt: float) -> list:
+        output = self._output
+        initialized = self._initialized
+        for index in self._active:
+            x = values[index]
+            if not initialized[index]:
+                output[index] = self._previous[index] = x
+                self._speed[index] = 0.0
+                initialized[index] = True
+                continue
+            if dt <= 0:
+                self._previous[index] = x
+                continue
+            y = output[index]
+            code = self._codes[index]
+            if code == _EMA:
+                y += (1.0 - math.exp(-dt / self._time_constant[index])) * (
+                    x - y
+                )
+            elif code == _ONE_EURO:
+                speed = (x - self._previous[index]) / dt
+                self._speed[index] += _alpha(self._d_cutoff[index], dt) * (
+                    speed - self._speed[index]
+                )
+                cutoff = (
+                    self._min_cutoff[index]
+                    + self._beta[index]
+                    * abs(self._speed[index])
+                    / self._span[index]
+                )
+                y += _alpha(cutoff, dt) * (x - y)
+            else:
+                step = self._rate[index] * self._span[index] * dt
+                y += min(max(x - y, -step), step)
+            output[index] = y
+            self._previous[index] = x
+
+        result = list(values)
+        for index in self._active:
+            result[index] = output[index]
+        return result
+
+    def _build_arrays(self):
+        np = arrays.np
+        codes = np.array(self._codes, dtype=np.int8)
+        span = np.array(self._span)
+        self._arrays = _VectorState(
+            one_euro=codes == _ONE_EURO,
+            slew=codes == _SLEW,
+            passthrough=codes == _NONE,
+            active=codes != _NONE,
+            inv_time_constant=1.0 / np.array(self._time_constant),
+            min_cutoff=np.array(self._min_cutoff),
+            beta_span=np.array(self._beta) / span,
+            two_pi_d_cutoff=2.0 * np.pi * np.array(self._d_cutoff),
+            rate_span=np.array(self._rate) * span,
+            output=np.array(self._output),
+            previous=np.array(self._previous),
+            speed=np.array(self._speed),
+            initialized=np.array(self._initialized, dtype=bool),
+        )
+
+    def _tick_numpy(self, values, dt: float):
+        np = arrays.np
+        if self._arrays is None:
+            self._build_arrays()
+        v = self._arrays
+        x = np.asarray(values, dtype=np.float64)
+        y = v.output
+
+        if dt > 0:
+            delta = x - y
+            # One-euro: the cutoff follows the smoothed speed
+            speed = v.speed
+            speed += ((x - v.previous) / dt - speed) / (
+                1.0 + 1.0 / (v.two_pi_d_cutoff * dt)
+            )
+            cutoff = v.min_cutoff + v.beta_span * np.abs(speed)
+            alpha = np.where(
+                v.one_euro,
+                1.0 / (1.0 + 1.0 / (2.0 * np.pi * dt * cutoff)),
+                1.0 - np.exp(-dt * v.inv_time_constant),  # EMA
+            )
+            step = v.rate_span * dt
+            y += np.where(v.slew, np.clip(delta, -step, step), alpha * delta)
+
+        # Start filters from the current value, and pass the others through
+        restart = ~v.initialized | v.passthrough
+        np.copyto(y, x, where=restart)
+        np.copyto(v.speed, 0.0, where=restart)
+        v.initialized[:] = v.active
+        v.previous[:] = x
+        return y
+
+
+class _VectorState:
+    """
+    NumPy arrays of a FilterBank's parameters and state, one entry per
+    encoder.
+    """
+
+    def __init__(self, **arrays):
+        self.__dict__.update(arrays)
@@ -1,6 +1,8 @@
 from enum import Enum
+from typing import Callable
 
 from pymft.src.constants import constants
+from pymft.src.mapping import MappingCurve, check_curve_amount, check_steps
 
 
 class KnobSettings:
@@ -28,6 +30,17 @@ class KnobSettings:
         | None = None,  # Use values from constants.DetentColorValues
         indicator_display_type: int
         | None = None,  # Use values from constants.EncoderSettings.INDICATORTYPE_*
+        curve: MappingCurve | None = None,  # Defaults to MappingCurve.LINEAR
+        curve_amount: float
+        | None = None,  # Steepness of the LOG/EXPONENTIAL/S_CURVE curves
+        steps: int | None = None,  # Number of levels of the STEPPED curve
+        curve_function: Callable[[float], float]
+        | None = None,  # Maps 0-1 to 0-1 for the CUSTOM curve
+        resolution: int
+        | None = None,  # Steps over the min/max range in relative mode
+        acceleration: float
+        | None = None,  # Step multiplier per turn speed level in relative mode
+        wrap: bool | None = None,  # Wrap around instead of stopping at min/max
     ):
 
         # Internal setting values and modification flag
@@ -51,6 +64,16 @@ class KnobSettings:
         )
         assert self._min < self._max, "min must be less than max"
 
+        self._curve = curve
+        self._curve_amount = check_curve_amount(curve_amount)
+        self._steps = check_steps(steps)
+        self._curve_function = curve_function
+
+        # Used when encoder_midi_type is MIDITYPE_SENDRELENC
+        self._resolution = resolution
+        self._acceleration = acceleration
+        self._wrap = wrap
+
         self._movement_type = movement_type
         self._switch_action_type = switch_action_type
         self._switch_midi_channel = 2
@@ -72,6 +95,28 @@ class KnobSettings:
         )
         self._encoder_shift_midi_channel = 0
         self._is_modified = False
+        self._version = 0  # Incremented on every change
+
+    @classmethod
+    def from_fields(cls, fields: dict) -> "KnobSettings":
+        """
+        Creates a KnobSettings object from already validated attribute values
+        (as returned by vars()), skipping the constructor and setters.
+        """
+        knob_settings = cls.__new__(cls)
+        knob_settings.__dict__.update(fields)
+        return knob_settings
+
+    def update_fields(self, fields: dict):
+        """
+        Sets already validated attribute values (as returned by vars()),
+        skipping the setters. Changed values count as a single change.
+        """
+        current = self.__dict__
+        if any(current[name] != value for name, value in fields.items()):
+            current.update(fields)
+            self._is_modified = True
+            self._version += 1
 
     @property
     def knob_type(self) -> KnobType | None:
@@ -82,6 +127,7 @@ class KnobSettings:
         if self._knob_type != value:
             self._knob_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def min(self) -> float | None:
@@ -92,6 +138,7 @@ class KnobSettings:
         if self._min != value:
             self._min = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def max(self) -> float | None:
@@ -102,6 +149,86 @@ class KnobSettings:
         if self._max != value:
             self._max = value
             self._is_modified = True
+            self._version += 1
+
+    @property
+    def curve(self) -> MappingCurve | None:
+        return self._curve
+
+    @curve.setter
+    def curve(self, value: MappingCurve | None):
+        if self._curve != value:
+            self._curve = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def curve_amount(self) -> float | None:
+        return self._curve_amount
+
+    @curve_amount.setter
+    def curve_amount(self, value: float | None):
+        check_curve_amount(value)
+        if self._curve_amount != value:
+            self._curve_amount = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def steps(self) -> int | None:
+        return self._steps
+
+    @steps.setter
+    def steps(self, value: int | None):
+        check_steps(value)
+        if self._steps != value:
+            self._steps = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def curve_function(self) -> Callable[[float], float] | None:
+        return self._curve_function
+
+    @curve_function.setter
+    def curve_function(self, value: Callable[[float], float] | None):
+        if self._curve_function != value:
+            self._curve_function = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def resolution(self) -> int | None:
+        return self._resolution
+
+    @resolution.setter
+    def resolution(self, value: int | None):
+        if self._resolution != value:
+            self._resolution = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def acceleration(self) -> float | None:
+        return self._acceleration
+
+    @acceleration.setter
+    def acceleration(self, value: float | None):
+        if self._acceleration != value:
+            self._acceleration = value
+            self._is_modified = True
+            self._version += 1
+
+    @property
+    def wrap(self) -> bool | None:
+        return self._wrap
+
+    @wrap.setter
+    def wrap(self, value: bool | None):
+        if self._wrap != value:
+            self._wrap = value
+            self._is_modified = True
+            self._version += 1
 
     # Properties for accessing and setting values
     @property
@@ -113,6 +240,7 @@ class KnobSettings:
         if self._detent != value:
             self._detent = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def movement_type(self) -> int | None:
@@ -123,6 +251,7 @@ class KnobSettings:
         if self._movement_type != value:
             self._movement_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def switch_action_type(self) -> int | None:
@@ -133,6 +262,7 @@ class KnobSettings:
         if self._switch_action_type != value:
             self._switch_action_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def switch_midi_channel(self) -> int | None:
@@ -143,6 +273,7 @@ class KnobSettings:
         if self._switch_midi_channel != value:
             self._switch_midi_channel = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def switch_midi_number(self) -> int | None:
@@ -153,6 +284,7 @@ class KnobSettings:
         if self._switch_midi_number != value:
             self._switch_midi_number = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def switch_midi_type(self) -> int | None:
@@ -163,6 +295,7 @@ class KnobSettings:
         if self._switch_midi_type != value:
             self._switch_midi_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def encoder_midi_channel(self) -> int | None:
@@ -173,6 +306,7 @@ class KnobSettings:
         if self._encoder_midi_channel != value:
             self._encoder_midi_channel = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def encoder_midi_number(self) -> int | None:
@@ -183,6 +317,7 @@ class KnobSettings:
         if self._encoder_midi_number != value:
             self._encoder_midi_number = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def encoder_midi_type(self) -> int | None:
@@ -193,6 +328,7 @@ class KnobSettings:
         if self._encoder_midi_type != value:
             self._encoder_midi_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def active_color(self) -> int | None:
@@ -203,6 +339,7 @@ class KnobSettings:
         if self._active_color != value:
             self._active_color = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def inactive_color(self) -> int | None:
@@ -213,6 +350,7 @@ class KnobSettings:
         if self._inactive_color != value:
             self._inactive_color = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def detent_color(self) -> int | None:
@@ -223,6 +361,7 @@ class KnobSettings:
         if self._detent_color != value:
             self._detent_color = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def indicator_display_type(self) -> int | None:
@@ -233,6 +372,7 @@ class KnobSettings:
         if self._indicator_display_type != value:
             self._indicator_display_type = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def is_super_knob(self) -> bool | None:
@@ -243,6 +383,7 @@ class KnobSettings:
         if self._is_super_knob != value:
             self._is_super_knob = value
             self._is_modified = True
+            self._version += 1
 
     @property
     def encoder_shift_midi_channel(self) -> int | None:
@@ -253,6 +394,7 @@ class KnobSettings:
         if self._encoder_shift_midi_channel != value:
             self._encoder_shift_midi_channel = value
             self._is_modified = True
+            self._version += 1
 
     def is_modified(self) -> bool:
         """
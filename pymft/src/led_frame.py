@@ -0,0 +1,244 @@
+import collections
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from pymft.src.constants import constants
+from pymft.src.output_writer import OutputWriter
+
+
+def _unset() -> list:
+    return [None] * constants.Encoders.DEVICE_KNOB_NUM
+
+
+@dataclass
+class LedFrame:
+    """
+    The LED state of all 64 encoders, shown with LedEngine.show().
+
+    Each layer holds one 0-127 MIDI value per encoder, or None to leave that
+    LED as it is:
+        color: RGB hue (see constants.ColorValues).
+        ring: Indicator ring value.
+        animation: RGB or indicator animation (see constants.AnimationValues).
+        rgb_brightness: RGB_BRIGHTNESS_OFF (17) to RGB_BRIGHTNESS_MAX (47).
+        indicator_brightness: INDICATOR_BRIGHTNESS_OFF (65) to
+            INDICATOR_BRIGHTNESS_MAX (95).
+    """
+
+    color: list = field(default_factory=_unset)
+    ring: list = field(default_factory=_unset)
+    animation: list = field(default_factory=_unset)
+    rgb_brightness: list = field(default_factory=_unset)
+    indicator_brightness: list = field(default_factory=_unset)
+
+    @classmethod
+    def filled(cls, **values) -> "LedFrame":
+        """
+        Returns a frame giving every encoder the same values, e.g.
+        LedFrame.filled(color=constants.ColorValues.BLUE).
+        """
+        frame = cls()
+        for encoder in range(constants.Encoders.DEVICE_KNOB_NUM):
+            frame.set(encoder, **values)
+        return frame
+
+    def set(
+        self,
+        encoder: int,
+        color: int = None,
+        ring: int = None,
+        animation: int = None,
+        rgb_brightness: int = None,
+        indicator_brightness: int = None,
+    ) -> "LedFrame":
+        """
+        Sets the given layers of one encoder. Layers passed as None are left
+        unchanged.
+
+        Returns:
+            The frame, so calls can be chained.
+        """
+        if encoder not in range(constants.Encoders.DEVICE_KNOB_NUM):
+            raise ValueError("Invalid encoder index. Valid range is 0-63")
+        for name, value in (
+            ("color", color),
+            ("ring", ring),
+            ("animation", animation),
+            ("rgb_brightness", rgb_brightness),
+            ("indicator_brightness", indicator_brightness),
+        ):
+            if value is None:
+                continue
+            if value not in range(128):
+                raise ValueError(f"Invalid {name} value: {value}")
+            getattr(self, name)[encoder] = value
+        return self
+
+    def copy(self) -> "LedFrame":
+        return LedFrame(*(list(getattr(self, name)) for name, _, _ in _LAYERS))
+
+
+# Layer name, MIDI channel, output slot. Animation and the two brightnesses
+# share the CC of their encoder on the animation channel, but are separate
+# device states.
+_LAYERS: tuple = (
+    ("color", constants.MidiChannels.SWITCH_AND_COLOR, 0),
+    ("ring", constants.MidiChannels.ROTARY_ENCODER, 0),
+    ("animation", constants.MidiChannels.ANIMATIONS_AND_BRIGHTNESS, 0),
+    ("rgb_brightness", constants.MidiChannels.ANIMATIONS_AND_BRIGHTNESS, 1),
+    (
+        "indicator_brightness",
+        constants.MidiChannels.ANIMATIONS_AND_BRIGHTNESS,
+        2,
+    ),
+)
+# Ring value batches queued by update_rings() before they are folded into the
+# frame without waiting for the next show()
+_MAX_RING_UPDATES: int = 256
+
+
+class LedEngine:
+    """
+    Shows LedFrames on the device.
+
+    Each frame is compared with the previous one and only the values that
+    changed are queued. They are sent by a writer thread of its own, within a
+    messages per second budget separate from set_encoder_value()'s. When
+    frames change faster than the budget allows, only the latest value of
+    each LED is sent.
+
+    Ring values are the encoder values, so they can be sent through the
+    writer of set_encoder_value() instead (see ring_writer). Ring values
+    shown by other means are recorded with update_rings().
+    """
+
+    def __init__(
+        self,
+        send_message: Callable[[list], None],
+        max_rate: float | None = 500.0,
+        ring_writer: OutputWriter = None,
+    ):
+        """
+        Args:
+            send_message: Function sending a raw MIDI message to the device.
+            max_rate: Maximum number of LED messages sent per second, or None
+                for no limit.
+            ring_writer: Writer sending the ring layer, so that it shares one
+                record of what the device shows with the other writes of the
+                encoder values. Defaults to the engine's own writer.
+        """
+        self._writer = OutputWriter(send_message, max_rate)
+        self._ring_writer = ring_writer or self._writer
+        self._lock = threading.Lock()
+        self._frame = LedFrame()  # Last frame shown
+        # Batches of ring values passed to update_rings() and not yet folded
+        # into the frame
+        self._ring_updates = collections.deque()
+
+    @property
+    def frame(self) -> LedFrame:
+        """
+        A copy of the last frame shown, with the ring values recorded since.
+        """
+        with self._lock:
+            self._fold_ring_updates()
+            return self._frame.copy()
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of LED values replaced by a newer one before being sent,
+        or skipped because the device already shows them.
+        """
+        return self._writer.dropped
+
+    def show(self, frame: LedFrame) -> int:
+        """
+        Queues the values of frame that differ from the last frame shown.
+
+        Returns:
+            The number of values queued.
+        """
+        changes = []
+        ring_changes = []
+        layers = []
+        with self._lock:
+            self._fold_ring_updates()
+            previous = self._frame
+            for name, channel, slot in _LAYERS:
+                values = getattr(frame, name)
+                shown = getattr(previous, name)
+                if values == shown:
+                    layers.append(shown)
+                    continue
+                layer_changes = ring_changes if name == "ring" else changes
+                merged = list(shown)
+                for encoder, value in enumerate(values):
+                    if value is not None and value != shown[encoder]:
+                        layer_changes.append((channel, encoder, value, slot))
+                        merged[encoder] = value
+                layers.append(merged)
+            self._frame = LedFrame(*layers)
+            # Queued under the lock so that update_rings() cannot record a
+            # ring value in between and have it overwritten
+            if ring_changes:
+                self._ring_writer.write_many(ring_changes)
+        if changes:
+            self._writer.write_many(changes)
+        return len(changes) + len(ring_changes)
+
+    def update_rings(self, values):
+        """
+        Records ring values shown by other means, such as knob turns or
+        set_encoder_value(), so that the next frame is compared against them.
+
+        This is called on the input thread for every batch of knob turns, so
+        it only queues the values without taking the lock. They are folded
+        into the frame when it is next shown or read.
+
+        Args:
+            values: Sequence of (encoder, ring value, ...) tuples. Items after
+                the ring value are ignored.
+        """
+        self._ring_updates.append(values)
+        if len(self._ring_updates) > _MAX_RING_UPDATES:
+            with self._lock:
+                self._fold_ring_updates()
+
+    def _fold_ring_updates(self):
+        """
+        Applies the ring values queued by update_rings() to the frame, in the
+        order they were recorded. Must be called with the lock held.
+        """
+        updates = self._ring_updates
+        ring = self._frame.ring
+        # Batches queued while folding are left for the next fold
+        for _ in range(len(updates)):
+            for update in updates.popleft():
+                ring[update[0]] = update[1]
+
+    def forget_device_state(self):
+        """
+        Forgets what the device shows, e.g. after a reconnect, so the next
+        frame is sent in full.
+        """
+        with self._lock:
+            self._ring_updates.clear()
+            self._frame = LedFrame()
+        self._writer.forget_device_values()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every queued LED value has been sent.
+
+        Returns:
+            True if everything was sent before the timeout.
+        """
+        return self._writer.flush(timeout)
+
+    def close(self):
+        """
+        Sends the values still queued and stops the writer thread.
+        """
+        self._writer.close()
@@ -0,0 +1,275 @@
+import threading
+import traceback
+from typing import Callable, NamedTuple
+
+from pymft.src.constants import constants
+from pymft.src.knob_settings import KnobSettings
+from pymft.src.pymft import MidiFighterTwister
+from pymft.src.transport import RtMidiTransport, Transport
+
+
+class EncoderAddress(NamedTuple):
+    """
+    Address of an encoder across every managed device.
+    """
+
+    device: str  # Identity of the device (see MidiFighterTwister.identity)
+    encoder: int  # Encoder index on that device (0-63)
+
+
+class TwisterManager:
+    """
+    Manages every connected Midi Fighter Twister.
+
+    Devices are identified by their port name (see
+    MidiFighterTwister.identity) and their encoders are addressed as
+    (device, encoder), where device is an identity or an index in discovery
+    order. The input of all devices is handled by a single reactor thread
+    that sleeps until one of them delivers messages.
+
+        with TwisterManager() as manager:
+            manager.discover()
+            manager.subscribe((0, 0), KnobSettings())
+            manager.configure()
+            manager.start()
+    """
+
+    def __init__(
+        self,
+        max_output_rate: float | None = 1000.0,
+        callback_workers: int | None = None,
+        transport_factory: Callable[[], Transport] = RtMidiTransport,
+        collect_stats: bool = False,
+        max_led_rate: float | None = 500.0,
+    ):
+        """
+        Args:
+            max_output_rate: Per device, see MidiFighterTwister.
+            callback_workers: Per device, see MidiFighterTwister.
+            transport_factory: Creates the transport of each device.
+            collect_stats: Per device, see MidiFighterTwister.stats().
+            max_led_rate: Per device, see MidiFighterTwister.
+        """
+        self._max_output_rate = max_output_rate
+        self._callback_workers = callback_workers
+        self._transport_factory = transport_factory
+        self._collect_stats = collect_stats
+        self._max_led_rate = max_led_rate
+        self._devices = {}  # identity -> MidiFighterTwister, discovery order
+        self._serviced = ()  # Devices handled by the reactor thread
+        self._messages_available = threading.Event()
+        self._reactor_thread = None
+        self._reactor_active = False
+        self._coalesce = True
+
+    def discover(self) -> int:
+        """
+        Opens every connected Midi Fighter Twister not opened yet. Once
+        started, the input of new devices is handled right away.
+
+        Returns:
+            The number of managed devices.
+        """
+        scanner = self._transport_factory()
+        try:
+            identities = scanner.list_devices()
+        finally:
+            scanner.close()
+
+        added = []
+        for identity in identities:
+            if identity in self._devices:
+                continue
+            mft = MidiFighterTwister(
+                identity,
+                self._max_output_rate,
+                self._callback_workers,
+                self._transport_factory(),
+                self._collect_stats,
+                self._max_led_rate,
+            )
+            if mft.discover():
+                self._devices[identity] = mft
+                added.append(mft)
+            else:
+                print(f"Could not open device: {identity}")
+
+        if added and self._reactor_thread is not None:
+            for mft in added:
+                mft._start_shared_input(
+                    self._messages_available, self._coalesce
+                )
+            self._serviced = tuple(self._devices.values())
+            # Handle what the new devices sent before they were serviced
+            self._messages_available.set()
+        return len(self._devices)
+
+    @property
+    def identities(self) -> tuple:
+        """
+        Identities of the managed devices, in discovery order.
+        """
+        return tuple(self._devices)
+
+    @property
+    def devices(self) -> tuple:
+        """
+        The managed devices, in discovery order.
+        """
+        return tuple(self._devices.values())
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def __getitem__(self, device: int | str) -> MidiFighterTwister:
+        """
+        Returns a device by identity or by index in discovery order.
+        """
+        if isinstance(device, int):
+            return self.devices[device]
+        return self._devices[device]
+
+    def address(self, address) -> EncoderAddress:
+        """
+        Resolves a (device, encoder) pair, with device given as an identity
+        or an index, to an EncoderAddress.
+        """
+        device, encoder = address
+        if isinstance(device, int):
+            device = self.identities[device]
+        elif device not in self._devices:
+            raise KeyError(f"Unknown device: {device}")
+        if encoder not in range(constants.Encoders.DEVICE_KNOB_NUM):
+            raise ValueError("Invalid encoder index. Valid range is 0-63")
+        return EncoderAddress(device, encoder)
+
+    def subscribe(self, address, knob_settings: KnobSettings):
+        """
+        Subscribes to the encoder at a (device, encoder) address.
+        """
+        device, encoder = self.address(address)
+        self._devices[device].subscribe(encoder, knob_settings)
+
+    def on_change(self, target, handler=None):
+        """
+        Registers a handler called with (EncoderAddress, encoder name, value)
+        when the target encoders change.
+
+        Args:
+            target: A (device, encoder) address, or (device, encoders) with
+                encoders being anything MidiFighterTwister.on_change()
+                accepts, e.g. a bank.
+            handler: The function to call. Can be omitted to use on_change()
+                as a decorator.
+        """
+        if handler is None:
+            return lambda handler: self.on_change(target, handler)
+        device, encoders = target
+        if isinstance(device, int):
+            device = self.identities[device]
+
+        def device_handler(encoder: int, name: str, value: float):
+            handler(EncoderAddress(device, encoder), name, value)
+
+        self._devices[device].on_change(encoders, device_handler)
+        return handler
+
+    def set_encoder_value(self, address, value: float):
+        """
+        Sets the value of the encoder at a (device, encoder) address.
+        """
+        device, encoder = self.address(address)
+        self._devices[device].set_encoder_value(encoder, value)
+
+    def read_all(self) -> dict:
+        """
+        Returns the current values of all encoders of all devices, keyed by
+        EncoderAddress.
+        """
+        return {
+            EncoderAddress(identity, encoder): value
+            for identity, mft in self._devices.items()
+            for encoder, value in mft.read_all().items()
+        }
+
+    def read_all_changed(self) -> dict:
+        """
+        Returns the values of the encoders that have changed since the last
+        read, keyed by EncoderAddress.
+        """
+        return {
+            EncoderAddress(identity, encoder): value
+            for identity, mft in self._devices.items()
+            for encoder, value in mft.read_all_changed().items()
+        }
+
+    def configure(self, force_all: bool = False, wait: bool = True) -> list:
+        """
+        Sends the configuration of every device. The transfers run in
+        parallel, one per device.
+
+        Returns:
+            A Future per device, in discovery order.
+        """
+        futures = [
+            mft.configure(force_all=force_all, wait=False)
+            for mft in self._devices.values()
+        ]
+        if wait:
+            for future in futures:
+                future.result()
+        return futures
+
+    def start(self, coalesce: bool = True):
+        """
+        Starts handling the input of every device on the reactor thread.
+        """
+        if self._reactor_thread is not None:
+            return
+        self._messages_available.clear()
+        self._coalesce = coalesce
+        for mft in self._devices.values():
+            mft._start_shared_input(self._messages_available, coalesce)
+        self._serviced = tuple(self._devices.values())
+        self._reactor_active = True
+        self._reactor_thread = threading.Thread(target=self._reactor_loop)
+        self._reactor_thread.daemon = True
+        self._reactor_thread.start()
+
+    def _reactor_loop(self):
+        """
+        Sleeps until any device delivers messages, then handles the messages
+        queued by every device.
+        """
+        while self._reactor_active:
+            self._messages_available.wait()
+            self._messages_available.clear()
+            # Read on every wakeup, as discover() may add devices
+            for mft in self._serviced:
+                try:
+                    mft._handle_pending_messages()
+                except Exception as e:
+                    print(traceback.format_exc())
+
+    def close(self):
+        """
+        Stops the reactor thread and closes every device.
+        """
+        self._reactor_active = False
+        self._messages_available.set()
+        if self._reactor_thread is not None:
+            self._reactor_thread.join()
+            self._reactor_thread = None
+        for mft in self._devices.values():
+            mft.close()
+        self._devices.clear()
+        self._serviced = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,236 @@
+import math
+import operator
+from bisect import bisect_left
+from enum import Enum
+from typing import Callable
+
+MIDI_VALUE_COUNT: int = 128  # Number of raw values an encoder can send
+MIDI_VALUE_MAX: int = MIDI_VALUE_COUNT - 1
+
+
+class MappingCurve(Enum):
+    """
+    Shapes used to map a raw encoder value to a knob's min/max range.
+    """
+
+    LINEAR = "linear"
+    LOG = "log"  # Fast rise at the start of the range, flattens at the end
+    EXPONENTIAL = "exponential"  # Flat at the start, fast rise at the end
+    S_CURVE = "s_curve"  # Fine control at both ends, fast in the middle
+    STEPPED = "stepped"  # Quantized into a fixed number of steps
+    CUSTOM = "custom"  # User supplied function
+
+
+DEFAULT_CURVE_AMOUNT: float = 4.0  # Steepness of the LOG/EXP/S_CURVE shapes
+DEFAULT_STEPS: int = 8  # Number of levels of the STEPPED shape
+MAX_CACHED_TABLES: int = 1024  # Compiled tables kept by compile_mapping()
+
+# mapping_inputs() -> MappingTable, shared by every encoder with equal inputs
+_compiled_tables = {}
+
+
+def check_curve_amount(amount: float | None) -> float | None:
+    """
+    Returns amount if it is a valid curve_amount (positive or None).
+    """
+    if amount is not None and not amount > 0:
+        raise ValueError(f"curve_amount must be positive: {amount}")
+    return amount
+
+
+def check_steps(steps: int | None) -> int | None:
+    """
+    Returns steps if it is a valid number of steps (at least 2 or None).
+    """
+    if steps is not None and steps < 2:
+        raise ValueError(f"A stepped curve needs at least 2 steps: {steps}")
+    return steps
+
+
+def _linear(t: float) -> float:
+    return t
+
+
+def _log_shape(amount: float) -> Callable[[float], float]:
+    check_curve_amount(amount)
+    scale = math.log1p(amount)
+    return lambda t: math.log1p(amount * t) / scale
+
+
+def _exponential_shape(amount: float) -> Callable[[float], float]:
+    check_curve_amount(amount)
+    scale = math.expm1(amount)
+    return lambda t: math.expm1(amount * t) / scale
+
+
+def _s_curve_shape(amount: float) -> Callable[[float], float]:
+    check_curve_amount(amount)
+    scale = math.tanh(amount / 2)
+    return lambda t: (math.tanh(amount * (t - 0.5)) / scale + 1) / 2
+
+
+def _stepped_shape(steps: int) -> Callable[[float], float]:
+    check_steps(steps)
+    return lambda t: min(int(t * steps), steps - 1) / (steps - 1)
+
+
+def get_curve_shape(
+    curve: MappingCurve | None,
+    curve_amount: float | None = None,
+    steps: int | None = None,
+    curve_function: Callable[[float], float] | None = None,
+) -> Callable[[float], float]:
+    """
+    Returns the function mapping a normalized 0-1 input to a normalized 0-1
+    output for the given curve.
+    """
+    amount = curve_amount if curve_amount is not None else DEFAULT_CURVE_AMOUNT
+    if curve is None or curve == MappingCurve.LINEAR:
+        return _linear
+    if curve == MappingCurve.LOG:
+        return _log_shape(amount)
+    if curve == MappingCurve.EXPONENTIAL:
+        return _exponential_shape(amount)
+    if curve == MappingCurve.S_CURVE:
+        return _s_curve_shape(amount)
+    if curve == MappingCurve.STEPPED:
+        return _stepped_shape(steps if steps is not None else DEFAULT_STEPS)
+    if curve == MappingCurve.CUSTOM:
+        if curve_function is None:
+            raise ValueError("A custom curve needs a curve_function")
+        return curve_function
+    raise ValueError(f"Invalid mapping curve: {curve}")
+
+
+class MappingTable:
+    """
+    Precomputed lookup table mapping the 128 raw encoder values to a knob's
+    min/max range, plus the inverse mapping used when setting values.
+    """
+
+    def __init__(
+        self,
+        min_value: float,
+        max_value: float,
+        shape: Callable[[float], float] = _linear,
+        values: tuple = None,
+    ):
+        """
+        Args:
+            min_value: Mapped value of raw 0.
+            max_value: Mapped value of raw 127.
+            shape: Curve from get_curve_shape().
+            values: The 128 mapped values if already known (e.g. from a
+                config cache), skipping their computation.
+        """
+        self.min = min_value
+        self.max = max_value
+        self._shape = shape
+        if values is None:
+            values = tuple(
+                self.map_normalized(raw / MIDI_VALUE_MAX)
+                for raw in range(MIDI_VALUE_COUNT)
+            )
+        elif len(values) != MIDI_VALUE_COUNT:
+            raise ValueError(f"A mapping table has {MIDI_VALUE_COUNT} values")
+        self.values = tuple(values)
+        # Monotonic tables are inverted with a binary search, others need a
+        # full search
+        self._is_monotonic = all(map(operator.le, self.values, self.values[1:]))
+
+    def __getitem__(self, raw: int) -> float:
+        return self.values[raw]
+
+    def map_normalized(self, normalized_value: float) -> float:
+        """
+        Maps a normalized 0-1 input through the curve to the min/max range.
+        """
+        return self._shape(normalized_value) * (self.max - self.min) + self.min
+
+    def to_normalized(self, value: float) -> float:
+        """
+        Returns the normalized 0-1 input whose mapped value is closest to
+        value, at a finer resolution than to_raw().
+        """
+        if not self._is_monotonic:
+            return self.to_raw(value) / MIDI_VALUE_MAX
+
+        low, high = 0.0, 1.0
+        for _ in range(40):  # Well below float resolution of the range
+            middle = (low + high) / 2
+            if self.map_normalized(middle) < value:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def to_raw(self, value: float) -> int:
+        """
+        Returns the raw 0-127 value whose mapped value is closest to value.
+        """
+        if not self._is_monotonic:
+            return min(
+                range(MIDI_VALUE_COUNT),
+                key=lambda raw: abs(self.values[raw] - value),
+            )
+
+        index = bisect_left(self.values, value)
+        if index == 0:
+            return 0
+        if index == MIDI_VALUE_COUNT:
+            return MIDI_VALUE_MAX
+        # Pick the closer neighbour, preferring the exact or lower entry
+        if value - self.values[index - 1] <= self.values[index] - value:
+            index -= 1
+            # Walk back to the first raw value of a flat (stepped) segment
+            while index > 0 and self.values[index - 1] == self.values[index]:
+                index -= 1
+        return index
+
+
+def mapping_inputs(knob_settings) -> tuple:
+    """
+    Returns the settings a compiled mapping table depends on.
+    """
+    return (
+        knob_settings.min,
+        knob_settings.max,
+        knob_settings.curve,
+        knob_settings.curve_amount,
+        knob_settings.steps,
+        knob_settings.curve_function,
+    )
+
+
+def compile_mapping(knob_settings, values: tuple = None) -> MappingTable:
+    """
+    Compiles the mapping settings of a KnobSettings object into a table.
+    Tables are immutable and memoized on mapping_inputs(), so settings that
+    map alike share one table and it is only computed once.
+
+    Args:
+        knob_settings: The settings to compile.
+        values: The table values already compiled for equal mapping_inputs(),
+            e.g. by a config cache.
+    """
+    key = mapping_inputs(knob_settings)
+    try:
+        table = _compiled_tables.get(key)
+    except TypeError:  # An unhashable curve_function is never memoized
+        key = table = None
+    if table is not None:
+        return table
+
+    shape = get_curve_shape(
+        knob_settings.curve,
+        knob_settings.curve_amount,
+        knob_settings.steps,
+        knob_settings.curve_function,
+    )
+    table = MappingTable(knob_settings.min, knob_settings.max, shape, values)
+    if key is not None:
+        if len(_compiled_tables) >= MAX_CACHED_TABLES:
+            # Evict the oldest table
+            del _compiled_tables[next(iter(_compiled_tables))]
+        _compiled_tables[key] = table
+    return table
@@ -0,0 +1,182 @@
+import threading
+import time
+import traceback
+from typing import Callable
+
+
+class OutputWriter:
+    """
+    Sends control change messages to the device from a background thread.
+
+    Writes return immediately. Only the latest value of each (channel, cc) is
+    kept, values equal to what the device already shows are dropped, and
+    messages are paced to at most max_rate per second.
+
+    Controls that share a CC number but hold separate device state, such as
+    an encoder's brightness and animation, are written to different slots so
+    that one does not replace the other.
+    """
+
+    def __init__(
+        self,
+        send_message: Callable[[list], None],
+        max_rate: float | None = 1000.0,
+    ):
+        """
+        Args:
+            send_message: Function sending a raw MIDI message to the device.
+            max_rate: Maximum number of messages sent per second, or None to
+                send as fast as possible.
+        """
+        self._send_message = send_message
+        self._interval = 1.0 / max_rate if max_rate else 0.0
+        self._pending = {}  # (channel, cc, slot) -> value, oldest first
+        self._device_values = {}  # (channel, cc, slot) -> last value sent/seen
+        self._condition = threading.Condition()
+        self._thread = None
+        self._active = False
+        self.dropped = 0  # Writes replaced by a newer value or skipped
+
+    def write(self, channel: int, cc: int, value: int, slot: int = 0):
+        """
+        Queues a control change message, replacing any pending value for the
+        same control and slot.
+        """
+        key = (channel, cc, slot)
+        with self._condition:
+            if key in self._pending:
+                self.dropped += 1  # Replaced before being sent
+            if self._device_values.get(key) == value:
+                self._pending.pop(key, None)
+                self.dropped += 1
+                return
+            self._pending[key] = value
+            if self._thread is None:
+                self._start()
+            self._condition.notify_all()
+
+    def write_many(self, messages: list):
+        """
+        Queues (channel, cc, value, slot) control changes under one lock, as
+        write() does for each.
+        """
+        with self._condition:
+            pending = self._pending
+            device_values = self._device_values
+            for channel, cc, value, slot in messages:
+                key = (channel, cc, slot)
+                if key in pending:
+                    self.dropped += 1  # Replaced before being sent
+                if device_values.get(key) == value:
+                    pending.pop(key, None)
+                    self.dropped += 1
+                    continue
+                pending[key] = value
+            if pending:
+                if self._thread is None:
+                    self._start()
+                self._condition.notify_all()
+
+    def update_device_value(
+        self, channel: int, cc: int, value: int, slot: int = 0
+    ):
+        """
+        Records a value the device reported on its own (e.g. a knob turn), so
+        later writes are compared against what the device actually shows.
+        """
+        key = (channel, cc, slot)
+        with self._condition:
+            self._device_values[key] = value
+            if self._pending.get(key) == value:
+                del self._pending[key]
+                self._condition.notify_all()
+
+    def update_device_values(self, values: list):
+        """
+        Records (channel, cc, value, slot) values the device reported on its
+        own under one lock, as update_device_value() does for each.
+        """
+        with self._condition:
+            device_values = self._device_values
+            pending = self._pending
+            for channel, cc, value, slot in values:
+                key = (channel, cc, slot)
+                device_values[key] = value
+                if pending and pending.get(key) == value:
+                    del pending[key]
+                    self._condition.notify_all()
+
+    def forget_device_values(self):
+        """
+        Forgets what the device shows, e.g. after a reconnect, so the next
+        write of every control is sent.
+        """
+        with self._condition:
+            self._device_values.clear()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until all pending messages have been sent.
+
+        Returns:
+            True if the queue was emptied before the timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending, timeout=timeout
+            )
+
+    def close(self, timeout: float | None = 1.0):
+        """
+        Sends the remaining messages and stops the writer thread.
+        """
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        with self._condition:
+            self._active = False
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        self._active = True
+        self._thread = threading.Thread(target=self._write_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _write_loop(self):
+        """
+        Sends pending messages one at a time, no faster than the rate limit.
+        """
+        next_send_time = time.monotonic()
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._pending or not self._active
+                )
+                if not self._active:
+                    return
+
+            # Wait for the next slot before picking the message, so writes
+            # arriving in the meantime still replace it
+            delay = next_send_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self._condition:
+                if not self._pending:
+                    continue
+                key = next(iter(self._pending))
+                value = self._pending.pop(key)
+                self._device_values[key] = value
+                self._condition.notify_all()
+
+            channel, cc, _ = key
+            try:
+                self._send_message([0xB0 + channel, cc, value])
+            except Exception as e:
+                print(traceback.format_exc())
+            next_send_time = max(next_send_time, time.monotonic()) + (
+                self._interval
+            )
@@ -0,0 +1,60 @@
+import re
+from typing import NamedTuple
+
+# Client and port numbers some backends (ALSA) append to port names. They
+# change when the device is replugged, so they are not part of its identity.
+_PORT_NUMBERS = re.compile(r"\s+\d+:\d+$")
+
+
+class DevicePorts(NamedTuple):
+    """
+    The MIDI ports of one connected device.
+    """
+
+    identity: str  # Stable name of the device
+    input_port: int  # Index of its input port
+    output_port: int  # Index of its output port
+
+
+def port_identity(port_name: str) -> str:
+    """
+    Returns the name of a port without the numbers the backend appends.
+    """
+    return _PORT_NUMBERS.sub("", port_name)
+
+
+def _matching_ports(midi_io, device_name: str) -> list:
+    """
+    Returns the (index, identity) of the ports whose name contains
+    device_name, in port order.
+    """
+    return [
+        (i, port_identity(midi_io.get_port_name(i)))
+        for i in range(midi_io.get_port_count())
+        if device_name in midi_io.get_port_name(i)
+    ]
+
+
+def find_devices(midi_in, midi_out, device_name: str) -> list:
+    """
+    Lists every connected device whose port names contain device_name.
+
+    The n-th matching input port is paired with the n-th matching output port.
+    Devices sharing a port name (several identical units) are told apart by
+    a " #2", " #3"... suffix in port order. The backend decides that order,
+    so after a replug or reboot identical units may swap identities: tell
+    them apart by their configuration or position instead when it matters.
+
+    Returns:
+        A list of DevicePorts.
+    """
+    inputs = _matching_ports(midi_in, device_name)
+    outputs = _matching_ports(midi_out, device_name)
+    devices = []
+    seen = {}
+    for (input_port, identity), (output_port, _) in zip(inputs, outputs):
+        seen[identity] = seen.get(identity, 0) + 1
+        if seen[identity] > 1:
+            identity = f"{identity} #{seen[identity]}"
+        devices.append(DevicePorts(identity, input_port, output_port))
+    return devices
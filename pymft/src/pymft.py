@@ -1,12 +1,42 @@
+import collections
+import dataclasses
 import json
 import threading
+import time
 import traceback
+from concurrent.futures import Future
+from enum import Enum
 
-import rtmidi
-
+from pymft.src import config_cache
+from pymft.src.arrays import read_state_array
 from pymft.src.config import Config
 from pymft.src.constants import constants
+from pymft.src.dispatcher import CallbackDispatcher
+from pymft.src.encoder_state import EncoderSnapshot
+from pymft.src.event_queue import EventQueue, OverflowPolicy
+from pymft.src.events import (
+    ENCODER_NAMES,
+    SIDE_BUTTON_NAMES,
+    BankChangeEvent,
+    EncoderEvent,
+    ShiftEncoderEvent,
+    SideButtonEvent,
+    SwitchEvent,
+)
+from pymft.src.filters import FilterBank, FilterType
 from pymft.src.knob_settings import KnobSettings
+from pymft.src.led_frame import LedEngine, LedFrame
+from pymft.src.mapping import MappingCurve, mapping_inputs
+from pymft.src.output_writer import OutputWriter
+from pymft.src.recorder import Recording, replay
+from pymft.src.stats import Stats
+from pymft.src.sysex import SYSEX_START
+from pymft.src.transport import RtMidiTransport, Transport
+
+# Status bytes of channel voice messages, before adding the channel
+NOTE_OFF: int = 0x80
+NOTE_ON: int = 0x90
+CONTROL_CHANGE: int = 0xB0
 
 
 class MidiFighterTwister:
@@ -14,61 +44,135 @@ class MidiFighterTwister:
     Represents a Midi Fighter Twister device.
     """
 
-    def __init__(self, device_id: int = None):
-        self._midi_in = rtmidi.MidiIn()
-        self._midi_out = rtmidi.MidiOut()
-        self._device_name = constants.DEVICE_NAME
+    class InputMode(Enum):
+        CALLBACK = "callback"  # Transport pushes messages, reader thread sleeps
+        POLLING = "polling"  # Reader thread spins on get_message()
+
+    def __init__(
+        self,
+        device_id: int = None,
+        max_output_rate: float | None = 1000.0,
+        callback_workers: int | None = None,
+        transport: Transport = None,
+        collect_stats: bool = False,
+        max_led_rate: float | None = 500.0,
+    ):
+        """
+        Args:
+            device_id: Which connected Midi Fighter Twister discover() opens:
+                its index in port order or its identity (see identity).
+                Defaults to the first one.
+            max_output_rate: Maximum number of encoder values sent to the
+                device per second by set_encoder_value(), or None for no
+                limit.
+            callback_workers: Run the value changed callback on a pool of
+                this many threads instead of the reading thread. Calls stay
+                in order for each encoder and run in parallel across
+                encoders. None calls it on the reading thread.
+            transport: Connection to the device. Defaults to the MIDI ports
+                of a connected device (RtMidiTransport). Pass a
+                TwisterSimulator's transport to run without hardware.
+            collect_stats: Count messages and measure latencies and callback
+                times, read with stats(). Off by default, which leaves the
+                hot paths unchanged.
+            max_led_rate: Maximum number of LED messages sent per second by
+                show_frame(), on top of max_output_rate, or None for no
+                limit.
+        """
+        self._transport = (
+            transport if transport is not None else RtMidiTransport()
+        )
         self._bank = constants.SystemMessages.BANK1
         self._is_aux = False
-        self._input_port = None
-        self._output_port = None
         self._device_id = device_id
-        self._config = Config(self._midi_out)
+        self._config = Config(self._transport)
         self._knob_subscriptions = {}
+        self._subscribed_mask = 0  # Bit i is set when encoder i is subscribed
+        self._active_encoders = ()  # Sorted indices of subscribed encoders
         self._reading_thread = None
         self._reading_thread_active = False
+        self._input_mode = self.InputMode.CALLBACK
+        self._coalesce = True
+        self._pending_messages = collections.deque()
+        self._messages_available = threading.Event()
+        self._output_writer = OutputWriter(
+            self._send_midi_message, max_output_rate
+        )
+        self._filters = FilterBank()  # Smoothing of read_smoothed()
+        # Ring values are the encoder values: frames write them through the
+        # same writer, so that both compare against what the device shows
+        self._led_engine = LedEngine(
+            self._send_midi_message,
+            max_led_rate,
+            ring_writer=self._output_writer,
+        )
+        self._event_listeners = ()  # Called with a list of events per batch
+        self._event_queues = set()  # Queues returned by events(), until closed
+        # Handlers registered with on_change(), indexed by encoder index
+        self._change_handlers = [()] * constants.Encoders.DEVICE_KNOB_NUM
+        self._event_handlers = {}  # Event type -> handlers, see on_event()
+        self._message_handlers = self._build_message_handlers()
+        self._dispatcher = (
+            CallbackDispatcher(callback_workers) if callback_workers else None
+        )
+        self._stats = Stats() if collect_stats else None
+        self._config._stats = self._stats
         self.value_changed_callback = None
 
-    def discover(self, device_id: int = None):
+    def discover(self, device_id: int | str = None):
         """
         Discovers the Midi Fighter Twister device and initializes input/output.
-        """
-        input_ports = self._midi_in.get_port_count()
-        output_ports = self._midi_out.get_port_count()
 
-        for i in range(input_ports):
-            if self._device_name in self._midi_in.get_port_name(i):
-                self._input_port = i
-                break
+        Args:
+            device_id: Overrides the device_id given to the constructor.
+        """
+        if device_id is None:
+            device_id = self._device_id
+        if not self._transport.open(device_id):
+            return False
 
-        for i in range(output_ports):
-            if self._device_name in self._midi_out.get_port_name(i):
-                self._output_port = i
-                break
-
-        if self._input_port is not None and self._output_port is not None:
-            try:
-                self._midi_in.open_port(self._input_port)
-                self._midi_out.open_port(self._output_port)
-                return True
-            except Exception as e:
-                print(f"Error opening MIDI ports: {e}")
-                return False
-        return False
+        # The device state is unknown until the next push
+        self._config.forget_device_state()
+        self._output_writer.forget_device_values()
+        self._led_engine.forget_device_state()
+        return True
 
     @property
     def config(self):
         return self._config
 
+    @property
+    def bank(self) -> int:
+        """
+        The bank the device currently shows, kept in sync with the bank
+        changes the device reports.
+        """
+        return self._bank
+
+    @property
+    def identity(self) -> str | None:
+        """
+        Name identifying the discovered device across reconnections: its port
+        name without the numbers the MIDI backend appends.
+        """
+        return self._transport.identity
+
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
     def _send_midi_message(self, message):
         """
         Sends a MIDI message to the device.
         """
-        if self._midi_out and self._output_port is not None:
+        if self._transport.is_open:
             try:
-                self._midi_out.send_message(message)
+                self._transport.send_message(message)
             except Exception as e:
                 print(f"Error sending MIDI message: {e}")
+                return
+            if self._stats is not None:
+                self._stats.record_sent()
 
     def _send_control_change(self, channel, cc, value):
         """
@@ -108,21 +212,158 @@ class MidiFighterTwister:
         """
         self._is_aux = is_aux
 
-    def configure(self):
+    def pull_config(self, timeout: float = 2.0, apply: bool = False) -> bool:
+        """
+        Reads the configuration the device currently holds (PULL_CONF), so
+        the next configure() only pushes what differs from it.
+
+        The reading thread must be running (see start()).
+
+        Args:
+            timeout: Seconds to wait for the device's replies.
+            apply: Replace the local configuration with the pulled one.
+
+        Returns:
+            True if the whole configuration was received.
+        """
+        if not self._reading_thread_active:
+            raise RuntimeError("start() must be called before pulling config")
+        return self._config.pull(timeout, apply)
+
+    def configure(
+        self, force_all: bool = False, wait: bool = True, pull: bool = False
+    ) -> Future:
         """
         Sends the current configuration to the device.
+
+        Only the settings that differ from what the device was last sent are
+        pushed, unless force_all is set. The push is paced by the config's
+        transfer engine (see Config.set_transfer_limits()).
+
+        Args:
+            force_all: Push every setting, even unchanged ones.
+            wait: Block until the transfer has completed. Pass False to keep
+                working while it runs.
+            pull: First read the device's current configuration with
+                pull_config() and push only the difference. Requires start().
+
+        Returns:
+            A Future resolving to a TransferResult.
         """
-        self._config.send_all()
+        if pull and not force_all:
+            self.pull_config()
+        if force_all:
+            future = self._config.send_all()
+        else:
+            future = self._config.send_modified()
+        if wait:
+            future.result()
+        return future
 
-    def start(self):
+    def start(
+        self,
+        input_mode: InputMode = InputMode.CALLBACK,
+        coalesce: bool = True,
+    ):
         """
         Starts the thread listening for MIDI messages.
+
+        Args:
+            input_mode: CALLBACK (default) lets the transport wake the reading thread
+                only when messages arrive. POLLING keeps the legacy loop that
+                calls get_message() continuously.
+            coalesce: When True, every wake-up drains all pending messages and
+                dispatches only the last value of each encoder. Set to False
+                to receive every intermediate value.
         """
+        self._input_mode = input_mode
+        self._coalesce = coalesce
         self._start_reading_thread()
 
     def set_value_changed_callback(self, callback):
         self.value_changed_callback = callback
 
+    def on_change(self, target, handler=None):
+        """
+        Registers a handler called with (encoder index, encoder name, value)
+        whenever one of the target encoders changes value.
+
+        Can be used as a decorator: @mft.on_change(constants.Encoders.Bank1)
+
+        Args:
+            target: An encoder index (0-63), a bank such as
+                constants.Encoders.Bank2, or an iterable of encoder indices.
+            handler: The function to call. Runs on the callback workers if
+                the device has some (see callback_workers).
+
+        Returns:
+            The handler.
+        """
+        if handler is None:
+            return lambda handler: self.on_change(target, handler)
+        handlers = self._change_handlers
+        for encoder_index in self._get_encoder_indices(target):
+            handlers[encoder_index] = handlers[encoder_index] + (handler,)
+        return handler
+
+    def on_event(self, event_type: type, handler=None):
+        """
+        Registers a handler called with every event of a type decoded from
+        the device's input: SwitchEvent, SideButtonEvent, BankChangeEvent or
+        ShiftEncoderEvent.
+
+        Can be used as a decorator: @mft.on_event(SwitchEvent)
+
+        Returns:
+            The handler.
+        """
+        if handler is None:
+            return lambda handler: self.on_event(event_type, handler)
+        self._event_handlers[event_type] = self._event_handlers.get(
+            event_type, ()
+        ) + (handler,)
+        return handler
+
+    def remove_on_event(self, event_type: type, handler):
+        """
+        Unregisters a handler added with on_event().
+        """
+        self._event_handlers[event_type] = tuple(
+            registered
+            for registered in self._event_handlers.get(event_type, ())
+            if registered != handler
+        )
+
+    def remove_on_change(self, target, handler):
+        """
+        Unregisters a handler added with on_change() for the target encoders.
+        """
+        handlers = self._change_handlers
+        for encoder_index in self._get_encoder_indices(target):
+            handlers[encoder_index] = tuple(
+                registered
+                for registered in handlers[encoder_index]
+                if registered != handler
+            )
+
+    def _get_encoder_indices(self, target) -> list:
+        """
+        Resolves an encoder index, a bank class or an iterable of encoder
+        indices to a list of encoder indices.
+        """
+        if isinstance(target, int):
+            encoder_indices = [target]
+        elif dataclasses.is_dataclass(target):
+            encoder_indices = [
+                field.default for field in dataclasses.fields(target)
+            ]
+        else:
+            encoder_indices = list(target)
+        for encoder_index in encoder_indices:
+            if encoder_index not in range(constants.Encoders.DEVICE_KNOB_NUM):
+                raise ValueError("Invalid encoder index. Valid range is 0-63")
+        return encoder_indices
+
     def subscribe(self, encoder: int, knob_settings: KnobSettings):
         """
         Subscribes to the value changes of a specific encoder, applies
@@ -132,21 +373,35 @@ class MidiFighterTwister:
         if knob_index not in range(constants.Encoders.DEVICE_KNOB_NUM):
             raise ValueError("Invalid knob index. Valid range is 0-63")
 
-        self._knob_subscriptions[knob_index] = knob_settings
-
         # Apply knob settings to the encoder in the config
         encoder_obj = self._config._encoders[knob_index]
+        previous_fields = dict(vars(encoder_obj.knob_settings))
+        try:
+            # Copy the detent and every other setting the knob settings set,
+            # counting them as a single change. They were validated when set
+            # on knob_settings.
+            setting_fields = encoder_obj.setting_fields()
+            fields = {
+                name: value
+                for name, value in vars(knob_settings).items()
+                if value is not None and name in setting_fields
+            }
+            fields["_detent"] = knob_settings._detent
+            encoder_obj.knob_settings.update_fields(fields)
 
-        # Set detent directly using the constants
-        encoder_obj.set_detent(knob_settings._detent)
+            encoder_obj.compile_mapping()
+        except Exception:
+            # Leave the encoder as it was, e.g. for a CUSTOM curve without
+            # a curve_function
+            vars(encoder_obj.knob_settings).update(previous_fields)
+            raise
 
-        # Set other values using the set method
-        for setting_name in vars(knob_settings):  # Get all attributes
-            setting_value = getattr(knob_settings, setting_name)
-            if setting_value is not None:
-                encoder_obj.set(
-                    setting_name[1:], setting_value
-                )  # Remove "_" prefix from setting name
+        self._knob_subscriptions[knob_index] = knob_settings
+        self._subscribed_mask |= 1 << knob_index
+        self._active_encoders = tuple(sorted(self._knob_subscriptions))
+        self._filters.set_span(
+            knob_index, encoder_obj.mapping.max - encoder_obj.mapping.min
+        )
 
         # Hack to turn on the LED lights with default colors if the user did not set a specific color
         if (
@@ -157,33 +412,102 @@ class MidiFighterTwister:
                 encoder_obj.knob_settings.active_color
             )
 
-    def load_config(self, config_path: str):
+    def load_config(self, config_path: str, use_cache: bool = True):
         """
         Loads knob configurations from a JSON file.
 
+        Unless use_cache is False, the state the config leaves each encoder
+        in (settings, mapping table and SysEx messages) is compiled into a
+        cache file next to the JSON file (config_path + ".pymftc"), keyed by
+        a hash of its content. Later loads of the same content apply that
+        state directly, skipping JSON parsing, validation and the mapping
+        table computation.
+
         Args:
             config_path: Path to the JSON configuration file.
+            use_cache: Read and write the compiled cache.
         """
         try:
-            with open(config_path, "r") as f:
-                config_data = json.load(f)
-                self._load_config_from_data(config_data)
+            with open(config_path, "rb") as f:
+                source = f.read()
         except FileNotFoundError:
             print(f"Config file not found: {config_path}")
+            return
+
+        digest = config_cache.source_digest(source)
+        path = config_cache.cache_path(config_path)
+        if use_cache:
+            entries = config_cache.read_cache(path, digest)
+            if entries is not None:
+                self._load_config_from_cache(entries)
+                return
+
+        try:
+            config_data = json.loads(source)
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON file: {e}")
+            return
+        subscriptions = self._load_config_from_data(config_data)
+
+        if use_cache:
+            try:
+                entries = config_cache.compile_entries(
+                    subscriptions, self._config._encoders
+                )
+                config_cache.write_cache(path, digest, entries)
+            except (OSError, ValueError) as e:
+                print(f"Error writing config cache: {e}")
 
-    def _load_config_from_data(self, config_data: dict):
+    def _load_config_from_data(self, config_data: dict) -> list:
         """
         Loads knob configurations from the parsed JSON data.
 
         Args:
             config_data: A dictionary containing the knob configuration.
+
+        Returns:
+            The (encoder index, KnobSettings) pairs that were subscribed.
         """
+        subscriptions = []
         for knob_config in config_data:
             encoder_index = self._get_encoder_index_from_config(knob_config)
             knob_settings = self._create_knob_settings_from_config(knob_config)
             self.subscribe(encoder_index, knob_settings)
+            subscriptions.append((encoder_index, knob_settings))
+        return subscriptions
+
+    def _load_config_from_cache(self, entries: list):
+        """
+        Applies the encoder states read from a compiled config cache, with
+        the same result as subscribing the config's knob settings.
+
+        Args:
+            entries: CachedEncoders from config_cache.read_cache().
+        """
+        for entry in entries:
+            encoder_obj = self._config._encoders[entry.index]
+            knob_settings = encoder_obj.knob_settings
+            cached_fields = vars(entry.settings)
+            knob_settings.update_fields(
+                {name: cached_fields[name] for name in entry.changed}
+            )
+            if entry.inactive_follows_active:
+                knob_settings.inactive_color = knob_settings.active_color
+
+            # The cached table is only valid for the same mapping settings,
+            # which settings kept from before the load may change
+            if mapping_inputs(knob_settings) == mapping_inputs(entry.settings):
+                encoder_obj.compile_mapping(entry.mapping_values)
+            else:
+                encoder_obj.compile_mapping()
+            self._filters.set_span(
+                entry.index, encoder_obj.mapping.max - encoder_obj.mapping.min
+            )
+            encoder_obj.seed_compiled_config(entry.pairs, entry.messages)
+
+            self._knob_subscriptions[entry.index] = entry.subscription
+            self._subscribed_mask |= 1 << entry.index
+        self._active_encoders = tuple(sorted(self._knob_subscriptions))
 
     def _get_encoder_index_from_config(self, knob_config: dict) -> int:
         """
@@ -249,6 +573,12 @@ class MidiFighterTwister:
                 "indicator_display_type", "INDICATORTYPE_BLENDEDBAR"
             ),
         )
+        curve = MappingCurve[knob_config.get("curve", "LINEAR")]
+        curve_amount = knob_config.get("curve_amount")
+        steps = knob_config.get("steps")
+        resolution = knob_config.get("resolution")
+        acceleration = knob_config.get("acceleration")
+        wrap = knob_config.get("wrap")
 
         return KnobSettings(
             knob_type=knob_type,
@@ -259,6 +589,16 @@ class MidiFighterTwister:
             encoder_midi_type=encoder_midi_type,
             detent_color=detent_color,
             indicator_display_type=indicator_display_type,
+            curve=curve,
+            curve_amount=(
+                float(curve_amount) if curve_amount is not None else None
+            ),
+            steps=int(steps) if steps is not None else None,
+            resolution=int(resolution) if resolution is not None else None,
+            acceleration=(
+                float(acceleration) if acceleration is not None else None
+            ),
+            wrap=bool(wrap) if wrap is not None else None,
         )
 
     def _start_reading_thread(self):
@@ -267,9 +607,13 @@ class MidiFighterTwister:
         """
         if self._reading_thread is None:
             self._reading_thread_active = True
-            self._reading_thread = threading.Thread(
-                target=self._read_messages_loop
-            )
+            if self._input_mode == self.InputMode.CALLBACK:
+                self._messages_available.clear()
+                self._transport.set_callback(self._input_callback())
+                target = self._wait_messages_loop
+            else:
+                target = self._read_messages_loop
+            self._reading_thread = threading.Thread(target=target)
             self._reading_thread.daemon = True  # Allow main thread to exit even if reading thread is running
             self._reading_thread.start()
 
@@ -280,99 +624,646 @@ class MidiFighterTwister:
         while self._reading_thread_active:
             self._read_messages()
 
+    def _on_midi_input(self, message, data=None):
+        """
+        Transport input callback. Queues the message and wakes the reading thread.
+        """
+        self._pending_messages.append(message)
+        self._messages_available.set()
+
+    def _on_midi_input_timed(self, message, data=None):
+        """
+        Transport input callback used while collecting stats. Also stamps the
+        message with its arrival time, for the ingress latency.
+        """
+        self._pending_messages.append(
+            (message[0], message[1], time.perf_counter_ns())
+        )
+        self._messages_available.set()
+
+    def _input_callback(self):
+        """
+        Returns the transport input callback, chosen once so that input is
+        only timestamped while collecting stats.
+        """
+        if self._stats is not None:
+            return self._on_midi_input_timed
+        return self._on_midi_input
+
+    def _wait_messages_loop(self):
+        """
+        Sleeps until the transport delivers messages, then handles everything queued.
+        """
+        while self._reading_thread_active:
+            self._messages_available.wait()
+            self._messages_available.clear()
+            self._handle_pending_messages()
+
+    def _handle_pending_messages(self):
+        """
+        Handles every message queued by the transport callback.
+        """
+        messages = []
+        while self._pending_messages:
+            messages.append(self._pending_messages.popleft())
+        if messages:
+            try:
+                self._handle_midi_messages(messages)
+            except Exception as e:
+                print(traceback.format_exc())
+            if self._stats is not None:
+                self._record_batch(messages)
+
+    def _start_shared_input(
+        self, messages_available: threading.Event, coalesce: bool = True
+    ):
+        """
+        Starts callback input without a reading thread of its own. The
+        transport callback sets messages_available, and the owner of that
+        event calls _handle_pending_messages() (see TwisterManager).
+        """
+        self._input_mode = self.InputMode.CALLBACK
+        self._coalesce = coalesce
+        self._messages_available = messages_available
+        self._reading_thread_active = True
+        self._transport.set_callback(self._input_callback())
+
+    def snapshot(self) -> EncoderSnapshot:
+        """
+        Returns a consistent copy of the raw and mapped values of all knobs.
+
+        The copy is taken without locking, so the reading thread is never
+        blocked by it.
+        """
+        return self._config._state.snapshot()
+
     def read_all(self) -> dict:
         """
         Returns the current values of all knobs.
         """
-        return {
-            encoder_index: encoder.mapped_value
-            for encoder_index, encoder in enumerate(self._config._encoders)
-        }
+        return dict(enumerate(self.snapshot().mapped))
 
     def read_all_changed(self) -> dict:
         """
         Returns the values of all knobs that have changed since the last read.
         """
-        changed_values = {}
-        for encoder_index, encoder in enumerate(self._config._encoders):
-            if encoder.has_changed():
-                changed_values[encoder_index] = encoder.mapped_value
-        return changed_values
+        return self._read_dirty(-1)
 
     def read_active(self) -> dict:
         """
         Returns the values of only the active (subscribed) knobs.
         """
+        mapped = self.snapshot().mapped
         return {
-            encoder_index: encoder.mapped_value
-            for encoder_index, encoder in enumerate(self._config._encoders)
+            encoder_index: mapped[encoder_index]
+            for encoder_index in range(constants.Encoders.DEVICE_KNOB_NUM)
             if encoder_index in self._knob_subscriptions
         }
 
+    def active_encoders(self) -> tuple:
+        """
+        Returns the sorted indices of the active (subscribed) knobs, in the
+        order used by read_active_array().
+        """
+        return self._active_encoders
+
+    def read_all_array(self, raw: bool = False, out=None, dtype=None):
+        """
+        Returns the current values of all knobs as a NumPy array.
+
+        Requires the optional NumPy extra (pip install pymft[numpy]).
+
+        Args:
+            raw: Return the raw 0-127 values instead of the mapped values.
+            out: Preallocated array of shape (64,) to fill instead of
+                allocating a new one.
+            dtype: Type of the returned array. Defaults to uint8 for raw
+                values and float64 for mapped values.
+        """
+        return read_state_array(
+            self._config._state, raw=raw, out=out, dtype=dtype
+        )
+
+    def read_active_array(self, raw: bool = False, out=None, dtype=None):
+        """
+        Returns the values of the active (subscribed) knobs as a NumPy array,
+        ordered as active_encoders().
+
+        Requires the optional NumPy extra (pip install pymft[numpy]).
+
+        Args:
+            raw: Return the raw 0-127 values instead of the mapped values.
+            out: Preallocated array with one entry per active knob to fill
+                instead of allocating a new one.
+            dtype: Type of the returned array. Defaults to uint8 for raw
+                values and float64 for mapped values.
+        """
+        return read_state_array(
+            self._config._state,
+            raw=raw,
+            indices=self._active_encoders,
+            out=out,
+            dtype=dtype,
+        )
+
+    def set_filter(
+        self,
+        target,
+        filter_type: FilterType,
+        time_constant: float = 0.05,
+        min_cutoff: float = 1.0,
+        beta: float = 0.0,
+        d_cutoff: float = 1.0,
+        rate: float = 1.0,
+    ):
+        """
+        Sets the smoothing filter read_smoothed() applies to encoders.
+
+        Args:
+            target: An encoder index (0-63), a bank such as
+                constants.Encoders.Bank2, or an iterable of encoder indices.
+            filter_type: EMA, ONE_EURO, SLEW, or NONE to remove the filter.
+            time_constant: EMA: seconds to cover 63% of a change.
+            min_cutoff: One-euro: cutoff frequency in Hz at rest. Lower
+                values smooth more.
+            beta: One-euro: how much the cutoff rises with speed. Higher
+                values lag less on fast turns.
+            d_cutoff: One-euro: cutoff frequency in Hz of the speed estimate.
+            rate: Slew: largest change per second, as a fraction of the
+                knob's min/max range.
+        """
+        for encoder_index in self._get_encoder_indices(target):
+            self._filters.set_filter(
+                encoder_index,
+                filter_type,
+                time_constant,
+                min_cutoff,
+                beta,
+                d_cutoff,
+                rate,
+            )
+
+    def read_smoothed(self, now: float = None) -> dict:
+        """
+        Returns the smoothed values of the knobs with a filter (see
+        set_filter()).
+
+        Each call advances every filter by the time elapsed since the
+        previous call, so call it at a steady rate, e.g. once per frame.
+        The mapped values themselves are not filtered.
+
+        Args:
+            now: Time of the read in time.monotonic() seconds. Defaults to
+                now.
+        """
+        filters = self._filters
+        active = filters.active
+        if not active:
+            return {}
+        smoothed = filters.tick(
+            self.snapshot().mapped, time.monotonic() if now is None else now
+        )
+        return {
+            encoder_index: smoothed[encoder_index] for encoder_index in active
+        }
+
     def read_active_changed(self) -> dict:
         """
         Returns the values of active knobs that have changed since the last read.
         """
+        return self._read_dirty(self._subscribed_mask)
+
+    def _read_dirty(self, mask: int) -> dict:
+        """
+        Claims the dirty bits selected by mask and returns the values of those
+        knobs, visiting only the set bits.
+        """
+        dirty = self._config._state.take_dirty(mask)
+        if not dirty:
+            return {}
+
+        mapped = self.snapshot().mapped
         changed_values = {}
-        for encoder_index, encoder in enumerate(self._config._encoders):
-            if (
-                encoder_index in self._knob_subscriptions
-                and encoder.has_changed()
-            ):
-                changed_values[encoder_index] = encoder.mapped_value
+        while dirty:
+            lowest_bit = dirty & -dirty
+            encoder_index = lowest_bit.bit_length() - 1
+            changed_values[encoder_index] = mapped[encoder_index]
+            dirty ^= lowest_bit
         return changed_values
 
     def _read_messages(self):
         """
-        Reads a single MIDI message from the device and updates encoder states.
+        Reads all pending MIDI messages from the device and updates encoder
+        states.
         """
-        if self._midi_in and self._input_port is not None:
+        if self._transport.is_open:
             try:
-                message = self._midi_in.get_message()
-                if message:
-                    self._handle_midi_message(message)
+                messages = []
+                message = self._transport.get_message()
+                while message:
+                    messages.append(message)
+                    message = self._transport.get_message()
+                if messages:
+                    self._handle_midi_messages(messages)
+                    if self._stats is not None:
+                        self._record_batch(messages)
             except Exception as e:
                 print(traceback.format_exc())
 
+    def _handle_midi_messages(self, messages: list):
+        """
+        Handles a batch of incoming MIDI messages.
+
+        When coalescing, only the last value received for each encoder is
+        applied and dispatched, and encoders whose value did not change are
+        skipped. Relative encoders accumulate every increment of the batch.
+        Other messages are handled one by one in arrival order.
+        """
+        if not self._coalesce:
+            for message in messages:
+                self._handle_midi_message(message)
+            return
+
+        encoders = self._config._encoders
+        knob_count = constants.Encoders.DEVICE_KNOB_NUM
+        latest_values = {}
+        relative_values = {}  # cc -> (raw, mapped) after the last increment
+        for message in messages:
+            msg = message[0]
+            if (
+                len(msg) == 3
+                and msg[0]
+                == CONTROL_CHANGE + constants.MidiChannels.ROTARY_ENCODER
+            ):
+                if msg[1] >= knob_count:
+                    continue  # CC numbers can be remapped beyond the knobs
+                encoder = encoders[msg[1]]
+                if encoder.is_relative:
+                    relative_values[msg[1]] = encoder.move(
+                        encoder.relative_steps(msg[2])
+                    )
+                else:
+                    latest_values[msg[1]] = msg[2]
+            else:
+                self._handle_midi_message(message)
+
+        changed = [
+            (cc, value, encoders[cc].map_value(value))
+            for cc, value in latest_values.items()
+            if encoders[cc].value != value
+        ]
+        changed_relative = [
+            (cc, value, mapped_value)
+            for cc, (value, mapped_value) in relative_values.items()
+            if encoders[cc].mapped_value != mapped_value
+        ]
+        if changed or changed_relative:
+            all_changed = changed + changed_relative
+            # One state write for the whole batch keeps snapshots consistent
+            self._config._state.write_many(all_changed)
+            channel = constants.MidiChannels.ROTARY_ENCODER
+            if changed:
+                self._output_writer.update_device_values(
+                    [(channel, cc, value, 0) for cc, value, _ in changed]
+                )
+            if changed_relative:
+                # The device does not move the LED ring of relative encoders
+                self._output_writer.write_many(
+                    [
+                        (channel, cc, value, 0)
+                        for cc, value, _ in changed_relative
+                    ]
+                )
+            self._led_engine.update_rings(all_changed)
+            self._notify_values_changed(all_changed)
+
+    def _record_batch(self, messages: list):
+        """
+        Adds a handled batch of messages to the stats.
+        """
+        now = time.perf_counter_ns()
+        handlers = self._message_handlers
+        ignored = sum(
+            1
+            for message in messages
+            if not message[0] or handlers[message[0][0]] is None
+        )
+        self._stats.record_batch(messages, ignored, now)
+
+    def _build_message_handlers(self) -> list:
+        """
+        Returns the handler of every status byte, indexed by status byte, or
+        None for messages the device does not send.
+        """
+        channels = constants.MidiChannels
+        handlers = [None] * 256
+        handlers[SYSEX_START] = self._config.handle_sysex
+        handlers[
+            CONTROL_CHANGE + channels.ROTARY_ENCODER
+        ] = self._handle_encoder_message
+        handlers[
+            CONTROL_CHANGE + channels.SWITCH_AND_COLOR
+        ] = self._handle_switch_message
+        handlers[
+            NOTE_ON + channels.SWITCH_AND_COLOR
+        ] = self._handle_switch_message
+        handlers[
+            NOTE_OFF + channels.SWITCH_AND_COLOR
+        ] = self._handle_switch_release
+        handlers[CONTROL_CHANGE + channels.SYSTEM] = self._handle_system_message
+        handlers[CONTROL_CHANGE + channels.SHIFT] = self._handle_shift_message
+        return handlers
+
     def _handle_midi_message(self, message):
         """
         Handles incoming MIDI messages from the device.
         """
         msg = message[0]
-        if len(msg) == 3:
-            channel = msg[0] & 0xF
-            cc = msg[1]
-            value = msg[2]
-
-            # Update encoder value if the message is from an encoder
-            if channel == constants.MidiChannels.ROTARY_ENCODER:
-                self._config._encoders[cc].value = value
-                self._config._encoders[
-                    cc
-                ].update_mapped_value()  # Update mapped value
-
-                if (
-                    self.value_changed_callback
-                    and cc in self._knob_subscriptions.keys()
-                ):
-                    self.value_changed_callback(
-                        f"ENCODER_{cc + 1}",
-                        self._config._encoders[cc].mapped_value,
+        if msg:
+            handler = self._message_handlers[msg[0]]
+            if handler is not None:
+                handler(msg)
+
+    def _handle_encoder_message(self, msg: list):
+        """
+        Handles an encoder turn.
+        """
+        if len(msg) == 3 and msg[1] < constants.Encoders.DEVICE_KNOB_NUM:
+            self._update_encoder_value(msg[1], msg[2])
+
+    def _handle_switch_message(self, msg: list):
+        """
+        Handles an encoder switch sent as a CC or a note on. A value of 0 is
+        a release.
+        """
+        handlers = self._event_handlers.get(SwitchEvent)
+        if (
+            handlers
+            and len(msg) == 3
+            and msg[1] < constants.Encoders.DEVICE_KNOB_NUM
+        ):
+            encoder = msg[1]
+            self._emit_event(
+                handlers,
+                SwitchEvent(
+                    encoder, ENCODER_NAMES[encoder], msg[2] > 0, msg[2]
+                ),
+            )
+
+    def _handle_switch_release(self, msg: list):
+        """
+        Handles an encoder switch release sent as a note off.
+        """
+        handlers = self._event_handlers.get(SwitchEvent)
+        if (
+            handlers
+            and len(msg) == 3
+            and msg[1] < constants.Encoders.DEVICE_KNOB_NUM
+        ):
+            encoder = msg[1]
+            self._emit_event(
+                handlers,
+                SwitchEvent(encoder, ENCODER_NAMES[encoder], False, msg[2]),
+            )
+
+    def _handle_system_message(self, msg: list):
+        """
+        Handles bank changes and side buttons.
+        """
+        if len(msg) != 3:
+            return
+        cc, value = msg[1], msg[2]
+        if cc <= constants.SystemMessages.BANK4:
+            if value == constants.SystemMessages.BANK_ON and cc != self._bank:
+                previous_bank = self._bank
+                self._bank = cc
+                handlers = self._event_handlers.get(BankChangeEvent)
+                if handlers:
+                    self._emit_event(
+                        handlers, BankChangeEvent(cc, previous_bank)
                     )
+            return
+
+        name = SIDE_BUTTON_NAMES[cc]
+        handlers = self._event_handlers.get(SideButtonEvent)
+        if handlers and name is not None:
+            bank = (
+                cc - constants.SystemMessages.BANK1_LEFT1
+            ) // constants.SystemMessages.SIDE_BUTTONS_PER_BANK
+            self._emit_event(
+                handlers, SideButtonEvent(cc, name, bank, value > 0)
+            )
+
+    def _handle_shift_message(self, msg: list):
+        """
+        Handles an encoder turn on the shift layer.
+        """
+        handlers = self._event_handlers.get(ShiftEncoderEvent)
+        if (
+            handlers
+            and len(msg) == 3
+            and msg[1] < constants.Encoders.DEVICE_KNOB_NUM
+        ):
+            encoder = msg[1]
+            self._emit_event(
+                handlers,
+                ShiftEncoderEvent(encoder, ENCODER_NAMES[encoder], msg[2]),
+            )
+
+    def _emit_event(self, handlers: tuple, event):
+        """
+        Calls the on_event() handlers of an event, on the callback workers
+        if there are some. Events of a type stay in order.
+        """
+        direct = self._dispatcher is None and self._stats is None
+        for handler in handlers:
+            if direct:
+                handler(event)
+            else:
+                self._call_handler(type(event), handler, event)
+
+    def _call_handler(self, key, handler, *args):
+        """
+        Calls a handler on the callback workers if there are some, keeping
+        the calls of a key in order, and times it when collecting stats.
+        """
+        stats = self._stats
+        if stats is not None:
+            args = (handler,) + args
+            handler = stats.call_timed
+        if self._dispatcher is not None:
+            self._dispatcher.submit(key, handler, *args)
+        else:
+            handler(*args)
+
+    def _update_encoder_value(self, cc: int, value: int):
+        """
+        Stores a new raw encoder value and notifies the value changed callback.
+        Relative encoders are moved by the increment the value encodes.
+        """
+        encoder = self._config._encoders[cc]
+        if encoder.is_relative:
+            value, mapped_value = encoder.move(encoder.relative_steps(value))
+            self._config._state.write(cc, value, mapped_value)
+            # The device does not move the LED ring of relative encoders
+            self._output_writer.write(
+                constants.MidiChannels.ROTARY_ENCODER, cc, value
+            )
+        else:
+            mapped_value = encoder.map_value(value)
+            self._config._state.write(cc, value, mapped_value)
+            self._output_writer.update_device_value(
+                constants.MidiChannels.ROTARY_ENCODER, cc, value
+            )
+        changed = [(cc, value, mapped_value)]
+        self._led_engine.update_rings(changed)
+        self._notify_values_changed(changed)
+
+    def _notify_values_changed(self, changed: list):
+        """
+        Calls the value changed callback and the event listeners for the
+        subscribed encoders among the (cc, raw, mapped) changes, and the
+        on_change() handlers of the changed encoders.
+        """
+        callback = self.value_changed_callback
+        change_handlers = self._change_handlers
+        subscribed_mask = self._subscribed_mask
+        direct = self._dispatcher is None and self._stats is None
+        for cc, _, mapped_value in changed:
+            name = ENCODER_NAMES[cc]
+            if callback and subscribed_mask >> cc & 1:
+                if direct:
+                    callback(name, mapped_value)
+                else:
+                    self._call_handler(cc, callback, name, mapped_value)
+            for handler in change_handlers[cc]:
+                if direct:
+                    handler(cc, name, mapped_value)
+                else:
+                    self._call_handler(cc, handler, cc, name, mapped_value)
+
+        if self._event_listeners:
+            events = [
+                EncoderEvent(cc, ENCODER_NAMES[cc], mapped_value, value)
+                for cc, value, mapped_value in changed
+                if subscribed_mask >> cc & 1
+            ]
+            if events:
+                for listener in self._event_listeners:
+                    listener(events)
+
+    def add_event_listener(self, listener):
+        """
+        Registers a function called on the reading thread with the list of
+        EncoderEvents of every batch of changes to subscribed encoders.
+        """
+        self._event_listeners = self._event_listeners + (listener,)
+
+    def remove_event_listener(self, listener):
+        """
+        Unregisters a function added with add_event_listener().
+        """
+        self._event_listeners = tuple(
+            registered
+            for registered in self._event_listeners
+            if registered != listener
+        )
+
+    def events(
+        self,
+        maxsize: int = 1024,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        block_timeout: float | None = None,
+    ) -> EventQueue:
+        """
+        Returns a bounded queue receiving the EncoderEvents of subscribed
+        encoders, for consumers that should not run on the reading thread.
+
+        Iterate over it, or call get()/get_batch(), from any thread. Close
+        it to stop receiving events. Its stats() report dropped events.
+
+        Args:
+            maxsize: Maximum number of queued events.
+            policy: What to do with events that do not fit (see
+                OverflowPolicy). BLOCK stalls MIDI ingestion while full.
+            block_timeout: With BLOCK, the longest ingestion waits before
+                dropping the event.
+        """
+
+        def on_close():
+            self.remove_event_listener(queue.put_many)
+            self._event_queues.discard(queue)
+
+        queue = EventQueue(maxsize, policy, block_timeout, on_close=on_close)
+        self._event_queues.add(queue)
+        self.add_event_listener(queue.put_many)
+        return queue
+
+    def replay(self, path: str, speed: float | None = None) -> int:
+        """
+        Feeds the inbound messages of a recording (see RecordingTransport)
+        through the message handlers on the calling thread, as if the device
+        had sent them, e.g. to run new handler code against a recorded
+        session. Messages are handled one by one, without coalescing.
+
+        Args:
+            path: The recording.
+            speed: 1.0 replays in real time, 10.0 ten times faster. Defaults
+                to as fast as possible.
+
+        Returns:
+            The number of messages replayed.
+        """
+        with Recording(path) as recording:
+            return replay(recording, self._handle_midi_message, speed)
+
+    def stats(self) -> Stats | None:
+        """
+        Returns the device's stats: message, SysEx and callback counters,
+        and histograms of the ingress latency (from the transport delivering
+        a message until its batch has been dispatched) and of callback
+        execution times. Ingress latency is only measured in CALLBACK input
+        mode.
+
+        Use Stats.snapshot() for a dict, or Stats.to_prometheus() for the
+        Prometheus text format.
+
+        Returns:
+            None unless the device was created with collect_stats=True.
+        """
+        stats = self._stats
+        if stats is None:
+            return None
+        events_dropped = sum(
+            queue.dropped for queue in tuple(self._event_queues)
+        )
+        if self._dispatcher is not None:
+            events_dropped += self._dispatcher.dropped
+        stats.set_dropped(self._output_writer.dropped, events_dropped)
+        return stats
 
     def close(self):
         """
         Closes the input and output ports and stops the reading thread.
         """
+        was_reading = self._reading_thread_active
         self._reading_thread_active = False  # Signal thread to stop
+        self._messages_available.set()  # Wake the thread if it is waiting
         if self._reading_thread is not None:
             self._reading_thread.join()  # Wait for thread to finish
             self._reading_thread = None
+        if was_reading and self._input_mode == self.InputMode.CALLBACK:
+            self._transport.cancel_callback()
 
-        if self._midi_in and self._input_port is not None:
-            self._midi_in.close_port()
-        if self._midi_out and self._output_port is not None:
-            self._midi_out.close_port()
+        for queue in tuple(self._event_queues):
+            queue.close()  # Wakes consumers blocked on it
+
+        if self._dispatcher is not None:
+            self._dispatcher.close()  # Run the callbacks still queued
+        self._output_writer.close()  # Send the values still queued
+        self._led_engine.close()
+        self._config.close()  # Finish pending configuration pushes
+        self._transport.close()
 
     def __enter__(self):
         return self
@@ -380,10 +1271,60 @@ class MidiFighterTwister:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    def flush_callbacks(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every value changed callback queued on the callback
+        workers has run. Returns immediately without callback workers.
+
+        Returns:
+            True if all callbacks ran before the timeout.
+        """
+        if self._dispatcher is None:
+            return True
+        return self._dispatcher.flush(timeout)
+
+    def flush_output(self, timeout: float | None = None) -> bool:
+        """
+        Waits until all values queued by set_encoder_value() have been sent.
+
+        Returns:
+            True if everything was sent before the timeout.
+        """
+        return self._output_writer.flush(timeout)
+
+    @property
+    def leds(self) -> LedEngine:
+        """
+        The engine showing LED frames, see show_frame().
+        """
+        return self._led_engine
+
+    def show_frame(self, frame: LedFrame) -> int:
+        """
+        Shows the colors, ring values, animations and brightnesses of an
+        LedFrame on the device.
+
+        Only the values that differ from the previous frame are sent, by a
+        background writer limited to max_led_rate messages per second, so
+        this returns immediately and can be called at frame rate. The ring
+        layer sets the encoder values shown by the rings: it is sent within
+        max_output_rate like set_encoder_value(), and knob turns and
+        set_encoder_value() update it. Leave it None to keep the rings
+        following the knobs.
+
+        Returns:
+            The number of values queued.
+        """
+        return self._led_engine.show(frame)
+
     def set_encoder_value(self, encoder: int, value: float):
         """
         Sets the value of a specific encoder.
 
+        The value is sent by a background writer, so this returns immediately.
+        Only the latest value per encoder is sent, values the device already
+        shows are skipped, and sends are limited to max_output_rate.
+
         Args:
             encoder: The encoder index (0-63)
             value: The value to set. This should be within the min/max range defined for the encoder.
@@ -393,18 +1334,18 @@ class MidiFighterTwister:
 
         encoder_obj = self._config._encoders[encoder]
 
-        # Convert the value to the 0-127 MIDI range based on the encoder's min/max settings
-        normalized_value = (value - encoder_obj.knob_settings.min) / (
-            encoder_obj.knob_settings.max - encoder_obj.knob_settings.min
-        )
-        midi_value = int(normalized_value * 127)
-        midi_value = max(0, min(127, midi_value))  # Clamp to valid MIDI range
+        # Convert the value to the closest 0-127 MIDI value of the encoder's mapping
+        if encoder_obj.is_relative:
+            # Relative encoders keep the value at full resolution
+            midi_value = encoder_obj.set_position(value)
+        else:
+            midi_value = encoder_obj.mapping.to_raw(value)
 
         # Update the internal state
-        encoder_obj.value = midi_value
-        encoder_obj.mapped_value = value
+        self._config._state.write(encoder, midi_value, value)
 
-        # Send the value to the device
-        self._send_control_change(
+        # Queue the value to be sent to the device
+        self._output_writer.write(
             constants.MidiChannels.ROTARY_ENCODER, encoder, midi_value
         )
+        self._led_engine.update_rings(((encoder, midi_value),))
@@ -0,0 +1,392 @@
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from pymft.src.transport import Transport
+
+# File header: magic, format version, record size, start time (monotonic ns)
+RECORDING_MAGIC: bytes = b"PYMFTREC"
+RECORDING_VERSION: int = 1
+_HEADER = struct.Struct("<8sHHQ")
+
+# Record: time since the start in ns, direction, flags, message length, data.
+# Messages longer than the data field continue in the following records.
+_RECORD = struct.Struct("<QBBH12s")
+_RECORD_DATA_SIZE = 12
+
+INBOUND: int = 0  # Received from the device
+OUTBOUND: int = 1  # Sent to the device
+
+_CONTINUATION = 0x01  # Flag of the records holding the rest of a message
+_MAX_SLEEP = 0.1  # Longest replay sleep between checks for a stop, seconds
+
+
+class RecordedMessage(NamedTuple):
+    time: float  # Seconds since the recording started
+    direction: int  # INBOUND or OUTBOUND
+    message: list
+
+
+class SessionRecorder:
+    """
+    Writes MIDI messages with monotonic timestamps to a binary recording.
+
+    Every message takes one fixed-width record, plus continuation records for
+    the bytes of long SysEx messages, so recordings can be read through a
+    memory map (see Recording). Records are only ever appended.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: File to record to. An existing file is replaced.
+        """
+        self._file = open(path, "wb")
+        self._lock = threading.Lock()
+        self._start_ns = time.monotonic_ns()
+        self._file.write(
+            _HEADER.pack(
+                RECORDING_MAGIC, RECORDING_VERSION, _RECORD.size, self._start_ns
+            )
+        )
+        self.messages = 0
+
+    def record(self, direction: int, message, timestamp_ns: int = None):
+        """
+        Appends a message.
+
+        Args:
+            direction: INBOUND or OUTBOUND.
+            message: The message bytes.
+            timestamp_ns: time.monotonic_ns() when the message was sent or
+                received. Defaults to now.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        data = bytes(message)
+        elapsed = max(timestamp_ns - self._start_ns, 0)
+        records = [
+            _RECORD.pack(
+                elapsed,
+                direction,
+                _CONTINUATION if offset else 0,
+                len(data),
+                data[offset : offset + _RECORD_DATA_SIZE],
+            )
+            for offset in range(0, max(len(data), 1), _RECORD_DATA_SIZE)
+        ]
+        with self._lock:
+            if self._file.closed:
+                return
+            # One write per message, so a message is never split by another
+            self._file.write(b"".join(records))
+            self.messages += 1
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Recording:
+    """
+    Reads a recording made by SessionRecorder through a memory map.
+
+        with Recording("show.pymftrec") as recording:
+            for time, direction, message in recording:
+                ...
+
+    Only the records written when it was opened are read. A message cut
+    short at the end of the file, e.g. by a crash, is skipped.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a pymft recording: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.start_ns = _HEADER.unpack_from(
+            self._map
+        )
+        if (
+            magic != RECORDING_MAGIC
+            or version != RECORDING_VERSION
+            or record_size != _RECORD.size
+        ):
+            self._map.close()
+            raise ValueError(f"Unsupported recording format: {path}")
+        self.record_count = (size - _HEADER.size) // _RECORD.size
+
+    def __iter__(self):
+        """
+        Yields every complete RecordedMessage in recording order.
+        """
+        data = self._map
+        unpack_from = _RECORD.unpack_from
+        index = 0
+        count = self.record_count
+        while index < count:
+            elapsed, direction, flags, length, chunk = unpack_from(
+                data, _HEADER.size + index * _RECORD.size
+            )
+            index += 1
+            if flags & _CONTINUATION:
+                continue  # Rest of a message whose start is missing
+            extra = max(length - 1, 0) // _RECORD_DATA_SIZE
+            if index + extra > count:
+                return
+            message = bytearray(chunk)
+            for _ in range(extra):
+                message += unpack_from(
+                    data, _HEADER.size + index * _RECORD.size
+                )[4]
+                index += 1
+            yield RecordedMessage(
+                elapsed / 1e9, direction, list(message[:length])
+            )
+
+    @property
+    def duration(self) -> float:
+        """
+        Seconds from the start of the recording to its last record.
+        """
+        if not self.record_count:
+            return 0.0
+        offset = _HEADER.size + (self.record_count - 1) * _RECORD.size
+        return _RECORD.unpack_from(self._map, offset)[0] / 1e9
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def replay(
+    recording: Recording,
+    handle: Callable[[tuple], None],
+    speed: float | None = 1.0,
+    should_stop: Callable[[], bool] = None,
+) -> int:
+    """
+    Calls handle((message, delta time)) for every inbound message of a
+    recording, like a transport input callback.
+
+    Args:
+        recording: The recording to replay.
+        handle: Function receiving each message.
+        speed: 1.0 replays in real time, 10.0 ten times faster. None replays
+            as fast as possible.
+        should_stop: Checked before each message to end the replay early.
+
+    Returns:
+        The number of messages replayed.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive or None")
+    start = time.monotonic()
+    previous_time = None
+    count = 0
+    for recorded_time, direction, message in recording:
+        if direction != INBOUND:
+            continue
+        if should_stop is not None and should_stop():
+            break
+        if speed is not None:
+            # Sleep in short steps so that long pauses can still be stopped
+            delay = start + recorded_time / speed - time.monotonic()
+            while delay > 0:
+                time.sleep(min(delay, _MAX_SLEEP))
+                if should_stop is not None and should_stop():
+                    return count
+                delay = start + recorded_time / speed - time.monotonic()
+        delta = (
+            recorded_time - previous_time if previous_time is not None else 0.0
+        )
+        previous_time = recorded_time
+        handle((message, delta))
+        count += 1
+    return count
+
+
+class RecordingTransport(Transport):
+    """
+    Transport recording every message another transport sends and receives.
+
+        transport = RecordingTransport(RtMidiTransport(), "show.pymftrec")
+        mft = MidiFighterTwister(transport=transport)
+    """
+
+    def __init__(self, transport: Transport, path: str):
+        """
+        Args:
+            transport: The transport to record.
+            path: File to record to. An existing file is replaced.
+        """
+        self._transport = transport
+        self.recorder = SessionRecorder(path)
+
+    @property
+    def identity(self) -> str | None:
+        return self._transport.identity
+
+    def list_devices(self) -> list:
+        return self._transport.list_devices()
+
+    def open(self, device_id: int | str = None) -> bool:
+        return self._transport.open(device_id)
+
+    @property
+    def is_open(self) -> bool:
+        return self._transport.is_open
+
+    def send_message(self, message):
+        self.recorder.record(OUTBOUND, message)
+        self._transport.send_message(message)
+
+    def get_message(self) -> tuple | None:
+        message = self._transport.get_message()
+        if message:
+            self.recorder.record(INBOUND, message[0])
+        return message
+
+    def set_callback(self, callback: Callable[[tuple, object], None]):
+        record = self.recorder.record
+
+        def record_input(message, data=None):
+            record(INBOUND, message[0])
+            callback(message, data)
+
+        self._transport.set_callback(record_input)
+
+    def cancel_callback(self):
+        self._transport.cancel_callback()
+
+    def close(self):
+        self._transport.close()
+        self.recorder.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Virtual device playing back the inbound messages of a recording.
+
+    Playback starts when the transport is opened and runs on a thread of its
+    own. Messages sent to it are counted and dropped.
+
+        mft = MidiFighterTwister(transport=ReplayTransport("show.pymftrec"))
+    """
+
+    def __init__(self, path: str, speed: float | None = 1.0):
+        """
+        Args:
+            path: Recording made by SessionRecorder or RecordingTransport.
+            speed: 1.0 replays in real time, 10.0 ten times faster. None
+                replays as fast as possible.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive or None")
+        self._path = path
+        self._speed = speed
+        self._callback = None
+        self._messages = collections.deque()  # Replayed while no callback
+        self._lock = threading.Lock()
+        self._thread = None
+        self._active = False
+        self.finished = threading.Event()  # Set when playback has ended
+        self.messages_replayed = 0
+        self.messages_sent = 0
+        self.identity = None
+
+    def list_devices(self) -> list:
+        return [f"Replay: {os.path.basename(self._path)}"]
+
+    def open(self, device_id: int | str = None) -> bool:
+        if device_id not in (None, 0, *self.list_devices()):
+            return False
+        if self._thread is None:
+            self.identity = self.list_devices()[0]
+            self._active = True
+            self._thread = threading.Thread(target=self._replay_loop)
+            self._thread.daemon = True
+            self._thread.start()
+        return True
+
+    @property
+    def is_open(self) -> bool:
+        return self._thread is not None
+
+    def send_message(self, message):
+        self.messages_sent += 1
+
+    def get_message(self) -> tuple | None:
+        try:
+            return self._messages.popleft()
+        except IndexError:
+            return None
+
+    def set_callback(self, callback: Callable[[tuple, object], None]):
+        with self._lock:
+            # Hand over what was replayed before the callback was set
+            while self._messages:
+                callback(self._messages.popleft(), None)
+            self._callback = callback
+
+    def cancel_callback(self):
+        with self._lock:
+            self._callback = None
+
+    def close(self):
+        self._active = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits until playback has ended.
+
+        Returns:
+            True if it ended before the timeout.
+        """
+        return self.finished.wait(timeout)
+
+    def _deliver(self, message: tuple):
+        with self._lock:
+            if self._callback is not None:
+                self._callback(message, None)
+            else:
+                self._messages.append(message)
+        self.messages_replayed += 1
+
+    def _replay_loop(self):
+        try:
+            with Recording(self._path) as recording:
+                replay(
+                    recording,
+                    self._deliver,
+                    self._speed,
+                    lambda: not self._active,
+                )
+        except (OSError, ValueError) as e:
+            print(f"Error replaying recording: {e}")
+        finally:
+            self.finished.set()
@@ -0,0 +1,43 @@
+from pymft.src.constants import constants
+
+DEFAULT_RESOLUTION: int = 1024  # Steps of a relative encoder over its range
+DEFAULT_ACCELERATION: float = 2.0  # Step multiplier per speed level
+
+# Relative CC values are offsets from this center: 63/65 for a slow turn,
+# 62/66 for a fast one and 61/67 for a very fast one
+RELATIVE_CENTER: int = (
+    constants.EncoderControl.KNOB_DECREMENT
+    + constants.EncoderControl.KNOB_INCREMENT
+) // 2
+# Largest offset the device sends. Values further from the center (0-60 or
+# 68-127, e.g. from another controller) count as the fastest speed.
+MAX_RELATIVE_OFFSET: int = (
+    constants.EncoderControl.KNOB_INCREMENT_VERYFAST - RELATIVE_CENTER
+)
+
+
+def relative_steps(value: int, acceleration: float) -> float:
+    """
+    Returns the signed number of steps a relative CC value moves an encoder.
+
+    A slow turn moves one step, and every faster speed level multiplies the
+    step by acceleration, up to the fastest speed the device sends.
+    """
+    offset = value - RELATIVE_CENTER
+    if offset == 0:
+        return 0.0
+    steps = acceleration ** (min(abs(offset), MAX_RELATIVE_OFFSET) - 1)
+    return steps if offset > 0 else -steps
+
+
+def advance(
+    position: float, steps: float, resolution: int, wrap: bool
+) -> float:
+    """
+    Moves a normalized 0-1 position by steps out of resolution, wrapping
+    around or clamping at the ends.
+    """
+    position += steps / resolution
+    if wrap:
+        return position % 1.0
+    return min(max(position, 0.0), 1.0)
@@ -0,0 +1,389 @@
+import collections
+import random
+import threading
+import time
+from typing import Callable
+
+from pymft.src.config import Config
+from pymft.src.constants import constants
+from pymft.src.device_settings import DeviceSettings
+from pymft.src.encoder import Encoder
+from pymft.src.sysex import (
+    SYSEX_START,
+    build_bulk_xfer,
+    build_push_conf,
+    parse_pairs,
+    parse_sysex,
+)
+from pymft.src.transport import Transport
+
+SIMULATOR_NAME: str = "Midi Fighter Twister (simulated)"
+
+_ENCODER_TYPE_ADDRESS = Encoder._SETTING_ADDRESSES["encoder_midi_type"]
+
+
+class TwisterSimulator:
+    """
+    In-process stand-in for a Midi Fighter Twister.
+
+    It handles what the host sends like the firmware does: BULK_XFER and
+    PUSH_CONF messages update the stored encoder and global settings, pull
+    requests are answered with them, and CCs set the LED rings, colors,
+    animations and bank. Knob turns, switch presses, side buttons and random
+    knob traffic are sent to the host through the transports connected to
+    it, from the calling thread or a traffic thread.
+
+        simulator = TwisterSimulator()
+        mft = MidiFighterTwister(transport=simulator.transport())
+        mft.discover()
+    """
+
+    def __init__(self, identity: str = SIMULATOR_NAME):
+        self.identity = identity
+        # Firmware defaults: the library's defaults for every encoder
+        defaults = Config(None)
+        defaults.initialize_defaults()
+        self._encoder_settings = [
+            dict(encoder.config_pairs()) for encoder in defaults._encoders
+        ]
+        self._global_settings = dict(DeviceSettings()._settings)
+        self._bulk_parts = {}  # encoder index -> payload bytes received
+        knob_count = constants.Encoders.DEVICE_KNOB_NUM
+        self.values = bytearray(knob_count)  # Knob and LED ring values
+        self.colors = bytearray(knob_count)
+        self.animations = bytearray(knob_count)
+        self.bank = constants.SystemMessages.BANK1
+        self._lock = threading.Lock()
+        self._connections = ()
+        self.messages_received = 0
+        self.sysex_received = 0
+        self.messages_sent = 0
+        self._traffic_thread = None
+        self._traffic_active = False
+
+    def transport(self) -> "SimulatorTransport":
+        """
+        Returns a new transport that can open this simulator.
+        """
+        return SimulatorTransport([self])
+
+    def encoder_settings(self, encoder: int) -> dict:
+        """
+        Returns the address -> value settings stored for an encoder.
+        """
+        with self._lock:
+            return dict(self._encoder_settings[encoder])
+
+    def global_settings(self) -> dict:
+        """
+        Returns the address -> value global settings stored.
+        """
+        with self._lock:
+            return dict(self._global_settings)
+
+    def _connect(self, transport: "SimulatorTransport"):
+        with self._lock:
+            self._connections = self._connections + (transport,)
+
+    def _disconnect(self, transport: "SimulatorTransport"):
+        with self._lock:
+            self._connections = tuple(
+                connection
+                for connection in self._connections
+                if connection is not transport
+            )
+
+    def receive(self, message):
+        """
+        Handles a message sent by the host.
+        """
+        self.messages_received += 1
+        if message and message[0] == SYSEX_START:
+            self.sysex_received += 1
+            self._receive_sysex(message)
+        elif len(message) == 3:
+            self._receive_channel_message(message)
+
+    def _receive_channel_message(self, message):
+        channels = constants.MidiChannels
+        status, number, value = message
+        if status & 0xF0 != 0xB0:
+            return
+        channel = status & 0xF
+        if channel == channels.ROTARY_ENCODER:
+            self.values[number] = value
+        elif channel == channels.SWITCH_AND_COLOR:
+            self.colors[number] = value
+        elif channel == channels.ANIMATIONS_AND_BRIGHTNESS:
+            self.animations[number] = value
+        elif (
+            channel == channels.SYSTEM
+            and number <= constants.SystemMessages.BANK4
+            and value == constants.SystemMessages.BANK_ON
+        ):
+            self.bank = number
+
+    def _receive_sysex(self, message):
+        parsed = parse_sysex(message)
+        if parsed is None:
+            return
+        command, payload = parsed
+        commands = constants.SysExCommands
+
+        if command == commands.PUSH_CONF:
+            with self._lock:
+                self._global_settings.update(parse_pairs(payload))
+        elif command == commands.PULL_CONF:
+            with self._lock:
+                pairs = sorted(self._global_settings.items())
+            self._send(list(build_push_conf(pairs)))
+        elif command == commands.BULK_XFER and len(payload) >= 2:
+            index = payload[1] - 1
+            if index not in range(constants.Encoders.DEVICE_KNOB_NUM):
+                return
+            if payload[0] == 0x01:  # Request
+                with self._lock:
+                    pairs = sorted(self._encoder_settings[index].items())
+                for reply in build_bulk_xfer(index + 1, pairs):
+                    self._send(list(reply))
+            elif len(payload) >= 5:  # Push: tag, part, total parts, size
+                part, total_parts, size = payload[2:5]
+                data = payload[5 : 5 + size]
+                if part == 1:
+                    self._bulk_parts[index] = data
+                else:
+                    self._bulk_parts[index] = (
+                        self._bulk_parts.get(index, b"") + data
+                    )
+                if part == total_parts:
+                    pairs = parse_pairs(self._bulk_parts.pop(index))
+                    with self._lock:
+                        self._encoder_settings[index].update(pairs)
+
+    def _send(self, message: list):
+        """
+        Sends a message to every connected host.
+        """
+        self.messages_sent += 1
+        for connection in self._connections:
+            connection._deliver(message)
+
+    def _is_relative(self, encoder: int) -> bool:
+        return (
+            self._encoder_settings[encoder].get(_ENCODER_TYPE_ADDRESS)
+            == constants.EncoderSettings.MIDITYPE_SENDRELENC
+        )
+
+    def turn(self, encoder: int, steps: int = 1):
+        """
+        Turns a knob by steps (negative turns counter-clockwise), sending
+        what the firmware sends for the encoder's MIDI type.
+        """
+        channel = constants.MidiChannels.ROTARY_ENCODER
+        if self._is_relative(encoder):
+            control = constants.EncoderControl
+            value = (
+                control.KNOB_INCREMENT if steps > 0 else control.KNOB_DECREMENT
+            )
+            for _ in range(abs(steps)):
+                self._send([0xB0 + channel, encoder, value])
+            return
+        value = min(max(self.values[encoder] + steps, 0), 127)
+        if value != self.values[encoder]:
+            self.values[encoder] = value
+            self._send([0xB0 + channel, encoder, value])
+
+    def set_knob(self, encoder: int, value: int):
+        """
+        Moves an absolute knob straight to a 0-127 value.
+        """
+        self.values[encoder] = value
+        self._send(
+            [0xB0 + constants.MidiChannels.ROTARY_ENCODER, encoder, value]
+        )
+
+    def press(self, encoder: int, pressed: bool = True):
+        """
+        Presses or releases an encoder's switch.
+        """
+        self._send(
+            [
+                0xB0 + constants.MidiChannels.SWITCH_AND_COLOR,
+                encoder,
+                127 if pressed else 0,
+            ]
+        )
+
+    def press_side_button(self, button: int, pressed: bool = True):
+        """
+        Presses or releases a side button (CC number, see
+        constants.SystemMessages).
+        """
+        self._send(
+            [
+                0xB0 + constants.MidiChannels.SYSTEM,
+                button,
+                127 if pressed else 0,
+            ]
+        )
+
+    def select_bank(self, bank: int):
+        """
+        Switches to a bank as if with the side buttons.
+        """
+        self.bank = bank
+        self._send(
+            [
+                0xB0 + constants.MidiChannels.SYSTEM,
+                bank,
+                constants.SystemMessages.BANK_ON,
+            ]
+        )
+
+    def send_burst(self, count: int, encoders=None, seed: int = None) -> int:
+        """
+        Sends count random knob turns as fast as possible from the calling
+        thread.
+
+        Returns:
+            The number of messages sent.
+        """
+        encoders = tuple(
+            encoders
+            if encoders is not None
+            else range(constants.Encoders.DEVICE_KNOB_NUM)
+        )
+        rng = random.Random(seed)
+        sent_before = self.messages_sent
+        for _ in range(count):
+            encoder = rng.choice(encoders)
+            self.turn(encoder, rng.choice((-1, 1)) * rng.randint(1, 3))
+        return self.messages_sent - sent_before
+
+    def start_traffic(
+        self,
+        rate: float,
+        encoders=None,
+        seed: int = None,
+        on_send: Callable[[], None] = None,
+    ):
+        """
+        Starts a thread turning random knobs at rate turns per second.
+
+        Args:
+            rate: Turns per second.
+            encoders: Encoder indices to turn. Defaults to all of them.
+            seed: Seed of the random turns, for reproducible runs.
+            on_send: Called right before each turn, e.g. to take a timestamp.
+        """
+        if self._traffic_thread is not None:
+            return
+        encoders = tuple(
+            encoders
+            if encoders is not None
+            else range(constants.Encoders.DEVICE_KNOB_NUM)
+        )
+        self._traffic_active = True
+        self._traffic_thread = threading.Thread(
+            target=self._traffic_loop,
+            args=(rate, encoders, random.Random(seed), on_send),
+        )
+        self._traffic_thread.daemon = True
+        self._traffic_thread.start()
+
+    def stop_traffic(self):
+        """
+        Stops the traffic thread.
+        """
+        self._traffic_active = False
+        if self._traffic_thread is not None:
+            self._traffic_thread.join()
+            self._traffic_thread = None
+
+    def _traffic_loop(self, rate, encoders, rng, on_send):
+        interval = 1.0 / rate
+        next_send_time = time.monotonic()
+        while self._traffic_active:
+            delay = next_send_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            encoder = rng.choice(encoders)
+            if on_send is not None:
+                on_send()
+            self.turn(encoder, rng.choice((-1, 1)) * rng.randint(1, 3))
+            next_send_time += interval
+
+
+class SimulatorTransport(Transport):
+    """
+    Transport connecting a MidiFighterTwister to TwisterSimulators.
+    """
+
+    def __init__(self, simulators: list):
+        """
+        Args:
+            simulators: The simulators this transport can open, as if they
+                were connected devices.
+        """
+        self._simulators = list(simulators)
+        self._simulator = None
+        self._callback = None
+        self._messages = collections.deque()
+        self._last_message_time = None
+        self.identity = None
+
+    def list_devices(self) -> list:
+        return [simulator.identity for simulator in self._simulators]
+
+    def open(self, device_id: int | str = None) -> bool:
+        if device_id is None:
+            device_id = 0
+        for index, simulator in enumerate(self._simulators):
+            if device_id == index or device_id == simulator.identity:
+                self._simulator = simulator
+                self.identity = simulator.identity
+                simulator._connect(self)
+                return True
+        return False
+
+    @property
+    def is_open(self) -> bool:
+        return self._simulator is not None
+
+    def send_message(self, message):
+        if self._simulator is not None:
+            self._simulator.receive(message)
+
+    def get_message(self) -> tuple | None:
+        try:
+            return self._messages.popleft()
+        except IndexError:
+            return None
+
+    def set_callback(self, callback: Callable[[tuple, object], None]):
+        self._callback = callback
+
+    def cancel_callback(self):
+        self._callback = None
+
+    def close(self):
+        if self._simulator is not None:
+            self._simulator._disconnect(self)
+            self._simulator = None
+
+    def _deliver(self, message: list):
+        """
+        Receives a message from the simulator.
+        """
+        now = time.monotonic()
+        delta = (
+            now - self._last_message_time
+            if self._last_message_time is not None
+            else 0.0
+        )
+        self._last_message_time = now
+        callback = self._callback
+        if callback is not None:
+            callback((message, delta), None)
+        else:
+            self._messages.append((message, delta))
@@ -0,0 +1,270 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS: tuple = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class Histogram:
+    """
+    Histogram of durations over fixed buckets, in constant memory.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Args:
+            buckets: Increasing upper bounds of the buckets, in seconds. An
+                extra bucket counts everything above the last one.
+        """
+        self.buckets = tuple(buckets)
+        self._bounds_ns = tuple(round(bound * 1e9) for bound in self.buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe_ns(self, duration_ns: int):
+        """
+        Records a duration in nanoseconds.
+        """
+        self.counts[bisect_left(self._bounds_ns, duration_ns)] += 1
+        self.count += 1
+        self.sum_ns += duration_ns
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Returns the upper bound of the bucket holding the q quantile (0-1),
+        in seconds, or None without observations. Durations above the last
+        bucket are reported as infinity.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank and count:
+                if index < len(self.buckets):
+                    return self.buckets[index]
+                return float("inf")
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+            "count": self.count,
+            "sum": self.sum_ns / 1e9,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+
+class Stats:
+    """
+    Counters and latency histograms of one device.
+
+    Created by MidiFighterTwister(collect_stats=True) and read with
+    MidiFighterTwister.stats(). Updates may come from the reading, writer,
+    transfer and callback threads, so they are made under a lock.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self.messages_received = 0  # MIDI messages received from the device
+        self.messages_ignored = 0  # Received messages with no handler
+        self.messages_sent = 0  # Channel messages sent to the device
+        self.sysex_messages_sent = 0
+        self.sysex_bytes_sent = 0
+        self.output_values_dropped = 0  # Values replaced before being sent
+        self.events_dropped = 0  # Events dropped by event queues or workers
+        self.callbacks = 0  # Handler and callback calls
+        # Time from the transport delivering a message until its batch has
+        # been dispatched to the handlers
+        self.ingress_latency = Histogram(buckets)
+        self.callback_duration = Histogram(buckets)
+
+    def record_batch(self, messages: list, ignored: int, now_ns: int):
+        """
+        Records a batch of received messages. Messages timestamped at ingress
+        (a third tuple item in perf_counter_ns) add to the latency histogram.
+        """
+        with self._lock:
+            self.messages_received += len(messages)
+            self.messages_ignored += ignored
+            observe_ns = self.ingress_latency.observe_ns
+            for message in messages:
+                if len(message) > 2:
+                    observe_ns(now_ns - message[2])
+
+    def record_sent(self):
+        with self._lock:
+            self.messages_sent += 1
+
+    def record_sysex_sent(self, size: int):
+        with self._lock:
+            self.sysex_messages_sent += 1
+            self.sysex_bytes_sent += size
+
+    def set_dropped(self, output_values: int, events: int):
+        """
+        Updates the drop counts kept by the output writer, event queues and
+        callback workers.
+        """
+        with self._lock:
+            self.output_values_dropped = output_values
+            self.events_dropped = events
+
+    def call_timed(self, function, *args):
+        """
+        Calls function(*args) and records its execution time.
+        """
+        start = time.perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            duration = time.perf_counter_ns() - start
+            with self._lock:
+                self.callbacks += 1
+                self.callback_duration.observe_ns(duration)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of every counter and histogram.
+        """
+        with self._lock:
+            return {
+                "messages_received": self.messages_received,
+                "messages_ignored": self.messages_ignored,
+                "messages_sent": self.messages_sent,
+                "sysex_messages_sent": self.sysex_messages_sent,
+                "sysex_bytes_sent": self.sysex_bytes_sent,
+                "output_values_dropped": self.output_values_dropped,
+                "events_dropped": self.events_dropped,
+                "callbacks": self.callbacks,
+                "ingress_latency": self.ingress_latency.snapshot(),
+                "callback_duration": self.callback_duration.snapshot(),
+            }
+
+    def reset(self):
+        """
+        Zeroes the counters and histograms. Drop counts are kept by their
+        owners and are not reset.
+        """
+        with self._lock:
+            self.messages_received = 0
+            self.messages_ignored = 0
+            self.messages_sent = 0
+            self.sysex_messages_sent = 0
+            self.sysex_bytes_sent = 0
+            self.callbacks = 0
+            self.ingress_latency.reset()
+            self.callback_duration.reset()
+
+    def to_prometheus(self, prefix: str = "pymft", labels: dict = None) -> str:
+        """
+        Returns the stats in the Prometheus text exposition format.
+
+        Args:
+            prefix: Prefix of the metric names.
+            labels: Labels added to every sample, e.g. {"device": ...}.
+        """
+        label_text = ",".join(
+            f'{name}="{_escape_label(str(value))}"'
+            for name, value in (labels or {}).items()
+        )
+        snapshot = self.snapshot()
+        lines = []
+
+        def sample(name: str, value, extra: str = ""):
+            text = ",".join(part for part in (label_text, extra) if part)
+            braces = f"{{{text}}}" if text else ""
+            lines.append(f"{prefix}_{name}{braces} {_format_value(value)}")
+
+        for name, kind, help_text in _METRICS:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            if kind != "histogram":
+                sample(name, snapshot[name.removesuffix("_total")])
+                continue
+            histogram = snapshot[name.removesuffix("_seconds")]
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                sample(
+                    f"{name}_bucket", cumulative, f'le="{_format_value(bound)}"'
+                )
+            sample(f"{name}_sum", histogram["sum"])
+            sample(f"{name}_count", histogram["count"])
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = (
+    (
+        "messages_received_total",
+        "counter",
+        "MIDI messages received from the device.",
+    ),
+    (
+        "messages_ignored_total",
+        "counter",
+        "Received MIDI messages without a handler.",
+    ),
+    ("messages_sent_total", "counter", "MIDI messages sent to the device."),
+    (
+        "sysex_messages_sent_total",
+        "counter",
+        "SysEx messages sent to the device.",
+    ),
+    ("sysex_bytes_sent_total", "counter", "SysEx bytes sent to the device."),
+    (
+        "output_values_dropped_total",
+        "counter",
+        "Output values replaced or skipped before being sent.",
+    ),
+    (
+        "events_dropped_total",
+        "counter",
+        "Events dropped by full event queues or callback mailboxes.",
+    ),
+    ("callbacks_total", "counter", "Callback and handler calls."),
+    (
+        "ingress_latency_seconds",
+        "histogram",
+        "Time from receiving a message until it has been dispatched.",
+    ),
+    (
+        "callback_duration_seconds",
+        "histogram",
+        "Execution time of callbacks and handlers.",
+    ),
+)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
@@ -0,0 +1,101 @@
+from pymft.src.constants import constants
+
+SYSEX_START: int = 0xF0
+SYSEX_END: int = 0xF7
+
+# Start of every DJTT SysEx message, followed by the command byte
+SYSEX_HEADER: bytes = bytes(
+    [
+        SYSEX_START,
+        constants.MIDI_MFR_ID_0,
+        constants.MIDI_MFR_ID_1,
+        constants.MIDI_MFR_ID_2,
+    ]
+)
+
+
+def build_bulk_xfer(tag: int, pairs: list) -> list:
+    """
+    Packs (address, value) pairs for one encoder into BULK_XFER messages of
+    at most PART_SIZE_BYTES payload bytes each.
+
+    Args:
+        tag: The encoder's SysEx tag (encoder index + 1).
+        pairs: The (address, value) pairs to send.
+
+    Returns:
+        A list of complete SysEx messages as bytes.
+    """
+    data = bytes(byte for pair in pairs for byte in pair)
+    if not data:
+        return []
+
+    part_size = constants.PART_SIZE_BYTES
+    total_parts = (len(data) + part_size - 1) // part_size
+    prefix = SYSEX_HEADER + bytes(
+        [constants.SysExCommands.BULK_XFER, 0x00, tag]
+    )
+    messages = []
+    for part in range(total_parts):
+        chunk = data[part * part_size : (part + 1) * part_size]
+        messages.append(
+            prefix
+            + bytes([part + 1, total_parts, len(chunk)])
+            + chunk
+            + bytes([SYSEX_END])
+        )
+    return messages
+
+
+def build_push_conf(pairs: list) -> bytes:
+    """
+    Packs (address, value) pairs of global settings into a PUSH_CONF message.
+    """
+    return (
+        SYSEX_HEADER
+        + bytes([constants.SysExCommands.PUSH_CONF])
+        + bytes(byte for pair in pairs for byte in pair)
+        + bytes([SYSEX_END])
+    )
+
+
+def build_pull_conf() -> bytes:
+    """
+    Builds the message requesting the global configuration from the device.
+    """
+    return SYSEX_HEADER + bytes([constants.SysExCommands.PULL_CONF, SYSEX_END])
+
+
+def build_bulk_request(tag: int) -> bytes:
+    """
+    Builds the BULK_XFER message requesting one encoder's configuration.
+    The 0x01 flag marks a request, where pushes use 0x00.
+    """
+    return SYSEX_HEADER + bytes(
+        [constants.SysExCommands.BULK_XFER, 0x01, tag, SYSEX_END]
+    )
+
+
+def parse_sysex(message) -> tuple | None:
+    """
+    Splits a DJTT SysEx message into its command and payload.
+
+    Returns:
+        (command, payload bytes) or None if the message is not a complete
+        DJTT SysEx message.
+    """
+    header_size = len(SYSEX_HEADER)
+    if (
+        len(message) <= header_size
+        or bytes(message[:header_size]) != SYSEX_HEADER
+        or message[-1] != SYSEX_END
+    ):
+        return None
+    return message[header_size], bytes(message[header_size + 1 : -1])
+
+
+def parse_pairs(data: bytes) -> list:
+    """
+    Splits address/value bytes into (address, value) pairs.
+    """
+    return list(zip(data[0::2], data[1::2]))
@@ -0,0 +1,183 @@
+import collections
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass
+from typing import Callable
+
+DEFAULT_BYTE_RATE: float = 20_000.0  # Bytes per second, well below USB speed
+DEFAULT_WINDOW: int = 8  # Messages allowed in flight at once
+
+
+@dataclass
+class TransferResult:
+    """
+    Outcome of a SysEx transfer.
+    """
+
+    messages: int  # Number of messages sent
+    bytes: int  # Number of bytes sent
+    elapsed: float  # Seconds from the first send until the device drained it
+
+    @property
+    def byte_rate(self) -> float:
+        """
+        Effective bytes per second of the transfer.
+        """
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class TransferEngine:
+    """
+    Sends batches of SysEx messages from a background thread.
+
+    Each message is assumed to take len(message) / byte_rate seconds to reach
+    the device. At most window messages are in flight at once, and the next
+    message waits until the oldest one has drained. Batches are sent in
+    submission order and each returns a Future resolving to a TransferResult.
+    """
+
+    def __init__(
+        self,
+        send_message: Callable[[bytes], None],
+        byte_rate: float | None = DEFAULT_BYTE_RATE,
+        window: int = DEFAULT_WINDOW,
+    ):
+        """
+        Args:
+            send_message: Function sending one SysEx message to the device.
+            byte_rate: Byte budget per second, or None to send unpaced.
+            window: Maximum number of messages in flight at once.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._send_message = send_message
+        self._byte_rate = byte_rate
+        self._window = window
+        self._jobs = collections.deque()  # (messages, future)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._active = False
+        self._stopping = threading.Event()  # Set when close() gives up
+
+    def set_limits(self, byte_rate: float | None, window: int):
+        """
+        Changes the byte budget and window used for the next messages.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self._byte_rate = byte_rate
+        self._window = window
+
+    def submit(self, messages: list) -> Future:
+        """
+        Queues a batch of SysEx messages and returns immediately.
+
+        Returns:
+            A Future resolving to a TransferResult once every message of the
+            batch has been sent and drained.
+        """
+        future = Future()
+        if not messages:
+            future.set_result(TransferResult(0, 0, 0.0))
+            return future
+
+        with self._condition:
+            self._jobs.append((messages, future))
+            if self._thread is None:
+                self._active = True
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._transfer_loop)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+        return future
+
+    def close(self, timeout: float | None = 5.0):
+        """
+        Finishes the queued transfers and stops the transfer thread.
+
+        Transfers not finished within timeout are given up: the queued ones
+        are cancelled and the one in progress stops before its next message,
+        failing its Future with CancelledError.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if self._thread is None:
+                return
+            if not self._condition.wait_for(
+                lambda: not self._jobs, timeout=timeout
+            ):
+                self._stopping.set()
+                for _, future in self._jobs:
+                    future.cancel()  # Fails for the transfer in progress
+                # Only the transfer in progress is left for the loop to pop
+                while len(self._jobs) > 1:
+                    self._jobs.pop()
+            self._active = False
+            self._condition.notify_all()
+        if deadline is None:
+            self._thread.join()
+        else:
+            self._thread.join(max(deadline - time.monotonic(), 0.0))
+        self._thread = None
+
+    def _transfer_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._jobs or not self._active)
+                if not self._jobs:
+                    return
+                messages, future = self._jobs[0]
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._transfer(messages))
+                except Exception as e:
+                    future.set_exception(e)
+
+            with self._condition:
+                self._jobs.popleft()
+                self._condition.notify_all()
+
+    def _transfer(self, messages: list) -> TransferResult:
+        """
+        Sends one batch within the byte budget and window.
+        """
+        in_flight = collections.deque()  # Estimated drain time of each message
+        drained_at = start = time.monotonic()
+        total_bytes = 0
+        for message in messages:
+            byte_rate = self._byte_rate
+            now = time.monotonic()
+            while in_flight and in_flight[0] <= now:
+                in_flight.popleft()
+            if len(in_flight) >= self._window:
+                self._sleep(in_flight.popleft() - now)
+                now = time.monotonic()
+            elif self._stopping.is_set():
+                raise CancelledError("Transfer cancelled by close()")
+
+            self._send_message(message)
+            total_bytes += len(message)
+            if byte_rate:
+                drained_at = max(drained_at, now) + len(message) / byte_rate
+                in_flight.append(drained_at)
+            else:
+                drained_at = now
+
+        # Wait for the last messages to drain so elapsed covers the transfer.
+        # Everything was sent, so close() only cuts the wait short.
+        remaining = drained_at - time.monotonic()
+        if remaining > 0:
+            self._stopping.wait(remaining)
+        return TransferResult(
+            len(messages), total_bytes, time.monotonic() - start
+        )
+
+    def _sleep(self, delay: float):
+        """
+        Sleeps for delay seconds, unless close() gives up on the transfer.
+        """
+        if self._stopping.wait(max(delay, 0.0)):
+            raise CancelledError("Transfer cancelled by close()")
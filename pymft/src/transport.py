@@ -0,0 +1,153 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from pymft.src.constants import constants
+from pymft.src.ports import find_devices
+
+
+class Transport(ABC):
+    """
+    Connection between the library and one device.
+
+    MidiFighterTwister only talks to the device through this interface, so a
+    transport can be backed by real MIDI ports (RtMidiTransport) or by a
+    software device (see simulator.TwisterSimulator).
+
+    Messages are lists of bytes. Received messages are (message, delta time)
+    tuples, as with rtmidi. Subclasses must implement every method, or they
+    cannot be instantiated.
+    """
+
+    identity: str | None = None  # Identity of the opened device
+
+    @abstractmethod
+    def list_devices(self) -> list:
+        """
+        Returns the identities of the devices this transport can open.
+        """
+
+    @abstractmethod
+    def open(self, device_id: int | str = None) -> bool:
+        """
+        Opens a device by index in list_devices() order or by identity.
+        Defaults to the first device.
+
+        Returns:
+            True if the device was opened.
+        """
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        """
+        True while a device is open.
+        """
+
+    @abstractmethod
+    def send_message(self, message):
+        """
+        Sends a MIDI message to the device. Called from several threads, so
+        each message must be sent whole.
+        """
+
+    @abstractmethod
+    def get_message(self) -> tuple | None:
+        """
+        Returns the next received message, or None if there is none. Only
+        used while no callback is set.
+        """
+
+    @abstractmethod
+    def set_callback(self, callback: Callable[[tuple, object], None]):
+        """
+        Makes the transport call callback((message, delta time), None) for
+        every received message, from a thread of its own.
+        """
+
+    @abstractmethod
+    def cancel_callback(self):
+        """
+        Stops calling the callback set with set_callback().
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        Closes the device.
+        """
+
+
+class RtMidiTransport(Transport):
+    """
+    Transport over the MIDI ports of a connected device, using python-rtmidi.
+    """
+
+    def __init__(self, device_name: str = constants.DEVICE_NAME):
+        """
+        Args:
+            device_name: Text the device's port names contain.
+        """
+        # Imported here so that other transports work without rtmidi
+        import rtmidi
+
+        self._midi_in = rtmidi.MidiIn()
+        self._midi_out = rtmidi.MidiOut()
+        # rtmidi output is not thread-safe, and the output writers, the
+        # transfer engine and the caller all send
+        self._send_lock = threading.Lock()
+        self._device_name = device_name
+        self._is_open = False
+        self.identity = None
+
+    def list_devices(self) -> list:
+        return [
+            device.identity
+            for device in find_devices(
+                self._midi_in, self._midi_out, self._device_name
+            )
+        ]
+
+    def open(self, device_id: int | str = None) -> bool:
+        if device_id is None:
+            device_id = 0
+
+        devices = find_devices(self._midi_in, self._midi_out, self._device_name)
+        for index, device in enumerate(devices):
+            if device_id == index or device_id == device.identity:
+                try:
+                    self._midi_in.open_port(device.input_port)
+                    # Configuration replies arrive as SysEx
+                    self._midi_in.ignore_types(sysex=False)
+                    self._midi_out.open_port(device.output_port)
+                except Exception as e:
+                    print(f"Error opening MIDI ports: {e}")
+                    return False
+                self.identity = device.identity
+                self._is_open = True
+                return True
+        return False
+
+    @property
+    def is_open(self) -> bool:
+        return self._is_open
+
+    def send_message(self, message):
+        with self._send_lock:
+            self._midi_out.send_message(message)
+
+    def get_message(self) -> tuple | None:
+        return self._midi_in.get_message()
+
+    def set_callback(self, callback: Callable[[tuple, object], None]):
+        self._midi_in.set_callback(callback)
+
+    def cancel_callback(self):
+        self._midi_in.cancel_callback()
+
+    def close(self):
+        if self._is_open:
+            self._midi_in.close_port()
+            with self._send_lock:
+                self._midi_out.close_port()
+            self._is_open = False
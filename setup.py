@@ -20,6 +20,7 @@ setup(
     author_email="sinas.cb@gmail.com",
     packages=find_packages(exclude=["tests", "tests.*"]),
     install_requires=["python-rtmidi>=1.5.8", "typing>=3.7.4"],
+    extras_require={"numpy": ["numpy>=1.23"]},
     entry_points={
         "console_scripts": [
             "demo_main=pymft.main:run",
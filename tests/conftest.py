@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from pymft import MidiFighterTwister, TwisterSimulator
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    """
+    Polls predicate until it is true or the timeout expires.
+    """
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+@pytest.fixture
+def simulator():
+    return TwisterSimulator()
+
+
+@pytest.fixture
+def make_mft(simulator):
+    """
+    Creates discovered MidiFighterTwisters connected to the simulator, and
+    closes them at the end of the test.
+    """
+    devices = []
+
+    def make(**kwargs):
+        device = MidiFighterTwister(transport=simulator.transport(), **kwargs)
+        assert device.discover()
+        devices.append(device)
+        return device
+
+    yield make
+    for device in devices:
+        device.close()
+
+
+@pytest.fixture
+def mft(make_mft):
+    return make_mft()
@@ -0,0 +1,218 @@
+import json
+from concurrent.futures import CancelledError
+
+import pytest
+
+import pymft
+from pymft import KnobSettings, MappingCurve, constants
+from pymft.src.sysex import build_bulk_xfer
+
+ACTIVE_COLOR_ADDRESS = 19
+
+
+def test_configure_pushes_settings_to_the_device(mft, simulator):
+    mft.subscribe(3, KnobSettings(led_color=constants.ColorValues.RED))
+
+    result = mft.configure()
+
+    assert result.result().messages > 0
+    settings = simulator.encoder_settings(3)
+    assert settings[ACTIVE_COLOR_ADDRESS] == constants.ColorValues.RED
+
+
+def test_configure_only_pushes_changes(mft, simulator):
+    mft.configure(force_all=True)
+    received = simulator.sysex_received
+
+    mft.configure()
+    assert simulator.sysex_received == received
+
+    mft.subscribe(0, KnobSettings(led_color=constants.ColorValues.BLUE))
+    mft.configure()
+    assert simulator.sysex_received == received + 1
+
+
+def test_cancelled_pushes_are_sent_again(mft):
+    full_push = len(mft.config._collect(force_all=True)[0])
+    mft.config.set_transfer_limits(byte_rate=1000.0, window=1)
+    future = mft.configure(wait=False)
+
+    mft.config.close(timeout=0.05)
+
+    with pytest.raises(CancelledError):
+        future.result(timeout=1.0)
+    mft.config.set_transfer_limits(byte_rate=None, window=8)
+    assert mft.configure().result().messages == full_push
+
+
+def test_failed_pushes_are_sent_again(mft, monkeypatch):
+    full_push = len(mft.config._collect(force_all=True)[0])
+
+    def disconnected(message):
+        raise OSError("Device disconnected")
+
+    monkeypatch.setattr(mft.config._midi_out, "send_message", disconnected)
+    with pytest.raises(OSError):
+        mft.configure()
+    monkeypatch.undo()
+
+    assert mft.configure().result().messages == full_push
+
+
+def test_pull_config_reads_the_device_configuration(make_mft, simulator):
+    writer = make_mft()
+    writer.subscribe(7, KnobSettings(led_color=constants.ColorValues.GREEN))
+    writer.configure(force_all=True)
+
+    reader = make_mft()
+    reader.start()
+    assert reader.pull_config(timeout=2.0, apply=True)
+
+    settings = reader.config._encoders[7].knob_settings
+    assert settings.active_color == constants.ColorValues.GREEN
+    # What the device holds is not pushed again
+    received = simulator.sysex_received
+    reader.configure()
+    assert simulator.sysex_received == received
+
+
+def test_replies_after_a_pull_are_ignored(mft):
+    mft.start()
+    assert mft.pull_config(timeout=2.0)
+    pairs = mft.config._encoders[0].config_pairs()
+    late_reply = build_bulk_xfer(1, pairs)[0]
+
+    assert mft.config.handle_sysex(list(late_reply))
+
+    assert mft.config._pulled_encoders == {}
+    assert mft.config._pull_parts == {}
+
+
+def test_pull_config_requires_input(mft):
+    with pytest.raises(RuntimeError):
+        mft.pull_config()
+
+
+def write_config(path, entries):
+    with open(path, "w") as f:
+        json.dump(entries, f)
+
+
+def config_entry(encoder: str, **values) -> dict:
+    entry = {
+        "bank": "Bank1",
+        "encoder": encoder,
+        "knob_type": "UNIPOLAR",
+        "led_color": "GREEN",
+        "min_threshold": 0,
+        "max_threshold": 10,
+    }
+    entry.update(values)
+    return entry
+
+
+def encoder_state(device) -> list:
+    state = []
+    for encoder in device.config._encoders:
+        fields = dict(vars(encoder.knob_settings))
+        del fields["_version"], fields["_is_modified"]
+        state.append(
+            (fields, encoder.mapping.values, encoder.compiled_config())
+        )
+    subscriptions = {
+        index: vars(knob_settings)
+        for index, knob_settings in device._knob_subscriptions.items()
+    }
+    return [state, subscriptions, device._active_encoders]
+
+
+def test_cached_config_loads_like_the_json(make_mft, tmp_path):
+    path = tmp_path / "config.json"
+    write_config(
+        path,
+        [
+            config_entry("ENCODER_1", curve="S_CURVE"),
+            config_entry("ENCODER_2", curve="STEPPED", steps=4),
+            config_entry("ENCODER_1", max_threshold=5, curve="LOG"),
+        ],
+    )
+    from_json = make_mft()
+    from_json.load_config(str(path))
+    assert (tmp_path / "config.json.pymftc").exists()
+
+    from_cache = make_mft()
+    from_cache.load_config(str(path))
+
+    assert encoder_state(from_cache) == encoder_state(from_json)
+
+
+def test_cached_config_recompiles_mappings_changed_before_loading(
+    make_mft, tmp_path
+):
+    path = tmp_path / "config.json"
+    write_config(path, [config_entry("ENCODER_1", curve="LOG")])
+    make_mft().load_config(str(path))  # Writes the cache
+
+    # The config leaves the curve_amount set here, and with it the table
+    devices = make_mft(), make_mft()
+    for device in devices:
+        device.subscribe(0, KnobSettings(curve_amount=2.0))
+    devices[0].load_config(str(path), use_cache=False)
+    devices[1].load_config(str(path))
+
+    assert encoder_state(devices[1]) == encoder_state(devices[0])
+
+
+def test_cache_written_by_another_version_is_not_used(
+    make_mft, tmp_path, monkeypatch
+):
+    path = tmp_path / "config.json"
+    write_config(path, [config_entry("ENCODER_1", curve="LOG")])
+    monkeypatch.setattr(pymft, "__version__", "0.0.0")
+    make_mft().load_config(str(path))  # Writes the cache
+    cache = (tmp_path / "config.json.pymftc").read_bytes()
+    monkeypatch.undo()
+
+    make_mft().load_config(str(path))
+
+    # Rewritten for this version rather than read
+    assert (tmp_path / "config.json.pymftc").read_bytes() != cache
+
+
+@pytest.mark.parametrize(
+    "curve", [MappingCurve.LOG, MappingCurve.EXPONENTIAL, MappingCurve.S_CURVE]
+)
+def test_curve_amount_must_be_positive(curve):
+    with pytest.raises(ValueError):
+        KnobSettings(curve=curve, curve_amount=0)
+
+
+def test_stepped_curve_needs_two_steps():
+    with pytest.raises(ValueError):
+        KnobSettings(curve=MappingCurve.STEPPED, steps=1)
+
+
+def test_failed_subscribe_leaves_the_encoder_unchanged(mft):
+    settings = dict(vars(mft.config._encoders[0].knob_settings))
+
+    with pytest.raises(ValueError):
+        mft.subscribe(
+            0, KnobSettings(curve=MappingCurve.CUSTOM, max_threshold=9)
+        )
+
+    assert vars(mft.config._encoders[0].knob_settings) == settings
+    assert mft._knob_subscriptions == {}
+    assert mft._active_encoders == ()
+
+
+def test_equal_mappings_share_one_compiled_table(mft):
+    encoders = mft.config._encoders
+    for encoder in range(3):
+        mft.subscribe(
+            encoder, KnobSettings(curve=MappingCurve.LOG, max_threshold=9)
+        )
+    assert encoders[0].mapping is encoders[1].mapping
+
+    mft.subscribe(2, KnobSettings(curve_amount=2.0))
+    assert encoders[2].mapping is not encoders[0].mapping
+    assert encoders[2].mapping.values[1] < encoders[0].mapping.values[1]
@@ -0,0 +1,60 @@
+import threading
+
+from pymft.src.dispatcher import DRAIN_BATCH, CallbackDispatcher
+
+
+def test_calls_of_one_key_run_in_order_one_at_a_time():
+    dispatcher = CallbackDispatcher(max_workers=4)
+    calls = []
+    running = []
+    overlapped = []
+
+    def callback(number: int):
+        running.append(number)
+        if len(running) > 1:
+            overlapped.append(number)
+        calls.append(number)
+        running.remove(number)
+
+    count = DRAIN_BATCH * 3 + 1  # Drained over several turns
+    for number in range(count):
+        dispatcher.submit(0, callback, number)
+    assert dispatcher.flush(timeout=2.0)
+    dispatcher.close()
+
+    assert calls == list(range(count))
+    assert not overlapped
+
+
+def test_calls_of_different_keys_run_concurrently():
+    dispatcher = CallbackDispatcher(max_workers=2)
+    # Each call only returns once the other key's call has started
+    barrier = threading.Barrier(2, timeout=2.0)
+    passed = []
+
+    def callback(key: int):
+        barrier.wait()
+        passed.append(key)
+
+    dispatcher.submit(0, callback, 0)
+    dispatcher.submit(1, callback, 1)
+    assert dispatcher.flush(timeout=2.0)
+    dispatcher.close()
+
+    assert sorted(passed) == [0, 1]
+
+
+def test_full_mailboxes_drop_the_oldest_calls():
+    dispatcher = CallbackDispatcher(max_workers=1, max_pending=2)
+    release = threading.Event()
+    calls = []
+
+    dispatcher.submit(0, release.wait, 2.0)  # Occupies the only worker
+    for number in range(5):
+        dispatcher.submit(1, calls.append, number)
+    release.set()
+    assert dispatcher.flush(timeout=2.0)
+    dispatcher.close()
+
+    assert calls == [3, 4]
+    assert dispatcher.dropped == 3
@@ -0,0 +1,55 @@
+import threading
+
+from pymft.src.encoder_state import EncoderState
+
+
+def test_snapshots_during_concurrent_writes_are_consistent():
+    state = EncoderState()
+    stop = threading.Event()
+
+    def write():
+        value = 0
+        while not stop.is_set():
+            value = (value + 1) % 128
+            state.write_many(
+                (index, value, float(value)) for index in range(len(state))
+            )
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            snapshot = state.snapshot()
+            assert len(set(snapshot.raw)) == 1
+            assert list(snapshot.mapped) == [float(snapshot.raw[0])] * 64
+            assert snapshot.sequence % 2 == 0
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_read_retries_when_a_write_overlaps():
+    state = EncoderState()
+    calls = []
+
+    def reader(raw, mapped):
+        calls.append(raw[3])
+        if len(calls) == 1:
+            state.write(3, 42, 0.5)  # As if written while copying
+        return raw[3], mapped[3]
+
+    assert state.read(reader) == (42, 0.5)
+    assert calls == [0, 42]
+
+
+def test_changed_values_set_dirty_bits_until_taken():
+    state = EncoderState()
+    state.write(1, 10, 0.1)
+    state.write_many([(2, 20, 0.2), (40, 0, 0.0)])  # Encoder 40 is unchanged
+
+    assert state.take_dirty(mask=1 << 2) == 1 << 2
+    assert state.take_dirty() == 1 << 1
+    assert state.take_dirty() == 0
+
+    state.set_mapped(1, 0.5)
+    assert state.take_dirty() == 1 << 1
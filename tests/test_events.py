@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from conftest import wait_for
+
+from pymft import (
+    AsyncMidiFighterTwister,
+    BankChangeEvent,
+    EncoderEvent,
+    EventQueue,
+    KnobSettings,
+    OverflowPolicy,
+    SideButtonEvent,
+    SwitchEvent,
+    constants,
+)
+
+
+def test_switch_events(mft, simulator):
+    events = []
+    mft.on_event(SwitchEvent, events.append)
+    mft.start()
+
+    simulator.press(4)
+    simulator.press(4, pressed=False)
+
+    assert wait_for(lambda: len(events) == 2)
+    assert [(event.encoder, event.pressed) for event in events] == [
+        (4, True),
+        (4, False),
+    ]
+
+
+def test_bank_and_side_button_events(mft, simulator):
+    banks = []
+    buttons = []
+    mft.on_event(BankChangeEvent, banks.append)
+    mft.on_event(SideButtonEvent, buttons.append)
+    mft.start()
+
+    simulator.select_bank(constants.SystemMessages.BANK2)
+    simulator.press_side_button(constants.SystemMessages.BANK1_LEFT1)
+
+    assert wait_for(lambda: banks and buttons)
+    assert banks[0].bank == constants.SystemMessages.BANK2
+    assert buttons[0].pressed
+
+
+def test_event_queue_receives_subscribed_encoders(mft, simulator):
+    mft.subscribe(1, KnobSettings(led_color=constants.ColorValues.BLUE))
+    queue = mft.events()
+    mft.start()
+
+    simulator.set_knob(0, 10)  # Not subscribed
+    simulator.set_knob(1, 127)
+
+    event = queue.get(timeout=2.0)
+    assert event == EncoderEvent(1, "ENCODER_2", 1.0, 127)
+    assert queue.get(timeout=0.05) is None
+
+
+def test_blocking_put_many_wakes_consumers():
+    queue = EventQueue(maxsize=2, policy=OverflowPolicy.BLOCK)
+    received = []
+
+    def consume():
+        while len(received) < 5:
+            received.extend(queue.get_batch(timeout=2.0))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    queue.put_many(list(range(5)))
+    consumer.join(timeout=2.0)
+
+    assert received == [0, 1, 2, 3, 4]
+    assert queue.dropped == 0
+
+
+class NoReaderEventLoop(asyncio.SelectorEventLoop):
+    """
+    Lacks add_reader(), like the ProactorEventLoop on Windows.
+    """
+
+    def add_reader(self, *args):
+        raise NotImplementedError
+
+
+@pytest.mark.parametrize(
+    "make_loop", [asyncio.new_event_loop, NoReaderEventLoop]
+)
+def test_async_events(simulator, make_loop):
+    async def run():
+        async with AsyncMidiFighterTwister(
+            transport=simulator.transport(), callback_workers=2
+        ) as mft:
+            assert mft.discover()
+            mft.subscribe(0, KnobSettings(led_color=constants.ColorValues.RED))
+            await mft.configure()
+            mft.start()
+            simulator.set_knob(0, 127)
+            async for event in mft.events():
+                return event
+
+    loop = make_loop()
+    try:
+        event = loop.run_until_complete(asyncio.wait_for(run(), timeout=5.0))
+    finally:
+        loop.close()
+
+    assert event == EncoderEvent(0, "ENCODER_1", 1.0, 127)
+
+
+def test_async_iterators_drop_the_oldest_events_when_behind(simulator):
+    async def run():
+        async with AsyncMidiFighterTwister(
+            transport=simulator.transport()
+        ) as mft:
+            events = mft.events(batch=True, maxsize=2)
+            first_batch = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0)  # Let the iterator register
+            mft._on_events([1, 2, 3, 4, 5])
+            return await first_batch, mft.dropped
+
+    batch, dropped = asyncio.run(asyncio.wait_for(run(), timeout=5.0))
+
+    assert batch == [4, 5]
+    assert dropped == 3
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from pymft import FilterType
+from pymft.src.filters import NUMPY_MIN_ACTIVE, FilterBank
+
+
+def settle(filters: FilterBank, size: int = 4) -> list:
+    """
+    Starts every filter at 0.0 at time 0.0.
+    """
+    return filters.tick([0.0] * size, 0.0)
+
+
+def test_ema_covers_63_percent_of_a_step_per_time_constant():
+    filters = FilterBank(size=4, use_numpy=False)
+    filters.set_filter(1, FilterType.EMA, time_constant=0.1)
+    settle(filters)
+
+    values = filters.tick([0.5, 1.0, 1.0, 1.0], 0.1)
+
+    assert values[1] == pytest.approx(1.0 - math.exp(-1.0))
+    assert values[0] == 0.5 and values[2:] == [1.0, 1.0]  # No filter
+    assert filters.tick([0.5, 1.0, 1.0, 1.0], 0.2)[1] == pytest.approx(
+        1.0 - math.exp(-2.0)
+    )
+
+
+def test_one_euro_follows_fast_moves_more_closely():
+    filters = FilterBank(size=4, use_numpy=False)
+    filters.set_filter(0, FilterType.ONE_EURO, min_cutoff=1.0)
+    filters.set_filter(1, FilterType.ONE_EURO, min_cutoff=1.0, beta=1.0)
+    settle(filters)
+
+    values = filters.tick([1.0] * 4, 0.1)
+
+    # At rest the cutoff is min_cutoff
+    assert values[0] == pytest.approx(1.0 / (1.0 + 1.0 / (2 * math.pi * 0.1)))
+    assert values[0] < values[1] < 1.0
+
+
+def test_slew_limits_the_change_per_second_in_spans():
+    filters = FilterBank(size=4, use_numpy=False)
+    filters.set_filter(2, FilterType.SLEW, rate=2.0)
+    filters.set_span(2, 10.0)
+    settle(filters)
+
+    assert filters.tick([10.0] * 4, 0.1)[2] == pytest.approx(2.0)
+    assert filters.tick([-10.0] * 4, 0.2)[2] == pytest.approx(0.0)
+    assert filters.tick([-10.0] * 4, 2.0)[2] == pytest.approx(-10.0)
+
+
+def test_numpy_ticks_match_the_python_loop():
+    pytest.importorskip("numpy")
+    size = 64
+    filter_types = [
+        FilterType.EMA,
+        FilterType.ONE_EURO,
+        FilterType.SLEW,
+        FilterType.NONE,
+    ]
+    banks = [
+        FilterBank(size, use_numpy=False),
+        FilterBank(size, use_numpy=True),
+    ]
+    for filters in banks:
+        for index in range(size):
+            filters.set_filter(
+                index,
+                filter_types[index % 4],
+                time_constant=0.05,
+                min_cutoff=0.5 + index / size,
+                beta=index / 8,
+                rate=1.0 + index % 3,
+            )
+            filters.set_span(index, 1.0 + index % 5)
+    assert len(banks[1].active) >= NUMPY_MIN_ACTIVE
+
+    for step in range(20):
+        values = [
+            math.sin(step * 0.3 + index) * (1 + index % 5)
+            for index in range(size)
+        ]
+        now = step * 0.01
+        expected, actual = (filters.tick(values, now) for filters in banks)
+        assert actual == pytest.approx(expected)
+        if step == 10:
+            # Changes carry the filter state over to the rebuilt arrays
+            for filters in banks:
+                filters.set_filter(3, FilterType.EMA, time_constant=0.02)
@@ -0,0 +1,163 @@
+import pytest
+
+from conftest import wait_for
+
+from pymft import KnobSettings, MidiFighterTwister, constants
+from pymft.src.output_writer import OutputWriter
+from pymft.src.relative import relative_steps
+
+ENCODER_CC = 0xB0 + constants.MidiChannels.ROTARY_ENCODER
+
+
+def encoder_message(encoder: int, value: int) -> tuple:
+    return ([ENCODER_CC, encoder, value], 0.0)
+
+
+def test_callback_input_updates_values(mft, simulator):
+    changes = []
+    mft.subscribe(0, KnobSettings(led_color=constants.ColorValues.BLUE))
+    mft.set_value_changed_callback(
+        lambda name, value: changes.append((name, value))
+    )
+    mft.start()
+
+    simulator.set_knob(0, 127)
+
+    assert wait_for(lambda: changes)
+    assert changes == [("ENCODER_1", 1.0)]
+    assert mft.read_active() == {0: 1.0}
+
+
+def test_polling_input_updates_values(mft, simulator):
+    mft.start(MidiFighterTwister.InputMode.POLLING)
+
+    simulator.set_knob(5, 64)
+
+    assert wait_for(lambda: mft.config._encoders[5].value == 64)
+
+
+def test_coalescing_keeps_the_last_value_of_each_encoder(mft):
+    changes = []
+    mft.on_change(range(2), lambda *change: changes.append(change))
+
+    mft._handle_midi_messages(
+        [
+            encoder_message(0, 10),
+            encoder_message(1, 20),
+            encoder_message(0, 127),
+        ]
+    )
+
+    assert sorted(changes) == [
+        (0, "ENCODER_1", 1.0),
+        (1, "ENCODER_2", 20 / 127),
+    ]
+
+
+def test_coalescing_skips_unchanged_values(mft):
+    changes = []
+    mft.on_change(0, lambda *change: changes.append(change))
+    mft._handle_midi_messages([encoder_message(0, 64)])
+
+    mft._handle_midi_messages([encoder_message(0, 10), encoder_message(0, 64)])
+
+    assert len(changes) == 1
+
+
+def test_without_coalescing_every_value_is_dispatched(mft):
+    values = []
+    mft.on_change(0, lambda encoder, name, value: values.append(value))
+    mft._coalesce = False
+
+    mft._handle_midi_messages([encoder_message(0, 127), encoder_message(0, 0)])
+
+    assert values == [1.0, 0.0]
+
+
+def test_relative_encoders_accumulate_increments(mft):
+    mft.subscribe(
+        0,
+        KnobSettings(
+            encoder_midi_type=constants.EncoderSettings.MIDITYPE_SENDRELENC,
+            resolution=10,
+        ),
+    )
+    increment = constants.EncoderControl.KNOB_INCREMENT
+
+    mft._handle_midi_messages([encoder_message(0, increment)] * 3)
+
+    assert abs(mft.config._encoders[0].mapped_value - 0.3) < 1e-9
+
+
+def test_relative_values_beyond_the_fastest_speed_are_clamped(mft):
+    fastest = constants.EncoderControl.KNOB_INCREMENT_VERYFAST
+    assert relative_steps(127, 2.0) == relative_steps(fastest, 2.0) == 4.0
+    assert relative_steps(0, 2.0) == -4.0
+
+    mft.subscribe(
+        0,
+        KnobSettings(
+            encoder_midi_type=constants.EncoderSettings.MIDITYPE_SENDRELENC,
+            resolution=100,
+        ),
+    )
+    mft._handle_midi_messages([encoder_message(0, 127)] * 3)
+
+    assert abs(mft.config._encoders[0].mapped_value - 0.12) < 1e-9
+
+
+def test_encoder_numbers_beyond_the_knobs_are_ignored(mft):
+    mft._handle_midi_messages(
+        [encoder_message(100, 5), encoder_message(3, 127)]
+    )
+    mft._coalesce = False
+    mft._handle_midi_messages(
+        [encoder_message(100, 5), encoder_message(4, 127)]
+    )
+
+    assert mft.config._encoders[3].value == 127
+    assert mft.config._encoders[4].value == 127
+
+
+def test_set_encoder_value_is_sent_to_the_device(mft, simulator):
+    mft.set_encoder_value(2, 0.5)
+
+    assert mft.flush_output(2.0)
+    assert simulator.values[2] == 63
+
+
+def test_device_reported_values_cancel_equal_writes():
+    sent = []
+    writer = OutputWriter(sent.append, max_rate=1.0)
+    writer.write(1, 0, 5)
+    writer.write(1, 1, 6)  # Held back by the rate limit
+
+    writer.update_device_values([(1, 1, 6, 0), (1, 2, 7, 0)])
+    writer.write(1, 2, 7)
+
+    assert writer.flush(0.5)
+    assert sent == [[0xB1, 0, 5]]
+    writer.close()
+
+
+def test_array_reads_match_the_dict_reads(mft):
+    np = pytest.importorskip("numpy")
+    mft.subscribe(2, KnobSettings())
+    mft.subscribe(9, KnobSettings())
+    mft._handle_midi_messages(
+        [encoder_message(2, 127), encoder_message(9, 32), encoder_message(5, 7)]
+    )
+
+    mapped = mft.read_all_array()
+    assert mapped.dtype == np.float64
+    assert mapped.tolist() == list(mft.read_all().values())
+    raw = mft.read_all_array(raw=True)
+    assert raw.dtype == np.uint8
+    assert raw[[2, 5, 9]].tolist() == [127, 7, 32]
+
+    assert mft.read_active_array().tolist() == list(mft.read_active().values())
+    out = np.zeros(2, dtype=np.int32)
+    assert mft.read_active_array(raw=True, out=out) is out
+    assert out.tolist() == [127, 32]
+    with pytest.raises(ValueError):
+        mft.read_active_array(out=np.zeros(3))
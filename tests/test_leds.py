@@ -0,0 +1,47 @@
+from conftest import wait_for
+
+from pymft import LedFrame
+
+
+def test_frames_only_send_changes(mft, simulator):
+    assert mft.show_frame(LedFrame.filled(color=20)) == 64
+    assert mft.leds.flush(2.0)
+    assert set(simulator.colors) == {20}
+
+    assert mft.show_frame(LedFrame.filled(color=20).set(3, color=90)) == 1
+
+
+def test_ring_frames_and_encoder_values_share_the_device_state(mft, simulator):
+    mft.set_encoder_value(0, 0.5)
+    assert mft.flush_output(2.0)
+    assert simulator.values[0] == 63
+
+    mft.show_frame(LedFrame().set(0, ring=10))
+    assert mft.flush_output(2.0)
+    assert simulator.values[0] == 10
+
+    mft.set_encoder_value(0, 0.5)
+    assert mft.flush_output(2.0)
+    assert simulator.values[0] == 63
+
+    mft.show_frame(LedFrame().set(0, ring=10))
+    assert mft.flush_output(2.0)
+    assert simulator.values[0] == 10
+
+
+def test_knob_turns_update_the_ring_layer(mft, simulator):
+    mft.start()
+    simulator.set_knob(0, 99)
+
+    assert wait_for(lambda: mft.leds.frame.ring[0] == 99)
+    mft.show_frame(LedFrame().set(0, ring=10))
+    assert mft.flush_output(2.0)
+    assert simulator.values[0] == 10
+
+
+def test_ring_values_recorded_between_frames_keep_their_order(mft):
+    for value in range(300):
+        mft.leds.update_rings([(0, value % 128), (1, 5)])
+
+    assert mft.leds.frame.ring[:3] == [299 % 128, 5, None]
+    assert len(mft.leds._ring_updates) == 0
@@ -0,0 +1,54 @@
+from conftest import wait_for
+
+from pymft import SimulatorTransport, TwisterManager, TwisterSimulator
+
+
+def test_devices_discovered_after_start_are_serviced():
+    connected = [TwisterSimulator("Twister A")]
+    manager = TwisterManager(
+        transport_factory=lambda: SimulatorTransport(connected)
+    )
+    changes = []
+    try:
+        assert manager.discover() == 1
+        manager.start()
+
+        connected.append(TwisterSimulator("Twister B"))
+        assert manager.discover() == 2
+        manager.on_change(
+            ("Twister B", 0), lambda *change: changes.append(change)
+        )
+        connected[1].set_knob(0, 127)
+        connected[0].set_knob(1, 127)
+
+        assert wait_for(lambda: changes)
+        assert changes[0][0] == ("Twister B", 0)
+        assert wait_for(lambda: manager[0].read_all()[1] == 1.0)
+    finally:
+        manager.close()
+
+
+def test_discover_closes_the_transport_it_lists_devices_with():
+    unclosed = []
+
+    class TrackedTransport(SimulatorTransport):
+        def close(self):
+            unclosed.remove(self)
+            super().close()
+
+    def transport_factory():
+        transport = TrackedTransport([TwisterSimulator("Twister A")])
+        unclosed.append(transport)
+        return transport
+
+    manager = TwisterManager(
+        transport_factory=transport_factory, max_led_rate=None
+    )
+    try:
+        assert manager.discover() == 1
+        # Only the transport of the opened device is left
+        assert unclosed == [manager[0]._transport]
+        assert manager[0]._led_engine._writer._interval == 0.0
+    finally:
+        manager.close()
+    assert not unclosed
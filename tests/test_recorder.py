@@ -0,0 +1,90 @@
+import struct
+
+from conftest import wait_for
+
+from pymft import (
+    KnobSettings,
+    MidiFighterTwister,
+    Recording,
+    RecordingTransport,
+    ReplayTransport,
+    SessionRecorder,
+    constants,
+)
+from pymft.src.recorder import INBOUND, OUTBOUND
+
+HEADER_SIZE = 20  # magic, version, record size, start time
+RECORD = struct.Struct("<QBBH12s")  # time, direction, flags, length, data
+
+
+def test_messages_take_fixed_width_records(tmp_path):
+    path = tmp_path / "session.pymftrec"
+    sysex = [0xF0] + list(range(28)) + [0xF7]  # Needs three records
+    with SessionRecorder(str(path)) as recorder:
+        start_ns = recorder._start_ns
+        recorder.record(INBOUND, [0xB0, 1, 127], start_ns + 1_000)
+        recorder.record(OUTBOUND, sysex, start_ns + 2_000)
+
+    data = path.read_bytes()
+    assert RECORD.size == 24
+    assert len(data) == HEADER_SIZE + 4 * RECORD.size
+    records = [
+        RECORD.unpack_from(data, offset)
+        for offset in range(HEADER_SIZE, len(data), RECORD.size)
+    ]
+    assert records[0] == (1_000, INBOUND, 0, 3, bytes([0xB0, 1, 127] + [0] * 9))
+    assert [record[:4] for record in records[1:]] == [
+        (2_000, OUTBOUND, 0, 30),
+        (2_000, OUTBOUND, 1, 30),
+        (2_000, OUTBOUND, 1, 30),
+    ]
+
+    with Recording(str(path)) as recording:
+        assert list(recording) == [
+            (1e-6, INBOUND, [0xB0, 1, 127]),
+            (2e-6, OUTBOUND, sysex),
+        ]
+
+    # A message cut short at the end, e.g. by a crash, is skipped
+    path.write_bytes(data[: -RECORD.size])
+    with Recording(str(path)) as recording:
+        assert [message for _, _, message in recording] == [[0xB0, 1, 127]]
+
+
+def test_recorded_session_replays_into_a_device(simulator, tmp_path):
+    path = str(tmp_path / "session.pymftrec")
+    recorded = MidiFighterTwister(
+        transport=RecordingTransport(simulator.transport(), path)
+    )
+    try:
+        assert recorded.discover()
+        recorded.subscribe(3, KnobSettings())
+        recorded.start()
+        for value in (10, 90, 127):
+            simulator.set_knob(3, value)
+        assert wait_for(lambda: recorded.read_active() == {3: 1.0})
+        recorded.set_encoder_value(3, 0.0)
+    finally:
+        recorded.close()
+
+    transport = ReplayTransport(path, speed=None)
+    replayed = MidiFighterTwister(transport=transport)
+    changes = []
+    try:
+        assert replayed.discover()
+        replayed.subscribe(3, KnobSettings())
+        replayed.on_change(3, lambda *change: changes.append(change[2]))
+        replayed.start(coalesce=False)
+        assert transport.wait(timeout=2.0)
+        assert wait_for(lambda: len(changes) == 3)
+    finally:
+        replayed.close()
+
+    # Only the inbound messages are replayed
+    assert transport.messages_replayed == 3
+    assert changes == [10 / 127, 90 / 127, 1.0]
+    assert replayed.config._encoders[3].value == 127
+    with Recording(path) as recording:
+        outbound = [m for _, d, m in recording if d == OUTBOUND]
+    encoder_cc = 0xB0 + constants.MidiChannels.ROTARY_ENCODER
+    assert [encoder_cc, 3, 0] in outbound
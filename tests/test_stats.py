@@ -0,0 +1,60 @@
+from pymft import OverflowPolicy
+from pymft.src.stats import Histogram, Stats
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.001, 0.01))
+    for duration_ns in (500_000, 1_000_000, 5_000_000, 20_000_000):
+        histogram.observe_ns(duration_ns)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {0.001: 2, 0.01: 1, float("inf"): 1}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 0.0265
+    assert snapshot["p50"] == 0.001
+    assert snapshot["p99"] == float("inf")
+
+    histogram.reset()
+    assert histogram.snapshot()["p50"] is None
+
+
+def test_prometheus_output():
+    stats = Stats(buckets=(0.001, 0.01))
+    stats.record_batch([([0xB0, 0, 1], 0.0, 0)], ignored=1, now_ns=2_000_000)
+    stats.record_sysex_sent(12)
+
+    text = stats.to_prometheus(labels={"device": 'Twister "A"'})
+
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    label = 'device="Twister \\"A\\""'
+    assert "# TYPE pymft_messages_received_total counter" in lines
+    assert f"pymft_messages_received_total{{{label}}} 1" in lines
+    assert f"pymft_messages_ignored_total{{{label}}} 1" in lines
+    assert f"pymft_sysex_bytes_sent_total{{{label}}} 12" in lines
+    assert "# TYPE pymft_ingress_latency_seconds histogram" in lines
+    # Buckets are cumulative and end with +Inf
+    bucket = f"pymft_ingress_latency_seconds_bucket{{{label}"
+    assert f'{bucket},le="0.001"}} 0' in lines
+    assert f'{bucket},le="0.01"}} 1' in lines
+    assert f'{bucket},le="+Inf"}} 1' in lines
+    assert f"pymft_ingress_latency_seconds_sum{{{label}}} 0.002" in lines
+    assert f"pymft_ingress_latency_seconds_count{{{label}}} 1" in lines
+    unlabelled = stats.to_prometheus().splitlines()
+    assert "pymft_callback_duration_seconds_count 0" in unlabelled
+
+
+def test_stats_count_drops_of_open_event_queues(make_mft):
+    mft = make_mft(collect_stats=True)
+    kept = mft.events(maxsize=1)
+    closed = mft.events(maxsize=1, policy=OverflowPolicy.DROP_NEWEST)
+    for queue in (kept, closed):
+        queue.put_many([1, 2, 3])
+    assert mft.stats().events_dropped == 4
+
+    closed.close()
+    assert mft.stats().events_dropped == 2
+
+    mft.close()
+    assert kept.closed
+    assert mft.stats().events_dropped == 0
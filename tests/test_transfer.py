@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from pymft.src.transfer import TransferEngine
+
+
+def test_close_finishes_queued_transfers():
+    sent = []
+    engine = TransferEngine(sent.append, byte_rate=None)
+    future = engine.submit([b"\xf0\x01\xf7"] * 3)
+
+    engine.close(timeout=1.0)
+
+    assert future.result(timeout=0).messages == 3
+    assert len(sent) == 3
+
+
+def test_close_gives_up_on_transfers_after_the_timeout():
+    sent = []
+    engine = TransferEngine(sent.append, byte_rate=1000.0, window=1)
+    running = engine.submit([bytes(100)] * 50)  # About 5 seconds
+    queued = engine.submit([bytes(10)])
+
+    start = time.monotonic()
+    engine.close(timeout=0.1)
+
+    assert time.monotonic() - start < 0.5
+    with pytest.raises(CancelledError):
+        running.result(timeout=1.0)
+    assert queued.cancelled()
+    assert len(sent) < 50
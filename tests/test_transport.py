@@ -0,0 +1,12 @@
+import pytest
+
+from pymft.src.transport import Transport
+
+
+def test_incomplete_transports_cannot_be_created():
+    class SendOnlyTransport(Transport):
+        def send_message(self, message):
+            pass
+
+    with pytest.raises(TypeError):
+        SendOnlyTransport()